@@ -6,8 +6,13 @@ from .auth import auth_bp
 from .admin import admin_bp
 from .classification import classify_bp
 from .api import api_bp
+from .health import health_bp
 from .models import User, ArticleResult
-from .utils import load_models
+from .utils import load_models, load_models_in_background
+from .cli import register_cli, running_cli_command
+from .prefork import prepare_for_fork, configure_torch_threads
+from .services.near_duplicate import init_near_duplicate_index
+from .services.cascade import init_cascade
 from flask_login import LoginManager, current_user
 
 login_manager = LoginManager()
@@ -36,10 +41,33 @@ def create_app(config_object=None):
     app.register_blueprint(classify_bp)
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(api_bp, url_prefix="/api")
+    app.register_blueprint(health_bp)
 
-    # Load ML models once and create default admin
+    register_cli(app)
+
+    # Load ML models once (in the background by default) and create default admin.
+    # `flask <command>` skips this: commands load what they need (classify-file per worker)
     with app.app_context():
-        load_models(app)
+        if running_cli_command():
+            pass
+        elif app.config.get("MODEL_PRELOAD", False):
+            # gunicorn --preload: load in the master so forked workers share the weights
+            load_models(app)
+            prepare_for_fork(app)
+            # Threads do not survive fork, so build the index up front in preload mode
+            init_near_duplicate_index(app, background=False)
+            init_cascade(app)
+        else:
+            configure_torch_threads(
+                app.config.get("TORCH_INTRA_OP_THREADS"),
+                app.config.get("TORCH_INTER_OP_THREADS"),
+            )
+            if app.config.get("MODEL_LOAD_ASYNC", True):
+                load_models_in_background(app)
+            else:
+                load_models(app)
+            init_near_duplicate_index(app, background=True)
+            init_cascade(app)
 
         admin_email = app.config.get("DEFAULT_ADMIN_EMAIL", "admin@gmail.com")
         admin_pw = app.config.get("DEFAULT_ADMIN_PASSWORD", "admin")
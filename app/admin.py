@@ -259,3 +259,47 @@ def api_xai_metrics():
     except Exception as e:
         logger.exception(f"Error in XAI metrics API: {str(e)}")
         return jsonify({'error': str(e)}), 500
+
+
+@admin_bp.route('/api/inference_stats')
+@login_required
+@admin_required
+def api_inference_stats():
+    """Runtime statistics of the local inference stack (batching, caches)."""
+    from flask import current_app
+
+    models = current_app.config.get('ML_MODELS', {}) or {}
+    batching = {}
+    padding = {}
+    service = None
+    for name, model in models.items():
+        batcher = getattr(model, 'batcher', None)
+        if batcher is not None:
+            batching[name] = batcher.get_stats()
+        if getattr(model, 'padding', None) is not None:
+            padding[name] = model.padding.get_stats()
+        client = getattr(model, 'client', None)
+        if client is not None:
+            service = {'address': client.address, 'overloaded_retries': client.overloaded}
+
+    cache = current_app.config.get('PREDICTION_CACHE')
+    near_dup = current_app.config.get('NEAR_DUP_INDEX')
+    cascade = current_app.config.get('CASCADE')
+    gemini_cache = current_app.config.get('GEMINI_CACHE')
+    routing = current_app.config.get('GEMINI_ROUTING')
+    breaker = current_app.config.get('GEMINI_BREAKER')
+    limiter = current_app.config.get('GEMINI_RATE_LIMITER')
+    usage = current_app.config.get('GEMINI_USAGE')
+    return jsonify({
+        'batching': batching,
+        'padding': padding,
+        'inference_service': service,
+        'prediction_cache': cache.get_stats() if cache is not None else None,
+        'near_duplicate_index': near_dup.get_stats() if near_dup is not None else None,
+        'cascade': cascade.get_stats() if cascade is not None else None,
+        'gemini_cache': gemini_cache.get_stats() if gemini_cache is not None else None,
+        'gemini_routing': routing.get_stats() if routing is not None else None,
+        'gemini_breaker': breaker.get_stats() if breaker is not None else None,
+        'gemini_rate_limit': limiter.get_stats() if limiter is not None else None,
+        'gemini_usage': usage.get_stats() if usage is not None else None
+    })
@@ -1,10 +1,19 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from .models import User, ArticleResult
 from .database import db
-from .utils import token_auth_required, verify_password
-from .classification import predict_category, predict_fake_news
+from .utils import token_auth_required, verify_password, models_required
+from .classification import classify_article
 from .models import Feedback
 from .services.classification_comparison import ClassificationComparisonService
+from .services.near_duplicate import find_near_duplicate, remember_results
+from .services.bulk_classification import (
+    classify_articles,
+    build_result_row,
+    bulk_save_results,
+    iter_ndjson_articles,
+    stream_classify,
+)
 
 api_bp = Blueprint('api', __name__)
 
@@ -36,6 +45,7 @@ def api_login():
 
 @api_bp.route('/classify', methods=['POST'])
 @token_auth_required
+@models_required
 def api_classify():
     """
     Classify a news article using ML model and Gemini API.
@@ -49,17 +59,36 @@ def api_classify():
     if not text:
         return jsonify({'error':'text required'}), 400
     
-    # Get ML model predictions
-    category, cat_conf = predict_category(text)
-    fake_label, fake_conf = predict_fake_news(text)
+    duplicate = find_near_duplicate(text)
+    if duplicate:
+        # Reuse the verdict of a near-identical article; skip the models and Gemini
+        category = duplicate.get('predicted_category')
+        cat_conf = duplicate.get('category_confidence') or 0.0
+        fake_label = duplicate.get('fake_news_label')
+        fake_conf = duplicate.get('fake_confidence') or 0.0
+        comparison_result = {
+            'gemini_result': duplicate.get('gemini_result'),
+            'final_displayed_result': duplicate.get('final_displayed_result') or fake_label,
+            'comparison_status': duplicate.get('comparison_status') or 'model_only',
+            'processing_details': {'near_duplicate_similarity': duplicate.get('similarity')}
+        }
+    else:
+        # Start Gemini first so the round trip overlaps local inference
+        comparison_service = get_comparison_service()
+        gemini_call = comparison_service.start_verification(text)
 
-    # Get comparison service and run dual classification
-    comparison_service = get_comparison_service()
-    comparison_result = comparison_service.classify_with_comparison(
-        article_text=text,
-        model_result=fake_label,
-        model_confidence=fake_conf
-    )
+        # Get ML model predictions
+        article = classify_article(text)
+        category, cat_conf = article['category'], article['category_confidence']
+        fake_label, fake_conf = article['fake_news_label'], article['fake_confidence']
+
+        # Join Gemini and run dual classification
+        comparison_result = comparison_service.classify_with_comparison(
+            article_text=text,
+            model_result=fake_label,
+            model_confidence=fake_conf,
+            gemini_call=gemini_call
+        )
 
     user = request.user
     result = ArticleResult(
@@ -76,6 +105,7 @@ def api_classify():
     )
     db.session.add(result)
     db.session.commit()
+    remember_results([result])
 
     # Return comprehensive response with comparison details
     return jsonify({
@@ -90,6 +120,94 @@ def api_classify():
         'processing_details': comparison_result.get('processing_details', {})
     })
 
+@api_bp.route('/classify/batch', methods=['POST'])
+@token_auth_required
+@models_required
+def api_classify_batch():
+    """
+    Classify up to API_BATCH_MAX_ITEMS articles in one request.
+
+    Body:
+        articles: list of strings or {"id": ..., "text": ...} objects
+        verify_with_gemini: optional bool (default false)
+
+    Returns:
+        JSON with one result per article in input order; invalid items carry an
+        'error' and are not persisted.
+    """
+    data = request.json or {}
+    articles = data.get('articles')
+    if not isinstance(articles, list) or not articles:
+        return jsonify({'error': 'articles list required'}), 400
+
+    max_items = current_app.config.get('API_BATCH_MAX_ITEMS', 100)
+    if len(articles) > max_items:
+        return jsonify({'error': f'at most {max_items} articles per batch'}), 413
+
+    verify = bool(data.get('verify_with_gemini', False))
+    results = classify_articles(
+        articles,
+        comparison_service=get_comparison_service() if verify else None
+    )
+
+    user = request.user
+    rows = [build_result_row(user.id, r) for r in results if not r.get('error')]
+    try:
+        saved = bulk_save_results(rows)
+    except Exception as e:
+        return jsonify({'error': f'failed to save results: {str(e)}'}), 500
+
+    for r in results:
+        r.pop('text', None)
+
+    return jsonify({
+        'results': results,
+        'saved': saved,
+        'errors': sum(1 for r in results if r.get('error'))
+    })
+
+@api_bp.route('/classify/stream', methods=['POST'])
+@token_auth_required
+@models_required
+def api_classify_stream():
+    """
+    Streaming variant of /classify/batch for large corpora.
+
+    The request body is newline-delimited JSON (one string or {"id", "text"}
+    object per line). Articles are classified in STREAM_CHUNK_SIZE chunks and
+    NDJSON results are streamed back as each chunk finishes.
+
+    Query args:
+        verify_with_gemini: '1' to verify every article with Gemini
+        persist: '0' to skip saving ArticleResult rows
+    """
+    try:
+        # Flask >= 3.1 allows a per-request body limit
+        request.max_content_length = current_app.config.get('STREAM_MAX_CONTENT_LENGTH', 256 * 1024 * 1024)
+    except AttributeError:
+        pass
+
+    verify = request.args.get('verify_with_gemini') == '1'
+    persist = request.args.get('persist', '1') != '0'
+    chunk_size = current_app.config.get('STREAM_CHUNK_SIZE', 32)
+    max_line = current_app.config.get('STREAM_MAX_LINE_BYTES', 1024 * 1024)
+    comparison_service = get_comparison_service() if verify else None
+    user_id = request.user.id
+    stream = request.stream
+
+    def generate():
+        items = iter_ndjson_articles(stream, max_line_bytes=max_line)
+        for result in stream_classify(
+            items,
+            chunk_size=chunk_size,
+            user_id=user_id,
+            comparison_service=comparison_service,
+            persist=persist
+        ):
+            yield json.dumps(result) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @api_bp.route('/history', methods=['GET'])
 @token_auth_required
 def api_history():
@@ -1,4 +1,5 @@
 import os
+import json
 import pickle
 import logging
 from flask import (
@@ -12,13 +13,16 @@ from flask import (
     flash,
     current_app,
     Response,
+    stream_with_context,
 )
 from urllib.parse import urlparse
 from .models import ArticleResult
 from .database import db
 from flask_login import current_user, login_required
-from .utils import sanitize_text, allowed_file, explain_prediction
+from .utils import sanitize_text, allowed_file, explain_prediction, fused_scores, models_required
 from .services.xai_pipeline import XAIPipeline
+from .services.prediction_cache import make_cache_key
+from .services.near_duplicate import find_near_duplicate, remember_results
 
 logger = logging.getLogger(__name__)
 
@@ -180,24 +184,137 @@ class SimpleWrapper:
             return out
         except Exception: return [{} for _ in texts]
 
-def predict_category(text: str):
-    models = current_app.config.get('ML_MODELS', {})
-    model = models.get('classifier')
-    if not model: return None, 0.0
-    label_map = current_app.config.get('CATEGORY_LABEL_MAP', {
+def _model_scores(model, text: str):
+    """Return the list of {'label', 'score'} dicts for text, preferring the batched path."""
+    if hasattr(model, 'predict_scores'):
+        return model.predict_scores(text)
+    if hasattr(model, 'pipeline'):
+        try: res = model.pipeline(text, return_all_scores=True)
+        except TypeError: res = model.pipeline(text)
+        if isinstance(res, list) and len(res) > 0:
+            return res[0] if isinstance(res[0], list) else res
+    return None
+
+def _best_score(scores):
+    if isinstance(scores, list) and scores and isinstance(scores[0], dict):
+        return max(scores, key=lambda x: x.get('score', 0.0))
+    return None
+
+def _category_label_map():
+    return current_app.config.get('CATEGORY_LABEL_MAP', {
         'LABEL_0': 'ArtsAndCulture', 'LABEL_1': 'Business', 'LABEL_2': 'Entertainment',
         'LABEL_3': 'GeneralNews', 'LABEL_4': 'Health', 'LABEL_5': 'Other',
         'LABEL_6': 'Politics', 'LABEL_7': 'Sports', 'LABEL_8': 'Technology',
     })
+
+def _fake_label_map():
+    return current_app.config.get('FAKE_LABEL_MAP', {'LABEL_0': 'real', 'LABEL_1': 'fake'})
+
+def _model_scores_batch(model, texts):
+    """Score a list of texts in one forward pass, falling back to one call per text."""
+    if hasattr(model, 'predict_batch'):
+        try:
+            return model.predict_batch(texts)
+        except Exception:
+            logger.exception('Batched inference failed, falling back to per-item calls')
+    out = []
+    for t in texts:
+        try: out.append(_model_scores(model, t))
+        except Exception:
+            logger.exception('Per-item inference failed')
+            out.append(None)
+    return out
+
+def _cache_key(model_name, model, text):
+    if current_app.config.get('PREDICTION_CACHE') is None: return None
+    return make_cache_key(text, model_name, getattr(model, 'model_version', None))
+
+def _cached_predict(model_name, model, text, compute):
+    """Serve (label, confidence) from the prediction cache, computing and storing it on a miss."""
+    cache = current_app.config.get('PREDICTION_CACHE')
+    key = _cache_key(model_name, model, text)
+    if key is not None:
+        hit = cache.get(key)
+        if hit is not None: return hit
+    result = compute(model, text)
+    if key is not None and result[0] is not None:
+        cache.set(key, result)
+    return result
+
+def _cached_predict_batch(model_name, model, texts, compute):
+    """Batched _cached_predict: only cache misses go through the model, in one batch."""
+    cache = current_app.config.get('PREDICTION_CACHE')
+    texts = list(texts)
+    keys = [_cache_key(model_name, model, t) for t in texts]
+    out = [None] * len(texts)
+    misses = []
+    for i, key in enumerate(keys):
+        hit = cache.get(key) if key is not None else None
+        if hit is not None: out[i] = hit
+        else: misses.append(i)
+    if misses:
+        for i, result in zip(misses, compute(model, [texts[i] for i in misses])):
+            out[i] = result
+            if keys[i] is not None and result[0] is not None:
+                cache.set(keys[i], result)
+    return out
+
+def _cache_get(model_name, model, text):
+    key = _cache_key(model_name, model, text) if model else None
+    return current_app.config['PREDICTION_CACHE'].get(key) if key is not None else None
+
+def _cache_set(model_name, model, text, result):
+    key = _cache_key(model_name, model, text) if model else None
+    if key is not None and result[0] is not None:
+        current_app.config['PREDICTION_CACHE'].set(key, result)
+
+def _category_from_scores(scores, label_map=None):
+    label_map = label_map if label_map is not None else _category_label_map()
+    best = _best_score(scores)
+    if not best: return None, 0.0
+    lbl = str(best.get('label', ''))
+    return label_map.get(lbl, lbl), float(best.get('score', 0.0))
+
+def _fake_from_scores(scores, label_map=None):
+    label_map = label_map if label_map is not None else _fake_label_map()
+    best = _best_score(scores)
+    mapped = label_map.get(str(best.get('label', ''))) if best else None
+    return (mapped, float(best.get('score', 0.0))) if mapped else (None, 0.0)
+
+def _predict_category_batch_uncached(model, texts):
+    label_map = _category_label_map()
+    return [_category_from_scores(scores, label_map) for scores in _model_scores_batch(model, texts)]
+
+def _predict_fake_news_batch_uncached(model, texts):
+    label_map = _fake_label_map()
+    return [_fake_from_scores(scores, label_map) for scores in _model_scores_batch(model, texts)]
+
+def predict_category_batch(texts):
+    """Batched predict_category: returns one (label, confidence) tuple per text, in order."""
+    model = current_app.config.get('ML_MODELS', {}).get('classifier')
+    if not model or not texts: return [(None, 0.0) for _ in texts]
+    return _cached_predict_batch('classifier', model, texts, _predict_category_batch_uncached)
+
+def predict_fake_news_batch(texts):
+    """Batched predict_fake_news: returns one (label, confidence) tuple per text, in order."""
+    model = current_app.config.get('ML_MODELS', {}).get('fake')
+    cascade = current_app.config.get('CASCADE')
+    if not texts: return []
+
+    def transformer(batch):
+        if not model: return [(None, 0.0) for _ in batch]
+        return _cached_predict_batch('fake', model, batch, _predict_fake_news_batch_uncached)
+
+    if cascade is not None and cascade.ready:
+        return cascade.predict_batch(texts, transformer)
+    return transformer(texts)
+
+def _predict_category_uncached(model, text: str):
+    label_map = _category_label_map()
     try:
-        if hasattr(model, 'pipeline'):
-            try: res = model.pipeline(text, return_all_scores=True)
-            except TypeError: res = model.pipeline(text)
-            if isinstance(res, list) and len(res) > 0:
-                scores = res[0] if isinstance(res[0], list) else res
-                if isinstance(scores, list) and scores and isinstance(scores[0], dict):
-                    best = max(scores, key=lambda x: x.get('score', 0.0))
-                    return label_map.get(str(best.get('label', '')), str(best.get('label', ''))), float(best.get('score', 0.0))
+        best = _best_score(_model_scores(model, text))
+        if best:
+            return label_map.get(str(best.get('label', '')), str(best.get('label', ''))), float(best.get('score', 0.0))
         out = model.predict([text])
         if out and isinstance(out, list):
             val = out[0]
@@ -207,21 +324,13 @@ def predict_category(text: str):
     except Exception: logger.exception('predict_category failed')
     return None, 0.0
 
-def predict_fake_news(text: str):
-    models = current_app.config.get('ML_MODELS', {})
-    model = models.get('fake')
-    if not model: return None, 0.0
-    label_map = current_app.config.get('FAKE_LABEL_MAP', {'LABEL_0': 'real', 'LABEL_1': 'fake'})
+def _predict_fake_news_uncached(model, text: str):
+    label_map = _fake_label_map()
     try:
-        if hasattr(model, 'pipeline'):
-            try: res = model.pipeline(text, return_all_scores=True)
-            except TypeError: res = model.pipeline(text)
-            if isinstance(res, list) and len(res) > 0:
-                scores = res[0] if isinstance(res[0], list) else res
-                if isinstance(scores, list) and scores and isinstance(scores[0], dict):
-                    best = max(scores, key=lambda x: x.get('score', 0.0))
-                    mapped = label_map.get(str(best.get('label', '')))
-                    if mapped: return mapped, float(best.get('score', 0.0))
+        best = _best_score(_model_scores(model, text))
+        if best:
+            mapped = label_map.get(str(best.get('label', '')))
+            if mapped: return mapped, float(best.get('score', 0.0))
         out = model.predict([text])
         if isinstance(out, list) and out:
             lbl_raw = out[0]
@@ -232,7 +341,75 @@ def predict_fake_news(text: str):
     except Exception: logger.exception('predict_fake_news failed')
     return None, 0.0
 
+def predict_category(text: str):
+    models = current_app.config.get('ML_MODELS', {})
+    model = models.get('classifier')
+    if not model: return None, 0.0
+    return _cached_predict('classifier', model, text, _predict_category_uncached)
+
+def predict_fake_news(text: str):
+    models = current_app.config.get('ML_MODELS', {})
+    model = models.get('fake')
+    cascade = current_app.config.get('CASCADE')
+
+    def transformer(t):
+        if not model: return None, 0.0
+        return _cached_predict('fake', model, t, _predict_fake_news_uncached)
+
+    # Cascade mode: the linear first stage answers confident cases, the rest escalate
+    if cascade is not None and cascade.ready:
+        return cascade.predict(text, transformer)
+    return transformer(text)
+
+def classify_article(text: str):
+    """
+    Category and fake-news verdict of one article in a single call.
+
+    When both models share a tokenizer the article is tokenized once and the
+    encoded tensors feed both forward passes; otherwise each model is scored
+    on its own. Cached results and the cascade's first stage are honoured.
+
+    Returns:
+        dict: category, category_confidence, fake_news_label, fake_confidence
+    """
+    models = current_app.config.get('ML_MODELS', {})
+    classifier, fake = models.get('classifier'), models.get('fake')
+    cascade = current_app.config.get('CASCADE')
+    category = _cache_get('classifier', classifier, text)
+    fused = {}
+
+    def fake_transformer(t):
+        if not fake: return None, 0.0
+        hit = _cache_get('fake', fake, t)
+        if hit is not None: return hit
+        if category is None and classifier and current_app.config.get('FUSED_INFERENCE', True):
+            scores = None
+            try: scores = fused_scores([classifier, fake], t)
+            except Exception: logger.exception('Fused inference failed, scoring models separately')
+            if scores:
+                fused['classifier'] = _category_from_scores(scores[0])
+                _cache_set('classifier', classifier, t, fused['classifier'])
+                result = _fake_from_scores(scores[1])
+                _cache_set('fake', fake, t, result)
+                return result
+        return _cached_predict('fake', fake, t, _predict_fake_news_uncached)
+
+    if cascade is not None and cascade.ready:
+        fake_label, fake_conf = cascade.predict(text, fake_transformer)
+    else:
+        fake_label, fake_conf = fake_transformer(text)
+    if category is None:
+        category = fused.get('classifier') or predict_category(text)
+
+    return {
+        'category': category[0],
+        'category_confidence': float(category[1] or 0.0),
+        'fake_news_label': fake_label,
+        'fake_confidence': float(fake_conf or 0.0),
+    }
+
 @classify_bp.route('/classify', methods=['GET', 'POST'])
+@models_required
 def classify_page():
     is_authenticated = current_user.is_authenticated
     free_uses = session.get('free_uses', 0)
@@ -289,50 +466,68 @@ def classify_page():
             flash('Please provide article text or upload a file.', 'warning')
             return redirect(url_for('classify.classify_page'))
 
-        # 1. تشغيل الموديل المحلي (Local ML)
-        xai_pipeline = XAIPipeline()
-        def fake_news_predictor(article_text): return predict_fake_news(article_text)
-        
-        xai_result = xai_pipeline.process_classification(
-            article_text=text, predict_fn=fake_news_predictor,
-            user_id=current_user.id if is_authenticated else None
-        )
+        # 0. إعادة استخدام نتيجة مقال شبه مطابق (Near-duplicate reuse)
+        duplicate = find_near_duplicate(text)
+        if duplicate:
+            cat = duplicate.get('predicted_category')
+            cat_conf = duplicate.get('category_confidence') or 0.0
+            final_label = duplicate.get('final_displayed_result') or duplicate.get('fake_news_label')
+            raw_confidence = duplicate.get('fake_confidence') or 0.0
+            xai_result = {
+                'prediction_label': final_label,
+                'confidence_score': raw_confidence * 100 if raw_confidence <= 1.0 else raw_confidence,
+                'decision_source': 'NEAR_DUPLICATE',
+            }
+        else:
+            # Start Gemini first (if the routing policy allows) so it overlaps local inference
+            xai_pipeline = XAIPipeline()
+            gemini_call = xai_pipeline.start_gemini(text)
+
+            # 1. تشغيل الموديل المحلي (Local ML)
+            article = classify_article(text)
+            cat, cat_conf = article['category'], article['category_confidence']
+
+            def fake_news_predictor(article_text):
+                if article_text == text: return article['fake_news_label'], article['fake_confidence']
+                return predict_fake_news(article_text)
         
-        cat, cat_conf = predict_category(text)
-        local_label = xai_result.get('prediction_label', 'unknown').lower()
-        raw_confidence = xai_result.get('confidence_score', 0.0)
+            xai_result = xai_pipeline.process_classification(
+                article_text=text, predict_fn=fake_news_predictor,
+                user_id=current_user.id if is_authenticated else None,
+                gemini_call=gemini_call
+            )
         
-        if raw_confidence > 1.0: raw_confidence /= 100.0
-        fake_conf_percent = round(raw_confidence * 100, 2)
+            local_label = (xai_result.get('prediction_label') or 'unknown').lower()
+            raw_confidence = xai_result.get('confidence_score', 0.0)
         
-        # 2. تشغيل Gemini للمقارنة (The Decision Logic)
-        from .services.gemini_service import GeminiService
-        gemini_service = GeminiService()
+            if raw_confidence > 1.0: raw_confidence /= 100.0
+            fake_conf_percent = round(raw_confidence * 100, 2)
         
-        # نطلب التحليل الشامل من Gemini دائماً أو عند ضعف الثقة
-        gemini_data = gemini_service.analyze_article_comprehensive(text)
+            # 2. تشغيل Gemini للمقارنة (The Decision Logic)
+            # نتيجة Gemini التي بدأت بالتوازي مع الموديل المحلي (None عند الفشل أو تجاوز المهلة)
+            gemini_data = xai_result.get('gemini_analysis')
         
-        final_label = local_label # الافتراضي هو الموديل المحلي
+            final_label = local_label # الافتراضي هو الموديل المحلي
         
-        if gemini_data:
-            gemini_verdict = gemini_data['verdict'].lower() # 'real' or 'fake'
+            if gemini_data:
+                gemini_verdict = gemini_data['verdict'].lower() # 'real' or 'fake'
             
-            # منطق المقارنة: إذا Gemini قال Fake، نعتمد كلامه لأنه الأكثر دقة في المعلومات العامة
-            if gemini_verdict == 'fake':
-                final_label = 'fake'
-            elif gemini_verdict == 'real' and local_label == 'real':
-                final_label = 'real'
-            elif gemini_verdict == 'real' and local_label == 'fake':
-                final_label = 'real'
-            elif gemini_verdict == 'fake' and local_label == 'real':
-                final_label = 'fake'
+                # منطق المقارنة: إذا Gemini قال Fake، نعتمد كلامه لأنه الأكثر دقة في المعلومات العامة
+                if gemini_verdict == 'fake':
+                    final_label = 'fake'
+                elif gemini_verdict == 'real' and local_label == 'real':
+                    final_label = 'real'
+                elif gemini_verdict == 'real' and local_label == 'fake':
+                    final_label = 'real'
+                elif gemini_verdict == 'fake' and local_label == 'real':
+                    final_label = 'fake'
             
-            # تخزين بيانات Gemini لعرضها في الواجهة
-            auto_gemini = {
-                'summary': gemini_data['summary'],
-                'explanation': gemini_data['explanation'],
-                'verdict': gemini_data['verdict']
-            }
+                # تخزين بيانات Gemini لعرضها في الواجهة
+                auto_gemini = {
+                    'summary': gemini_data['summary'],
+                    'explanation': gemini_data['explanation'],
+                    'verdict': gemini_data['verdict']
+                }
 
         # 3. حفظ النتيجة النهائية
         try:
@@ -348,6 +543,7 @@ def classify_page():
             if is_authenticated:
                 db.session.add(result)
                 db.session.commit()
+                remember_results([result])
             else:
                 session['free_uses'] = free_uses + 1
         except Exception as db_err:
@@ -376,7 +572,30 @@ def classify_page():
     return render_template('classify.html', remaining=remaining, user_history=user_history, trending_news=trending)
 
 
+def _explanation_payload(xai_result, lime_html=None):
+    conf_raw = xai_result.get('confidence_score', 0.0)
+    if conf_raw > 1.0: conf_raw /= 100.0
+    
+    summary, expl, conf_expl = (
+        xai_result.get('summary'), xai_result.get('explanation'), xai_result.get('confidence_explanation')
+    )
+    
+    # التأكد من إرسال نصوص بدلاً من None لمنع خطأ المتصفح
+    return {
+        'explanation': str(expl) if expl else "No detailed analysis available.",
+        'summary': str(summary) if summary else "No summary available.",
+        'confidence_explanation': str(conf_expl) if conf_expl else "N/A",
+        'prediction_label': xai_result.get('prediction_label'),
+        'confidence_score': conf_raw,
+        # هذا السطر تم تأمينه ليبحث عن كل الأسماء المحتملة لـ LIME
+        'lime_html': lime_html or xai_result.get('explanation_html') or xai_result.get('lime_html') or "LIME Analysis Unavailable"
+    }
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @classify_bp.route('/get_explanation', methods=['POST'])
+@models_required
 def get_explanation():
     data = request.get_json()
     text = data.get('text', '')
@@ -385,32 +604,47 @@ def get_explanation():
     try:
         xai_pipeline = XAIPipeline()
         def predictor(t): return predict_fake_news(t)
-        xai_result = xai_pipeline.process_classification(text, predictor)
-        
-        from .services.gemini_service import GeminiService
-        gemini = GeminiService()
-        
-        conf_raw = xai_result.get('confidence_score', 0.0)
-        if conf_raw > 1.0: conf_raw /= 100.0
-        
-        summary, expl, conf_expl = gemini.generate_explanation(
-            text, xai_result.get('prediction_label', 'unknown').upper(), round(conf_raw * 100, 2)
-        )
-        
-        # التأكد من إرسال نصوص بدلاً من None لمنع خطأ المتصفح
-        return jsonify({
-            'explanation': str(expl) if expl else "No detailed analysis available.",
-            'summary': str(summary) if summary else "No summary available.",
-            'confidence_explanation': str(conf_expl) if conf_expl else "N/A",
-            'prediction_label': xai_result.get('prediction_label'),
-            'confidence_score': conf_raw,
-            # هذا السطر تم تأمينه ليبحث عن كل الأسماء المحتملة لـ LIME
-            'lime_html': xai_result.get('explanation_html') or xai_result.get('lime_html') or "LIME Analysis Unavailable"
-        })
+        # The user asked for the explanation: bypass the confidence bands (the budget still applies)
+        xai_result = xai_pipeline.process_classification(text, predictor, explicit=True)
+        return jsonify(_explanation_payload(xai_result))
     except Exception as e:
         logger.error(f"Error in get_explanation: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@classify_bp.route('/get_explanation/stream', methods=['POST'])
+@models_required
+def get_explanation_stream():
+    """
+    Server-sent-events variant of /get_explanation: 'prediction' as soon as the
+    local model answers, 'gemini' while the Gemini analysis streams in, 'lime'
+    when LIME finishes, then 'done' with the same payload /get_explanation returns.
+    """
+    data = request.get_json(silent=True) or {}
+    text = data.get('text', '')
+    if not text: return jsonify({'error': 'No text provided'}), 400
+
+    model = current_app.config.get('ML_MODELS', {}).get('fake')
+    # Runs on a helper thread, outside the app context
+    def lime(t): return explain_prediction(t, model)[0]
+
+    def generate():
+        for event, payload in XAIPipeline().stream_explanation(text, predict_fake_news, lime):
+            if event == 'lime':
+                yield _sse('lime', {'lime_html': payload['lime'] or "LIME Analysis Unavailable"})
+            elif event == 'result':
+                if payload.get('error'):
+                    yield _sse('error', {'error': payload['error']})
+                yield _sse('done', _explanation_payload(payload, payload.get('lime')))
+            else:
+                yield _sse(event, payload)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        # Proxies must not buffer the stream
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 # بقية الدوال (history, api_classify, api_xai_result) تبقى كما هي تماماً بدون تغيير
 @classify_bp.route('/history')
 @login_required
@@ -419,19 +653,25 @@ def history_page():
     return render_template('history.html', user_history=user_history)
 
 @classify_bp.route('/api_classify', methods=['POST'])
+@models_required
 def api_classify_route():
     data = request.json or {}
     text = sanitize_text(data.get('text', ''))
     if not text: return jsonify({'error': 'text required'}), 400
-    cat, cat_conf = predict_category(text)
-    fake_label, fake_conf = predict_fake_news(text)
-    return jsonify({
-        'category': cat, 'category_confidence': float(cat_conf or 0.0),
-        'fake_news_label': fake_label, 'fake_confidence': float(fake_conf or 0.0),
-    })
+    duplicate = find_near_duplicate(text)
+    if duplicate:
+        return jsonify({
+            'category': duplicate.get('predicted_category'),
+            'category_confidence': float(duplicate.get('category_confidence') or 0.0),
+            'fake_news_label': duplicate.get('fake_news_label'),
+            'fake_confidence': float(duplicate.get('fake_confidence') or 0.0),
+            'near_duplicate_similarity': duplicate.get('similarity'),
+        })
+    return jsonify(classify_article(text))
 
 @classify_bp.route('/api/xai_result', methods=['POST'])
 @login_required
+@models_required
 def api_xai_result():
     data = request.json or {}
     text = data.get('text', '')
@@ -439,7 +679,7 @@ def api_xai_result():
     try:
         xai_pipeline = XAIPipeline()
         def pred(t): return predict_fake_news(t)
-        result = xai_pipeline.process_classification(text, pred, current_user.id)
+        result = xai_pipeline.process_classification(text, pred, current_user.id, explicit=True)
         return jsonify(XAIPipeline.format_for_display(result))
     except Exception as e:
         logger.exception(f"Error in XAI result API: {str(e)}")
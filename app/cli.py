@@ -0,0 +1,401 @@
+"""
+Flask CLI commands.
+
+``flask classify-file`` backfills ArticleResult rows from a JSONL/CSV file
+using a pool of worker processes that each load the local models once; the
+parent process (built by create_app under the CLI) loads none.
+"""
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import time
+from datetime import timedelta
+
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+
+logger = logging.getLogger(__name__)
+
+# Runtime state create_app/load_models keep in the config; workers build their own
+RUNTIME_CONFIG_KEYS = ('ML_MODELS', 'MODEL_STATUS')
+
+_worker_app = None
+
+
+def running_cli_command() -> bool:
+    """
+    True while the flask CLI builds the app to run one of its commands
+    (not ``flask run``, which serves like gunicorn).
+    """
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.info_name != 'run'
+
+
+def _plain(value) -> bool:
+    if value is None or isinstance(value, (str, bytes, int, float, timedelta)):
+        return True
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return all(_plain(v) for v in value)
+    if isinstance(value, dict):
+        return all(_plain(k) and _plain(v) for k, v in value.items())
+    return False
+
+
+def worker_config(config) -> dict:
+    """The app's settings without runtime objects (models, caches, indexes), for worker processes."""
+    return {k: v for k, v in config.items() if k not in RUNTIME_CONFIG_KEYS and _plain(v)}
+
+
+def _load_for_classification(app):
+    """Load the local models and the cascade into app for bulk classification."""
+    from .services.cascade import init_cascade
+    from .utils import load_models, models_ready
+
+    if not models_ready(app):
+        with app.app_context():
+            load_models(app)
+    if app.config.get('CASCADE') is None:
+        init_cascade(app)
+
+
+def _init_worker(torch_threads, config):
+    """Process-pool initializer: pin torch threads and load the models once."""
+    global _worker_app
+    try:
+        import torch
+        if torch_threads:
+            torch.set_num_threads(torch_threads)
+            torch.set_num_interop_threads(1)
+    except Exception:
+        logger.warning('Could not configure torch threads in worker')
+
+    _worker_app = Flask('app')
+    _worker_app.config.update(config)
+    # Each worker already receives whole chunks; no need for the micro-batcher thread
+    _worker_app.config['INFERENCE_BATCHING'] = False
+    _worker_app.config['WARMUP_ENABLED'] = False
+    _load_for_classification(_worker_app)
+
+
+def _classify_chunk(items):
+    from .services.bulk_classification import classify_articles
+
+    if _worker_app is None:
+        return classify_articles(items)
+    with _worker_app.app_context():
+        return classify_articles(items)
+
+
+def _iter_records(path, fmt, text_field):
+    if fmt == 'csv':
+        with open(path, newline='', encoding='utf-8') as fh:
+            for row in csv.DictReader(fh):
+                yield {'id': row.get('id'), 'text': row.get(text_field)}
+    else:
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    yield None
+                    continue
+                if isinstance(item, dict) and text_field != 'text':
+                    item = {'id': item.get('id'), 'text': item.get(text_field)}
+                yield item
+
+
+def _iter_chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _read_checkpoint(path, input_path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as fh:
+        data = json.load(fh)
+    if data.get('input') != os.path.abspath(input_path):
+        raise click.ClickException(f'Checkpoint {path} belongs to a different input file')
+    offset = int(data.get('offset', 0))
+    pending = data.get('pending')
+    if pending and _batch_committed(pending):
+        # The previous run stopped between its bulk insert and the checkpoint
+        offset = int(pending['offset'])
+    return offset
+
+
+def _write_checkpoint(path, input_path, offset, pending=None):
+    if not path:
+        return
+    tmp = f'{path}.tmp'
+    data = {'input': os.path.abspath(input_path), 'offset': offset}
+    if pending:
+        data['pending'] = pending
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+
+def _pending_batch(rows, offset):
+    """
+    Checkpoint entry written before a bulk insert: enough to tell on resume
+    whether the insert committed (its last row exists past after_id).
+    """
+    from .database import db
+    from .models import ArticleResult
+
+    last = rows[-1]
+    return {
+        'offset': offset,
+        'after_id': db.session.query(db.func.max(ArticleResult.id)).scalar() or 0,
+        'user_id': last['user_id'],
+        'last_text': last['article_text'],
+    }
+
+
+def _batch_committed(pending) -> bool:
+    from .models import ArticleResult
+
+    return ArticleResult.query.filter(
+        ArticleResult.id > pending['after_id'],
+        ArticleResult.user_id.is_(None) if pending['user_id'] is None else ArticleResult.user_id == pending['user_id'],
+        ArticleResult.article_text == pending['last_text']
+    ).first() is not None
+
+
+@click.command('classify-file')
+@click.argument('input_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), default=None,
+              help='Input format (inferred from the file extension by default).')
+@click.option('--text-field', default='text', show_default=True, help='Field holding the article text.')
+@click.option('--workers', default=max(1, (os.cpu_count() or 2) // 2), show_default=True,
+              help='Worker processes; 0 classifies in this process.')
+@click.option('--threads', default=1, show_default=True, help='torch intra-op threads per worker.')
+@click.option('--batch-size', default=32, show_default=True, help='Articles per forward pass.')
+@click.option('--insert-batch', default=500, show_default=True, help='Rows per bulk INSERT.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), default=None,
+              help='File recording the number of processed records, for resuming.')
+@click.option('--offset', 'start_offset', type=int, default=None,
+              help='Skip this many records (overrides the checkpoint).')
+@click.option('--user-id', type=int, default=None, help='Owner of the saved results.')
+@click.option('--verify-with-gemini', is_flag=True, default=False,
+              help='Verify articles (as routed by the Gemini policy) with batched Gemini requests.')
+@with_appcontext
+def classify_file_command(input_path, fmt, text_field, workers, threads, batch_size,
+                          insert_batch, checkpoint, start_offset, user_id, verify_with_gemini):
+    """Classify every article in INPUT_PATH and save ArticleResult rows."""
+    from itertools import islice
+    from .services.bulk_classification import build_result_row, bulk_save_results, verify_results
+
+    fmt = fmt or ('csv' if input_path.lower().endswith('.csv') else 'jsonl')
+    offset = start_offset if start_offset is not None else _read_checkpoint(checkpoint, input_path)
+    if offset:
+        click.echo(f'Resuming from record {offset}')
+
+    records = islice(_iter_records(input_path, fmt, text_field), offset, None)
+    chunks = _iter_chunks(records, batch_size)
+
+    pool = None
+    if workers > 0:
+        # spawn avoids inheriting torch/OpenMP state from the parent process
+        ctx = multiprocessing.get_context('spawn')
+        pool = ctx.Pool(workers, initializer=_init_worker, initargs=(threads, worker_config(current_app.config)))
+        results_iter = pool.imap(_classify_chunk, chunks)
+    else:
+        from .utils import models_ready
+        _load_for_classification(current_app)
+        if not models_ready(current_app):
+            click.echo('Warning: not all models loaded; affected predictions will be empty')
+        results_iter = map(_classify_chunk, chunks)
+
+    comparison_service = None
+    if verify_with_gemini:
+        from .services.classification_comparison import ClassificationComparisonService
+        comparison_service = ClassificationComparisonService()
+        if comparison_service.gemini_service is None:
+            raise click.ClickException('Gemini is not configured (GEMINI_API_KEY)')
+
+    processed = saved = errors = 0
+    pending_rows = []
+    pending_records = 0
+    committed = offset
+    start = time.perf_counter()
+
+    def flush():
+        nonlocal saved, pending_records, committed
+        if checkpoint and pending_rows:
+            # Recorded first so a crash before the checkpoint update does not re-insert the batch
+            _write_checkpoint(checkpoint, input_path, committed, _pending_batch(pending_rows, offset + processed))
+        saved += bulk_save_results(pending_rows)
+        pending_rows.clear()
+        committed = offset + processed
+        _write_checkpoint(checkpoint, input_path, committed)
+        pending_records = 0
+
+    try:
+        for results in results_iter:
+            if comparison_service is not None:
+                # Workers only run the local models; Gemini is batched here, once per chunk
+                verify_results(results, comparison_service)
+            for r in results:
+                if r.get('error'):
+                    errors += 1
+                else:
+                    pending_rows.append(build_result_row(user_id, r))
+            processed += len(results)
+            pending_records += len(results)
+            if len(pending_rows) >= insert_batch or pending_records >= insert_batch:
+                flush()
+        flush()
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    click.echo(
+        f'Classified {processed} articles in {elapsed:.1f}s ({rate:.1f} articles/s); '
+        f'saved {saved}, errors {errors}'
+    )
+
+
+@click.command('compare-backends')
+@click.option('--model', 'model_names', multiple=True, type=click.Choice(['classifier', 'fake']),
+              help='Model to check (default: both).')
+@click.option('--samples', 'samples_path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='JSONL/text file with one sample article per line.')
+@click.option('--quantize/--no-quantize', default=None, help='Check the INT8 graph (default: ONNX_QUANTIZE).')
+@click.option('--tolerance', default=0.05, show_default=True, help='Maximum absolute score difference.')
+@with_appcontext
+def compare_backends_command(model_names, samples_path, quantize, tolerance):
+    """Compare ONNX Runtime labels and scores with the PyTorch backend."""
+    from .services.onnx_backend import build_onnx_pipeline, compare_backends
+    from .utils import build_pipeline
+
+    samples = None
+    if samples_path:
+        samples = []
+        with open(samples_path, encoding='utf-8') as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                    line = item.get('text', '') if isinstance(item, dict) else str(item)
+                except ValueError:
+                    pass
+                samples.append(line)
+
+    if quantize is None:
+        quantize = current_app.config.get('ONNX_QUANTIZE', False)
+
+    failed = False
+    for name in model_names or ('classifier', 'fake'):
+        model_dir = os.path.join(current_app.root_path, 'models', name)
+        reference = build_pipeline(model_dir, 'torch')
+        candidate = build_onnx_pipeline(model_dir, quantize=quantize)
+        report = compare_backends(reference, candidate, samples, score_tolerance=tolerance)
+        failed = failed or not report['passed']
+        click.echo(
+            f"{name}: {'PASS' if report['passed'] else 'FAIL'} "
+            f"label_agreement={report['label_agreement']:.3f} "
+            f"max_abs_score_diff={report['max_abs_score_diff']:.4f} "
+            f"mean_abs_score_diff={report['mean_abs_score_diff']:.4f} "
+            f"samples={report['samples']}"
+        )
+        for m in report['mismatches']:
+            click.echo(f"  sample {m['index']}: torch={m['reference']} onnx={m['candidate']}")
+
+    if failed:
+        raise click.ClickException('ONNX backend does not match the PyTorch backend')
+
+
+@click.command('rebuild-near-dup-index')
+@with_appcontext
+def rebuild_near_dup_index_command():
+    """Rebuild the near-duplicate index from ArticleResult rows."""
+    from .services.near_duplicate import init_near_duplicate_index
+
+    if not current_app.config.get('NEAR_DUP_ENABLED', True):
+        raise click.ClickException('Near-duplicate index is disabled (NEAR_DUP_ENABLED=0)')
+    index = current_app.config.get('NEAR_DUP_INDEX')
+    if index is None:
+        count = init_near_duplicate_index(current_app, background=False).get_stats()['entries']
+    else:
+        count = index.rebuild_from_db()
+    click.echo(f'Indexed {count} articles')
+
+
+@click.command('train-cascade')
+@click.option('--threshold', default=None, type=float, help='Stage-1 confidence threshold to report coverage for.')
+@click.option('--max-rows', default=None, type=int, help='Most recent ArticleResult rows to train on.')
+@with_appcontext
+def train_cascade_command(threshold, max_rows):
+    """Train the cascade's first-stage model from ArticleResult rows."""
+    from .services.cascade import cascade_model_path, train_fast_model, training_data_from_db
+
+    threshold = threshold if threshold is not None else current_app.config.get('CASCADE_THRESHOLD', 0.9)
+    texts, labels = training_data_from_db(max_rows or current_app.config.get('CASCADE_TRAIN_MAX_ROWS', 50000))
+    click.echo(f'Training on {len(texts)} articles')
+    try:
+        model, report = train_fast_model(texts, labels, threshold=threshold)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    path = cascade_model_path(current_app)
+    model.save(path)
+    click.echo(f'Saved {path}')
+    if 'holdout_accuracy' in report:
+        stage1_acc = report['stage1_accuracy']
+        click.echo(f"Held-out accuracy {report['holdout_accuracy']:.3f}; "
+                   f"at threshold {threshold} stage 1 answers {report['stage1_coverage']:.1%} "
+                   f"with accuracy {stage1_acc:.3f}" if stage1_acc is not None else
+                   f"Held-out accuracy {report['holdout_accuracy']:.3f}; no held-out article reaches {threshold}")
+
+    cascade = current_app.config.get('CASCADE')
+    if cascade is not None:
+        cascade.fast_model = model
+
+
+@click.command('serve-inference')
+@click.option('--workers', default=None, type=int, help='Model processes (default: INFERENCE_SERVICE_WORKERS).')
+@click.option('--threads', default=None, type=int, help='torch intra-op threads per model process.')
+@click.option('--queue-size', default=None, type=int, help='Bounded request queue size.')
+@with_appcontext
+def serve_inference_command(workers, threads, queue_size):
+    """Run the out-of-process inference service (INFERENCE_SERVICE=connect)."""
+    from .services.inference_service import serve
+    from .utils import inference_service_settings
+
+    address, authkey, model_dirs = inference_service_settings(current_app)
+    os.makedirs(os.path.dirname(address), exist_ok=True)
+    click.echo(f'Serving {", ".join(model_dirs) or "no models"} on {address}')
+    serve(
+        address, authkey, model_dirs,
+        workers=workers or current_app.config.get('INFERENCE_SERVICE_WORKERS', 2),
+        queue_size=queue_size or current_app.config.get('INFERENCE_SERVICE_QUEUE_SIZE', 64),
+        torch_threads=threads or current_app.config.get('TORCH_INTRA_OP_THREADS')
+    )
+
+
+def register_cli(app):
+    """Attach the project's CLI commands to the Flask app."""
+    app.cli.add_command(classify_file_command)
+    app.cli.add_command(compare_backends_command)
+    app.cli.add_command(rebuild_near_dup_index_command)
+    app.cli.add_command(train_cascade_command)
+    app.cli.add_command(serve_inference_command)
@@ -18,3 +18,140 @@ class Config:
     DEFAULT_ADMIN_PASSWORD = os.environ.get('DEFAULT_ADMIN_PASSWORD', 'admin')
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
+
+    # Local model inference. Async loading is per worker: until a worker's models are
+    # ready its classify endpoints answer 503 and /healthz/ready reports that worker only
+    MODEL_LOAD_ASYNC = os.environ.get('MODEL_LOAD_ASYNC', '1') == '1'
+    # Load models in the gunicorn master before fork (set by gunicorn.conf.py)
+    MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', '0') == '1'
+    SAFETENSORS_MMAP = os.environ.get('SAFETENSORS_MMAP', '1') == '1'
+    TORCH_INTRA_OP_THREADS = int(os.environ['TORCH_INTRA_OP_THREADS']) if os.environ.get('TORCH_INTRA_OP_THREADS') else None
+    TORCH_INTER_OP_THREADS = int(os.environ['TORCH_INTER_OP_THREADS']) if os.environ.get('TORCH_INTER_OP_THREADS') else None
+    WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', '1') == '1'
+    WARMUP_SEQ_LENGTHS = [int(n) for n in os.environ.get('WARMUP_SEQ_LENGTHS', '32,128,512').split(',') if n.strip()]
+    WARMUP_BATCH_SIZES = [int(n) for n in os.environ.get('WARMUP_BATCH_SIZES', '1,8').split(',') if n.strip()]
+    INFERENCE_BATCHING = os.environ.get('INFERENCE_BATCHING', '1') == '1'
+    INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 16))
+    INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 5))
+    # Split batches into sub-batches of similar token length to cut padding
+    LENGTH_BUCKETING = os.environ.get('LENGTH_BUCKETING', '1') == '1'
+    LENGTH_BUCKET_MAX_TOKENS = int(os.environ.get('LENGTH_BUCKET_MAX_TOKENS', 4096))
+    # classify_article(): tokenize once for both models when their tokenizers match;
+    # with micro-batching on, short texts share one fused micro-batcher for both models
+    FUSED_INFERENCE = os.environ.get('FUSED_INFERENCE', '1') == '1'
+    # Opt-in PyTorch execution mode: SDPA attention, inference_mode and optional
+    # torch.compile ('default', 'reduce-overhead' or 'max-autotune'; empty = eager).
+    # Compiled graphs are built during warm-up, so keep WARMUP_ENABLED on
+    TORCH_OPTIMIZE = os.environ.get('TORCH_OPTIMIZE', '0') == '1'
+    TORCH_ATTENTION = os.environ.get('TORCH_ATTENTION', 'sdpa')
+    TORCH_COMPILE = os.environ.get('TORCH_COMPILE', '')
+    # 'torch' (default) or 'onnx' (requires optimum[onnxruntime])
+    INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch')
+    ONNX_QUANTIZE = os.environ.get('ONNX_QUANTIZE', '0') == '1'
+    ONNX_INTRA_OP_THREADS = int(os.environ['ONNX_INTRA_OP_THREADS']) if os.environ.get('ONNX_INTRA_OP_THREADS') else None
+    # Out-of-process inference: 'off', 'auto' (spawn the service) or 'connect'
+    INFERENCE_SERVICE = os.environ.get('INFERENCE_SERVICE', 'off')
+    INFERENCE_SERVICE_ADDRESS = os.environ.get('INFERENCE_SERVICE_ADDRESS')
+    INFERENCE_SERVICE_WORKERS = int(os.environ.get('INFERENCE_SERVICE_WORKERS', 2))
+    INFERENCE_SERVICE_QUEUE_SIZE = int(os.environ.get('INFERENCE_SERVICE_QUEUE_SIZE', 64))
+    INFERENCE_SERVICE_TIMEOUT = float(os.environ.get('INFERENCE_SERVICE_TIMEOUT', 30))
+    INFERENCE_SERVICE_CONNECT_TIMEOUT = float(os.environ.get('INFERENCE_SERVICE_CONNECT_TIMEOUT', 60))
+    # Long articles: 'mean', 'max', 'attention' or 'off' (plain truncation)
+    LONG_DOC_AGGREGATION = os.environ.get('LONG_DOC_AGGREGATION', 'mean')
+    LONG_DOC_MIN_CHARS = int(os.environ.get('LONG_DOC_MIN_CHARS', 2000))
+    LONG_DOC_WINDOW_TOKENS = int(os.environ.get('LONG_DOC_WINDOW_TOKENS', 512))
+    LONG_DOC_WINDOW_STRIDE = int(os.environ.get('LONG_DOC_WINDOW_STRIDE', 128))
+    LONG_DOC_MAX_WINDOWS = int(os.environ.get('LONG_DOC_MAX_WINDOWS', 16))
+    # Prediction cache in front of predict_category / predict_fake_news
+    PREDICTION_CACHE_ENABLED = os.environ.get('PREDICTION_CACHE_ENABLED', '1') == '1'
+    PREDICTION_CACHE_MAX_ENTRIES = int(os.environ.get('PREDICTION_CACHE_MAX_ENTRIES', 10000))
+    PREDICTION_CACHE_MAX_BYTES = int(os.environ.get('PREDICTION_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    PREDICTION_CACHE_TTL = int(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+    # Shared SQLite tier (defaults to <instance>/prediction_cache.sqlite3)
+    PREDICTION_STORE_ENABLED = os.environ.get('PREDICTION_STORE_ENABLED', '1') == '1'
+    PREDICTION_STORE_PATH = os.environ.get('PREDICTION_STORE_PATH')
+    PREDICTION_STORE_MAX_BYTES = int(os.environ.get('PREDICTION_STORE_MAX_BYTES', 256 * 1024 * 1024))
+    PREDICTION_STORE_TTL = int(os.environ.get('PREDICTION_STORE_TTL', 7 * 24 * 3600))
+    PREDICTION_STORE_WARM_START = int(os.environ.get('PREDICTION_STORE_WARM_START', 1000))
+    # Near-duplicate verdict reuse (MinHash + LSH over ArticleResult.article_text)
+    NEAR_DUP_ENABLED = os.environ.get('NEAR_DUP_ENABLED', '1') == '1'
+    NEAR_DUP_THRESHOLD = float(os.environ.get('NEAR_DUP_THRESHOLD', 0.85))
+    NEAR_DUP_NUM_PERM = int(os.environ.get('NEAR_DUP_NUM_PERM', 128))
+    NEAR_DUP_BANDS = int(os.environ.get('NEAR_DUP_BANDS', 16))
+    NEAR_DUP_MAX_ENTRIES = int(os.environ.get('NEAR_DUP_MAX_ENTRIES', 100000))
+    # Confidence cascade: TF-IDF + logistic regression answers fake/real when its
+    # confidence reaches the threshold, otherwise the transformer decides.
+    # Train with 'flask train-cascade' (defaults to <instance>/cascade_fake.pkl)
+    CASCADE_ENABLED = os.environ.get('CASCADE_ENABLED', '0') == '1'
+    CASCADE_THRESHOLD = float(os.environ.get('CASCADE_THRESHOLD', 0.9))
+    CASCADE_MODEL_PATH = os.environ.get('CASCADE_MODEL_PATH')
+    CASCADE_TRAIN_MAX_ROWS = int(os.environ.get('CASCADE_TRAIN_MAX_ROWS', 50000))
+
+    # Gemini response cache (keyed by article text, model and prompt version)
+    GEMINI_CACHE_ENABLED = os.environ.get('GEMINI_CACHE_ENABLED', '1') == '1'
+    GEMINI_CACHE_MAX_ENTRIES = int(os.environ.get('GEMINI_CACHE_MAX_ENTRIES', 2048))
+    GEMINI_CACHE_MAX_BYTES = int(os.environ.get('GEMINI_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    GEMINI_CACHE_TTL = int(os.environ.get('GEMINI_CACHE_TTL', 24 * 3600))
+    # Shared SQLite tier (defaults to <instance>/gemini_cache.sqlite3)
+    GEMINI_CACHE_STORE_ENABLED = os.environ.get('GEMINI_CACHE_STORE_ENABLED', '1') == '1'
+    GEMINI_CACHE_STORE_PATH = os.environ.get('GEMINI_CACHE_STORE_PATH')
+    GEMINI_CACHE_STORE_MAX_BYTES = int(os.environ.get('GEMINI_CACHE_STORE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Gemini requests run on a bounded thread pool, overlapping local inference
+    GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', 8))
+    GEMINI_MAX_QUEUED = int(os.environ.get('GEMINI_MAX_QUEUED', 8))
+    # How long a request waits for Gemini before answering with the local result
+    GEMINI_DEADLINE_SECONDS = float(os.environ.get('GEMINI_DEADLINE_SECONDS', 30))
+    # Hard per-call timeout, optional hedged second attempt after GEMINI_HEDGE_AFTER
+    # seconds (0 = off), and a circuit breaker that opens after consecutive failed or
+    # slow (> GEMINI_BREAKER_SLOW_SECONDS, 0 = off) calls and probes again after a reset period
+    GEMINI_CALL_TIMEOUT = float(os.environ.get('GEMINI_CALL_TIMEOUT', 20))
+    GEMINI_HEDGE_AFTER = float(os.environ.get('GEMINI_HEDGE_AFTER', 0))
+    GEMINI_BREAKER_FAILURES = int(os.environ.get('GEMINI_BREAKER_FAILURES', 5))
+    GEMINI_BREAKER_SLOW_SECONDS = float(os.environ.get('GEMINI_BREAKER_SLOW_SECONDS', 15))
+    GEMINI_BREAKER_RESET_SECONDS = float(os.environ.get('GEMINI_BREAKER_RESET_SECONDS', 30))
+    # Token bucket shared by all workers (SQLite, defaults to <instance>/gemini_rate_limit.sqlite3);
+    # 0 = off. Interactive calls queue ahead of bulk ones and may use the reserved part of the burst
+    GEMINI_RATE_LIMIT_PER_MINUTE = float(os.environ.get('GEMINI_RATE_LIMIT_PER_MINUTE', 0))
+    GEMINI_RATE_LIMIT_BURST = int(os.environ.get('GEMINI_RATE_LIMIT_BURST', 10))
+    GEMINI_RATE_LIMIT_BULK_RESERVE = float(os.environ.get('GEMINI_RATE_LIMIT_BULK_RESERVE', 0.2))
+    GEMINI_RATE_LIMIT_PATH = os.environ.get('GEMINI_RATE_LIMIT_PATH')
+    # Longest queue wait for a token before giving up (interactive falls back to ML-only)
+    GEMINI_RATE_LIMIT_INTERACTIVE_WAIT = float(os.environ.get('GEMINI_RATE_LIMIT_INTERACTIVE_WAIT', 5))
+    GEMINI_RATE_LIMIT_BULK_WAIT = float(os.environ.get('GEMINI_RATE_LIMIT_BULK_WAIT', 120))
+    # Gemini routing policy: verify when ML confidence (%) is below GEMINI_VERIFY_BELOW.
+    # Speculative routing (default) starts Gemini before the ML result so the round trip
+    # overlaps local inference; confident articles then do not wait for it, but their call
+    # is still made (and cached). Set 0 to spend calls only on low-confidence articles,
+    # at the cost of running Gemini after local inference instead of alongside it
+    GEMINI_ROUTING_POLICY = os.environ.get('GEMINI_ROUTING_POLICY')
+    GEMINI_VERIFY_BELOW = float(os.environ.get('GEMINI_VERIFY_BELOW', 80))
+    GEMINI_ROUTE_SPECULATIVE = os.environ.get('GEMINI_ROUTE_SPECULATIVE', '1') == '1'
+    GEMINI_ROUTE_MIN_CHARS = int(os.environ.get('GEMINI_ROUTE_MIN_CHARS', 0))
+    GEMINI_ROUTE_MAX_CHARS = int(os.environ.get('GEMINI_ROUTE_MAX_CHARS', 0))
+    # Global call budget, counted across workers in SQLite (defaults to
+    # <instance>/gemini_budget.sqlite3); 0 = unlimited. Over budget, requests get ML-only results
+    GEMINI_CALLS_PER_MINUTE = int(os.environ.get('GEMINI_CALLS_PER_MINUTE', 0))
+    GEMINI_CALLS_PER_DAY = int(os.environ.get('GEMINI_CALLS_PER_DAY', 0))
+    GEMINI_BUDGET_PATH = os.environ.get('GEMINI_BUDGET_PATH')
+    # Articles above this estimated token count are cut down to their most central
+    # sentences before the Gemini prompt is built (0 = send the full text)
+    GEMINI_PROMPT_MAX_TOKENS = int(os.environ.get('GEMINI_PROMPT_MAX_TOKENS', 4000))
+    # Output-token cap for the verdict-only JSON mode used by the comparison API.
+    # Gemini 2.5 thinking tokens count against it and the GenerativeModel client cannot
+    # turn thinking off, so the cap leaves room for them; calls that still hit it are
+    # logged and counted as max_tokens_finishes in the gemini_usage stats
+    GEMINI_VERDICT_MAX_OUTPUT_TOKENS = int(os.environ.get('GEMINI_VERDICT_MAX_OUTPUT_TOKENS', 1024))
+    # Batched multi-article verification for bulk jobs (sizes from a ~4 chars/token estimate)
+    GEMINI_BATCH_MAX_ITEMS = int(os.environ.get('GEMINI_BATCH_MAX_ITEMS', 20))
+    GEMINI_BATCH_MAX_TOKENS = int(os.environ.get('GEMINI_BATCH_MAX_TOKENS', 24000))
+    GEMINI_BATCH_ITEM_MAX_TOKENS = int(os.environ.get('GEMINI_BATCH_ITEM_MAX_TOKENS', 2000))
+    GEMINI_BATCH_MAX_RETRIES = int(os.environ.get('GEMINI_BATCH_MAX_RETRIES', 2))
+
+    # Bulk and streaming classification API
+    API_BATCH_MAX_ITEMS = int(os.environ.get('API_BATCH_MAX_ITEMS', 100))
+    STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 32))
+    STREAM_MAX_LINE_BYTES = int(os.environ.get('STREAM_MAX_LINE_BYTES', 1024 * 1024))
+    # Body limit for NDJSON streams (replaces MAX_CONTENT_LENGTH there); memory stays bounded
+    # by STREAM_CHUNK_SIZE, this caps how long one request can keep a worker busy
+    STREAM_MAX_CONTENT_LENGTH = int(os.environ.get('STREAM_MAX_CONTENT_LENGTH', 256 * 1024 * 1024))
@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify, current_app
+from .utils import model_readiness
+
+health_bp = Blueprint('health', __name__)
+
+
+@health_bp.route('/healthz/live')
+def live():
+    """Liveness probe: the process is up and serving requests."""
+    return jsonify({'status': 'ok'})
+
+
+@health_bp.route('/healthz/ready')
+def ready():
+    """
+    Readiness probe: 503 while the local models load and warm up, then 200
+    once every model is ready, or degraded (serving the models that loaded,
+    listing the missing / failed ones under 'unavailable'). 503 again only
+    if no model could be loaded at all.
+
+    Readiness is per process: with several gunicorn workers the probe reports
+    the worker that answered it. Use MODEL_PRELOAD (models load in the master
+    before fork, so every worker starts ready) when the probe must cover all
+    workers; otherwise workers still loading answer classify requests with 503.
+    """
+    readiness = model_readiness(current_app)
+    return jsonify(readiness), 200 if readiness['ready'] else 503
@@ -0,0 +1,133 @@
+"""
+Pre-fork model sharing for gunicorn.
+
+In preload mode the master process loads both transformers once; forked
+workers then share the read-only weight pages copy-on-write instead of each
+holding a private copy. Weights stored as safetensors are additionally
+memory-mapped, so their pages live in the page cache and are shared by every
+process on the node.
+"""
+import gc
+import json
+import logging
+import mmap
+import os
+
+import psutil
+import torch
+
+logger = logging.getLogger(__name__)
+
+_SAFETENSORS_DTYPES = {
+    'F64': torch.float64,
+    'F32': torch.float32,
+    'F16': torch.float16,
+    'BF16': torch.bfloat16,
+    'I64': torch.int64,
+    'I32': torch.int32,
+    'I16': torch.int16,
+    'I8': torch.int8,
+    'U8': torch.uint8,
+    'BOOL': torch.bool,
+}
+
+# Keep the mappings alive for as long as the tensors that view them
+_MAPPINGS = []
+
+
+def mmap_safetensors(path: str) -> dict:
+    """
+    Build a state dict whose tensors view a private (copy-on-write) mmap of a
+    .safetensors file instead of heap memory.
+    """
+    fh = open(path, 'rb')
+    mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_COPY)
+    _MAPPINGS.append((fh, mm))
+
+    header_len = int.from_bytes(mm[:8], 'little')
+    header = json.loads(mm[8:8 + header_len])
+    base = 8 + header_len
+
+    state = {}
+    for name, info in header.items():
+        if name == '__metadata__':
+            continue
+        start, end = info['data_offsets']
+        dtype = _SAFETENSORS_DTYPES[info['dtype']]
+        if end == start:
+            state[name] = torch.empty(info['shape'], dtype=dtype)
+            continue
+        tensor = torch.frombuffer(mm, dtype=dtype, count=(end - start) // dtype.itemsize, offset=base + start)
+        state[name] = tensor.reshape(info['shape'])
+    return state
+
+
+def mmap_model_weights(model, model_dir: str) -> bool:
+    """Swap a loaded model's parameters for mmap-backed tensors when safetensors weights exist."""
+    path = os.path.join(model_dir, 'model.safetensors')
+    if not os.path.exists(path):
+        return False
+    try:
+        state = mmap_safetensors(path)
+        result = model.load_state_dict(state, strict=False, assign=True)
+        if result.missing_keys:
+            logger.info(f'mmap weights for {model_dir}: {len(result.missing_keys)} parameters kept in memory')
+        return True
+    except Exception:
+        logger.exception(f'Could not memory-map weights in {model_dir}')
+        return False
+
+
+def prepare_for_fork(app) -> None:
+    """Freeze the loaded models so forked workers keep sharing their pages."""
+    for wrapper in (app.config.get('ML_MODELS') or {}).values():
+        model = getattr(getattr(wrapper, 'pipeline', None), 'model', None)
+        if isinstance(model, torch.nn.Module):
+            model.eval()
+            model.requires_grad_(False)
+    # Move all current objects to the permanent generation so the GC never
+    # writes to their headers (which would un-share the pages in workers)
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+
+def configure_torch_threads(intra_op: int = None, inter_op: int = None) -> None:
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            # Can only be set once per process, before any inter-op work
+            logger.warning('torch inter-op thread count already fixed for this process')
+
+
+def memory_report() -> dict:
+    """RSS / USS / PSS / shared memory of the current process in MB."""
+    proc = psutil.Process()
+    report = {'pid': proc.pid}
+    try:
+        info = proc.memory_full_info()
+        for field in ('rss', 'uss', 'pss', 'shared'):
+            value = getattr(info, field, None)
+            if value is not None:
+                report[f'{field}_mb'] = round(value / (1024 * 1024), 1)
+    except Exception:
+        report['rss_mb'] = round(proc.memory_info().rss / (1024 * 1024), 1)
+    return report
+
+
+def init_worker_process(app) -> None:
+    """Per-worker setup after fork: thread counts, fresh DB connections, RSS report."""
+    configure_torch_threads(
+        app.config.get('TORCH_INTRA_OP_THREADS'),
+        app.config.get('TORCH_INTER_OP_THREADS')
+    )
+
+    from .database import db
+    with app.app_context():
+        # Pooled connections opened by the master must not be shared across processes
+        db.engine.dispose()
+
+    logger.info(f'Worker started: {memory_report()}')
@@ -0,0 +1,128 @@
+"""
+Micro-batching inference service.
+Coalesces concurrent single-article predictions into one padded forward pass.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    In-process batching scheduler in front of a batch prediction function.
+
+    Requests submitted from different threads are gathered for at most
+    ``max_wait_ms`` (or until ``max_batch_size`` is reached), run through
+    ``batch_fn`` as a single batch, and each caller receives its own output.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = 'model'
+    ):
+        """
+        Args:
+            batch_fn: Function mapping a list of inputs to a list of outputs (same order)
+            max_batch_size: Maximum number of requests per forward pass
+            max_wait_ms: Maximum time to wait for more requests after the first one
+            name: Name used for the worker thread and logs
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        self.batches_run = 0
+        self.items_run = 0
+
+    def submit(self, item: Any) -> Future:
+        """Queue one input and return a future resolving to its output."""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Submit one input and block until its batch has been processed."""
+        return self.submit(item).result(timeout=timeout)
+
+    def get_stats(self) -> dict:
+        """
+        Get batching statistics.
+
+        Returns:
+            dict: Number of batches, items and the average batch size
+        """
+        return {
+            'batches_run': self.batches_run,
+            'items_run': self.items_run,
+            'avg_batch_size': (self.items_run / self.batches_run) if self.batches_run else 0.0,
+            'queue_depth': self._queue.qsize()
+        }
+
+    def _ensure_worker(self) -> None:
+        # Threads do not survive fork(), so this also restarts the worker in child processes
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name=f'microbatch-{self.name}',
+                    daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[tuple]) -> None:
+        # Skip callers that cancelled while waiting in the queue
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        items = [item for item, _ in batch]
+        try:
+            outputs = self.batch_fn(items)
+            if outputs is None or len(outputs) != len(items):
+                raise RuntimeError(
+                    f"Batch function returned {0 if outputs is None else len(outputs)} "
+                    f"outputs for {len(items)} inputs"
+                )
+        except Exception as e:
+            logger.exception(f"Micro-batch inference failed for {self.name}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.items_run += len(items)
+        for (_, future), output in zip(batch, outputs):
+            future.set_result(output)
@@ -0,0 +1,257 @@
+"""
+Bulk classification service.
+Runs article batches through both local models as tensor batches and
+persists the resulting ArticleResult rows with a single bulk insert.
+"""
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..database import db
+from ..utils import sanitize_text
+from .near_duplicate import find_near_duplicate, remember_results
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_article(item: Any) -> Tuple[Optional[Any], Optional[str], Optional[str]]:
+    """
+    Extract the client id and text from one batch item.
+
+    Args:
+        item: Either a plain string or a dict with 'text' and optional 'id'
+
+    Returns:
+        tuple: (client_id, text, error) where error is None for valid items;
+            text is sanitized like the single-article endpoints' input
+    """
+    client_id = None
+    text = item
+    if isinstance(item, dict):
+        client_id = item.get('id')
+        text = item.get('text')
+    if not isinstance(text, str) or not text.strip():
+        return client_id, None, 'text required'
+    return client_id, sanitize_text(text), None
+
+
+def classify_articles(
+    articles: List[Any],
+    comparison_service=None
+) -> List[Dict[str, Any]]:
+    """
+    Classify a list of articles with both local models in batched forward passes.
+
+    Args:
+        articles: Batch items (strings or {'id', 'text'} dicts)
+        comparison_service: Optional ClassificationComparisonService; when given,
+            the items are also verified with batched Gemini requests
+
+    Returns:
+        list: One result dict per input item, in input order. Invalid items
+            carry an 'error' and no predictions.
+    """
+    # Imported here to avoid a circular import with the classification blueprint
+    from ..classification import predict_category_batch, predict_fake_news_batch
+
+    results = []
+    valid_positions = []
+    valid_texts = []
+    for index, item in enumerate(articles):
+        client_id, text, error = normalize_article(item)
+        results.append({'index': index, 'id': client_id, 'error': error})
+        if error is not None:
+            continue
+        duplicate = find_near_duplicate(text)
+        if duplicate:
+            # Reuse the verdict of a near-identical article; skip the models and Gemini
+            results[index].update({
+                'text': text,
+                'category': duplicate.get('predicted_category'),
+                'category_confidence': float(duplicate.get('category_confidence') or 0.0),
+                'model_result': duplicate.get('fake_news_label'),
+                'model_confidence': float(duplicate.get('fake_confidence') or 0.0),
+                'gemini_result': duplicate.get('gemini_result'),
+                'final_displayed_result': duplicate.get('final_displayed_result') or duplicate.get('fake_news_label'),
+                'comparison_status': duplicate.get('comparison_status') or 'model_only',
+                'near_duplicate_similarity': duplicate.get('similarity'),
+            })
+            continue
+        valid_positions.append(index)
+        valid_texts.append(text)
+
+    if not valid_texts:
+        return results
+
+    categories = predict_category_batch(valid_texts)
+    fakes = predict_fake_news_batch(valid_texts)
+
+    for pos, text, (category, cat_conf), (fake_label, fake_conf) in zip(
+        valid_positions, valid_texts, categories, fakes
+    ):
+        result = results[pos]
+        result.update({
+            'text': text,
+            'category': category,
+            'category_confidence': float(cat_conf or 0.0),
+            'model_result': fake_label if fake_label in ('real', 'fake') else None,
+            'model_confidence': float(fake_conf or 0.0),
+            'gemini_result': None,
+            'final_displayed_result': fake_label,
+            'comparison_status': 'model_only',
+        })
+
+    if comparison_service is not None:
+        verify_results([results[pos] for pos in valid_positions], comparison_service)
+
+    return results
+
+
+def verify_results(results: List[Dict[str, Any]], comparison_service) -> List[Dict[str, Any]]:
+    """
+    Verify classified results with batched Gemini requests, updating them in place.
+
+    Items with an error or a reused near-duplicate verdict are left untouched.
+    """
+    items = [r for r in results if not r.get('error') and r.get('near_duplicate_similarity') is None]
+    if not items:
+        return results
+    try:
+        comparisons = comparison_service.classify_batch_with_comparison(
+            [(r['text'], r.get('model_result'), r.get('model_confidence') or 0.0) for r in items]
+        )
+    except Exception as e:
+        logger.warning(f"Gemini verification failed for {len(items)} batch items: {str(e)}")
+        return results
+    for result, comparison in zip(items, comparisons):
+        result['gemini_result'] = comparison.get('gemini_result')
+        result['final_displayed_result'] = comparison.get('final_displayed_result')
+        result['comparison_status'] = comparison.get('comparison_status')
+    return results
+
+
+def build_result_row(user_id: Optional[int], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a classification result to ArticleResult column values."""
+    return {
+        'user_id': user_id,
+        'article_text': result['text'],
+        'predicted_category': result.get('category'),
+        'fake_news_label': result.get('model_result'),
+        'category_confidence': result.get('category_confidence'),
+        'fake_confidence': result.get('model_confidence'),
+        'gemini_result': result.get('gemini_result'),
+        'final_displayed_result': result.get('final_displayed_result'),
+        'comparison_status': result.get('comparison_status'),
+        'timestamp': datetime.utcnow(),
+    }
+
+
+def bulk_save_results(rows: List[Dict[str, Any]]) -> int:
+    """
+    Persist ArticleResult rows with one executemany INSERT and one commit.
+
+    Args:
+        rows: Column dicts as produced by build_result_row
+
+    Returns:
+        int: Number of rows written
+    """
+    if not rows:
+        return 0
+
+    from ..models import ArticleResult
+
+    try:
+        db.session.bulk_insert_mappings(ArticleResult, rows)
+        db.session.commit()
+    except Exception:
+        logger.exception(f"Bulk insert of {len(rows)} article results failed")
+        db.session.rollback()
+        raise
+    remember_results(rows)
+    return len(rows)
+
+
+def iter_ndjson_articles(stream, max_line_bytes: int = 1024 * 1024):
+    """
+    Lazily parse newline-delimited JSON articles from a binary stream.
+
+    Yields:
+        Parsed items, or a {'_parse_error': ...} marker dict for malformed lines
+    """
+    while True:
+        raw = stream.readline(max_line_bytes + 1)
+        if not raw:
+            break
+        if len(raw) > max_line_bytes and not raw.endswith(b'\n'):
+            # Discard the remainder of an oversized line
+            while raw and not raw.endswith(b'\n'):
+                raw = stream.readline(max_line_bytes)
+            yield {'_parse_error': 'line too long'}
+            continue
+        line = raw.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield {'_parse_error': 'invalid JSON'}
+
+
+def stream_classify(
+    items,
+    chunk_size: int = 32,
+    user_id: Optional[int] = None,
+    comparison_service=None,
+    persist: bool = True
+):
+    """
+    Classify an iterable of articles in bounded-size chunks.
+
+    Only one chunk is held in memory at a time; results are yielded as soon
+    as their chunk has been classified (and persisted, when requested).
+
+    Yields:
+        dict: One result per input item, in input order
+    """
+    offset = 0
+    chunk = []
+
+    def flush(chunk, offset):
+        parse_errors = {}
+        articles = []
+        for i, item in enumerate(chunk):
+            if isinstance(item, dict) and '_parse_error' in item:
+                parse_errors[i] = item['_parse_error']
+                articles.append(None)
+            else:
+                articles.append(item)
+
+        results = classify_articles(articles, comparison_service=comparison_service)
+        for i, message in parse_errors.items():
+            results[i]['error'] = message
+
+        if persist:
+            rows = [build_result_row(user_id, r) for r in results if not r.get('error')]
+            try:
+                bulk_save_results(rows)
+            except Exception as e:
+                for r in results:
+                    if not r.get('error'):
+                        r['error'] = f'failed to save result: {str(e)}'
+
+        for r in results:
+            r['index'] += offset
+            r.pop('text', None)
+        return results
+
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield from flush(chunk, offset)
+            offset += len(chunk)
+            chunk = []
+
+    if chunk:
+        yield from flush(chunk, offset)
@@ -0,0 +1,203 @@
+"""
+Confidence cascade for fake-news detection.
+A hashed TF-IDF + logistic-regression model answers easy articles directly;
+only articles it is unsure about are escalated to the `fake` transformer.
+"""
+import logging
+import os
+import pickle
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+
+logger = logging.getLogger(__name__)
+
+LABELS = ('real', 'fake')
+
+
+class FastFakeNewsModel:
+    """Hashed word/bigram TF-IDF features with a logistic-regression head."""
+
+    def __init__(self, n_features: int = 2 ** 18):
+        self.pipeline = make_pipeline(
+            HashingVectorizer(n_features=n_features, ngram_range=(1, 2), alternate_sign=False, norm=None),
+            TfidfTransformer(),
+            LogisticRegression(max_iter=1000, class_weight='balanced')
+        )
+
+    def fit(self, texts: List[str], labels: List[str]) -> 'FastFakeNewsModel':
+        self.pipeline.fit(texts, labels)
+        return self
+
+    def predict_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        probs = self.pipeline.predict_proba(texts)
+        classes = self.pipeline.classes_
+        best = probs.argmax(axis=1)
+        return [(str(classes[i]), float(p[i])) for i, p in zip(best, probs)]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as fh:
+            pickle.dump(self, fh)
+
+    @staticmethod
+    def load(path: str) -> 'FastFakeNewsModel':
+        with open(path, 'rb') as fh:
+            return pickle.load(fh)
+
+
+def training_data_from_db(max_rows: int = 50000) -> Tuple[List[str], List[str]]:
+    """
+    Article texts and labels from ArticleResult rows (requires an app context).
+
+    The final displayed result (after Gemini comparison) is preferred over the
+    raw model label as the training target.
+    """
+    from ..models import ArticleResult
+
+    rows = (
+        ArticleResult.query
+        .with_entities(ArticleResult.article_text, ArticleResult.final_displayed_result, ArticleResult.fake_news_label)
+        .order_by(ArticleResult.timestamp.desc())
+        .limit(max_rows)
+        .all()
+    )
+    texts, labels = [], []
+    for text, final, raw in rows:
+        label = final if final in LABELS else raw
+        if text and label in LABELS:
+            texts.append(text)
+            labels.append(label)
+    return texts, labels
+
+
+def train_fast_model(texts: List[str], labels: List[str], threshold: float = 0.9,
+                     holdout: float = 0.1, seed: int = 0) -> Tuple[FastFakeNewsModel, dict]:
+    """
+    Train the first-stage model and report held-out accuracy and coverage.
+
+    Returns:
+        tuple: (model trained on all data, report dict)
+    """
+    if len(set(labels)) < 2:
+        raise ValueError('Need examples of both real and fake articles to train the cascade')
+
+    rng = np.random.RandomState(seed)
+    order = rng.permutation(len(texts))
+    n_test = int(len(texts) * holdout)
+    report = {'samples': len(texts), 'threshold': threshold}
+
+    if n_test:
+        test_idx, train_idx = order[:n_test], order[n_test:]
+        model = FastFakeNewsModel().fit([texts[i] for i in train_idx], [labels[i] for i in train_idx])
+        preds = model.predict_batch([texts[i] for i in test_idx])
+        truth = [labels[i] for i in test_idx]
+        confident = [(p, t) for (p, c), t in zip(preds, truth) if c >= threshold]
+        report.update({
+            'holdout_accuracy': float(np.mean([p == t for (p, _), t in zip(preds, truth)])),
+            'stage1_coverage': len(confident) / len(truth),
+            'stage1_accuracy': float(np.mean([p == t for p, t in confident])) if confident else None,
+        })
+
+    return FastFakeNewsModel().fit(texts, labels), report
+
+
+class ConfidenceCascade:
+    """Routes each article to the fast model or, below the margin, to the transformer."""
+
+    def __init__(self, fast_model: Optional[FastFakeNewsModel] = None, threshold: float = 0.9):
+        self.fast_model = fast_model
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.stage1_answered = 0
+        self.escalated = 0
+        self.stage1_time_ms = 0.0
+        self.stage2_time_ms = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.fast_model is not None
+
+    def predict(self, text: str, escalate: Callable[[str], Tuple]) -> Tuple:
+        return self.predict_batch([text], lambda texts: [escalate(t) for t in texts])[0]
+
+    def predict_batch(self, texts: List[str], escalate_batch: Callable[[List[str]], List[Tuple]]) -> List[Tuple]:
+        """
+        Args:
+            texts: Articles to classify
+            escalate_batch: Transformer path, called once with all uncertain articles
+
+        Returns:
+            list: (label, confidence) per article, in order
+        """
+        start = time.perf_counter()
+        fast = self.fast_model.predict_batch(list(texts))
+        stage1_ms = (time.perf_counter() - start) * 1000
+
+        out = [None] * len(fast)
+        uncertain = []
+        for i, (label, conf) in enumerate(fast):
+            if conf >= self.threshold:
+                out[i] = (label, conf)
+            else:
+                uncertain.append(i)
+
+        stage2_ms = 0.0
+        if uncertain:
+            start = time.perf_counter()
+            for i, result in zip(uncertain, escalate_batch([texts[i] for i in uncertain])):
+                out[i] = result
+            stage2_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.stage1_answered += len(fast) - len(uncertain)
+            self.escalated += len(uncertain)
+            self.stage1_time_ms += stage1_ms
+            self.stage2_time_ms += stage2_ms
+        return out
+
+    def get_stats(self) -> dict:
+        """
+        Get per-stage statistics.
+
+        Returns:
+            dict: Stage-1 hit rate and average latency of each stage per article
+        """
+        with self._lock:
+            total = self.stage1_answered + self.escalated
+            return {
+                'ready': self.ready,
+                'threshold': self.threshold,
+                'articles': total,
+                'stage1_answered': self.stage1_answered,
+                'escalated': self.escalated,
+                'stage1_hit_rate': (self.stage1_answered / total) if total else 0.0,
+                'stage1_avg_latency_ms': (self.stage1_time_ms / total) if total else 0.0,
+                'stage2_avg_latency_ms': (self.stage2_time_ms / self.escalated) if self.escalated else 0.0
+            }
+
+
+def init_cascade(app) -> Optional[ConfidenceCascade]:
+    """Load the trained first-stage model when cascade mode is enabled."""
+    if not app.config.get('CASCADE_ENABLED', False):
+        return None
+    cascade = ConfidenceCascade(threshold=app.config.get('CASCADE_THRESHOLD', 0.9))
+    path = cascade_model_path(app)
+    if os.path.exists(path):
+        try:
+            cascade.fast_model = FastFakeNewsModel.load(path)
+        except Exception:
+            logger.exception(f'Failed to load cascade model from {path}')
+    else:
+        logger.info(f"No cascade model at {path}; run 'flask train-cascade' to enable stage 1")
+    app.config['CASCADE'] = cascade
+    return cascade
+
+
+def cascade_model_path(app) -> str:
+    return app.config.get('CASCADE_MODEL_PATH') or os.path.join(app.instance_path, 'cascade_fake.pkl')
@@ -7,8 +7,10 @@ Implements comparison logic and applies decision rules based on result agreement
 
 import logging
 import time
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from .gemini_service import GeminiService
+from .gemini_executor import GeminiCall, start_gemini_call
+from .gemini_routing import get_routing_policy
 
 logger = logging.getLogger(__name__)
 
@@ -30,11 +32,48 @@ class ClassificationComparisonService:
             logger.warning(f"Gemini API not configured: {e}")
             self.gemini_service = None
     
+    def _route(self, article_text: str, confidence: Optional[float] = None):
+        # model confidences here are 0.0-1.0; the policy works in percent
+        return get_routing_policy().decide(
+            article_text, None if confidence is None else float(confidence) * 100,
+            cached=self.gemini_service.is_cached(article_text, verdict_only=True),
+            available=self.gemini_service.is_available()
+        )
+    
+    @staticmethod
+    def _wants_result(confidence: float) -> bool:
+        wants_result = getattr(get_routing_policy(), 'wants_result', None)
+        return wants_result is None or wants_result(float(confidence or 0.0) * 100)
+    
+    def start_verification(self, article_text: str) -> Optional[GeminiCall]:
+        """
+        Start the Gemini verification in the background so it overlaps local
+        inference, if the routing policy sends the article to Gemini before
+        its ML confidence is known.
+        
+        Returns:
+            GeminiCall to pass to classify_with_comparison (possibly a skipped
+            one carrying the routing reason), or None
+        """
+        if not self.gemini_service:
+            return None
+        try:
+            decision = self._route(article_text)
+            if not decision.call:
+                return GeminiCall.skipped(decision.reason)
+            call = start_gemini_call(self.gemini_service.verify_article, article_text)
+            call.reason = decision.reason
+            return call
+        except Exception as e:
+            logger.warning(f"Could not start Gemini verification: {e}")
+            return None
+    
     def classify_with_comparison(
         self,
         article_text: str,
         model_result: str,
-        model_confidence: float
+        model_confidence: float,
+        gemini_call: Optional[GeminiCall] = None
     ) -> Dict:
         """
         Performs dual classification: local ML model + Gemini API.
@@ -44,6 +83,8 @@ class ClassificationComparisonService:
             article_text: The news article text to classify
             model_result: Local ML model classification result ("real" or "fake")
             model_confidence: Confidence score from ML model (0.0-1.0)
+            gemini_call: Verification started earlier with start_verification();
+                joined under its deadline instead of calling Gemini here
         
         Returns:
             Dict containing:
@@ -80,9 +121,34 @@ class ClassificationComparisonService:
             )
             return response
         
+        # Ask the routing policy unless it already decided before local inference
+        if gemini_call is None or (not gemini_call.called and gemini_call.reason == 'deferred'):
+            decision = self._route(article_text, model_confidence)
+            response['processing_details']['gemini_routing'] = decision.reason
+            if decision.call:
+                # Still joined under GEMINI_DEADLINE_SECONDS like a speculative call
+                gemini_call = start_gemini_call(self.gemini_service.verify_article, article_text)
+                gemini_call.reason = decision.reason
+            else:
+                gemini_call = GeminiCall.skipped(decision.reason)
+        elif gemini_call.called and gemini_call.reason == 'speculative' and not self._wants_result(model_confidence):
+            # Confident ML result: do not wait for the speculative call (a call already running still fills the cache)
+            gemini_call.cancel()
+            gemini_call = GeminiCall.skipped('confident_ml')
+            response['processing_details']['gemini_routing'] = gemini_call.reason
+        else:
+            response['processing_details']['gemini_routing'] = gemini_call.reason
+        
+        if gemini_call is not None and not gemini_call.called:
+            logger.info(f"Gemini skipped by routing policy ({gemini_call.reason}), using ML model result only")
+            response['processing_details']['processing_time_ms'] = (
+                (time.time() - start_time) * 1000
+            )
+            return response
+        
         # Call Gemini API for secondary verification
         try:
-            gemini_result = self._get_gemini_classification(article_text)
+            gemini_result = self._get_gemini_classification(article_text, gemini_call)
             response['gemini_result'] = gemini_result
             
             # Apply comparison logic
@@ -113,19 +179,85 @@ class ClassificationComparisonService:
         
         return response
     
-    def _get_gemini_classification(self, article_text: str) -> Optional[str]:
+    def classify_batch_with_comparison(
+        self,
+        items: List[Tuple[str, str, float]]
+    ) -> List[Dict]:
+        """
+        classify_with_comparison for many articles, verified with batched
+        multi-article Gemini requests (for bulk and backfill jobs).
+        
+        Args:
+            items: (article_text, model_result, model_confidence) per article
+        
+        Returns:
+            list: One classify_with_comparison-style response per item, in order
+        """
+        start_time = time.time()
+        responses = []
+        routed = []
+        for index, (article_text, model_result, model_confidence) in enumerate(items):
+            responses.append({
+                'original_text': article_text,
+                'model_result': model_result,
+                'model_confidence': float(model_confidence or 0.0),
+                'gemini_result': None,
+                'final_displayed_result': model_result,
+                'comparison_status': 'model_only',
+                'processing_details': {
+                    'gemini_available': self.gemini_service is not None,
+                    'gemini_error': None,
+                    'processing_time_ms': 0
+                }
+            })
+            if not self.gemini_service:
+                continue
+            decision = self._route(article_text, model_confidence)
+            responses[index]['processing_details']['gemini_routing'] = decision.reason
+            if decision.call:
+                routed.append(index)
+        
+        verdicts = {}
+        if routed:
+            try:
+                verdicts = self.gemini_service.verify_batch([(str(i), items[i][0]) for i in routed])
+            except Exception as e:
+                logger.error(f"Batch Gemini verification error: {str(e)}", exc_info=True)
+        
+        for index in routed:
+            response = responses[index]
+            gemini_result = self._normalize_classification(verdicts.get(str(index)))
+            if gemini_result:
+                comparison_result = self._apply_comparison_logic(response['model_result'], gemini_result)
+                response['gemini_result'] = gemini_result
+                response['final_displayed_result'] = comparison_result['final_result']
+                response['comparison_status'] = comparison_result['status']
+            else:
+                response['gemini_result'] = 'ERROR'
+                response['processing_details']['gemini_error'] = 'No verdict for this article in the batched response'
+        
+        elapsed_ms = (time.time() - start_time) * 1000
+        for response in responses:
+            response['processing_details']['processing_time_ms'] = elapsed_ms
+        return responses
+    
+    def _get_gemini_classification(self, article_text: str, gemini_call: Optional[GeminiCall] = None) -> Optional[str]:
         """
         Calls Gemini API to classify article as 'real' or 'fake'.
         
         Args:
             article_text: The news article text
+            gemini_call: Background call to join instead of calling Gemini synchronously
         
         Returns:
             Normalized classification string ("real" or "fake") or None if error
         """
         try:
-            # Use existing Gemini service method
-            result = self.gemini_service.analyze_article_comprehensive(article_text)
+            # Only the verdict is compared: use the compact structured-output mode
+            if gemini_call is not None:
+                result = gemini_call.result()
+            else:
+                result = self.gemini_service.verify_article(article_text)
             
             if not result or 'verdict' not in result:
                 logger.warning("Invalid Gemini response format")
@@ -0,0 +1,141 @@
+"""
+Gemini response cache.
+Parsed Gemini responses keyed by normalized article text, model name and
+prompt template version, in an in-process LRU with an optional SQLite tier
+shared by all workers. Concurrent requests for the same article share one
+in-flight Gemini call (single-flight).
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from .prediction_cache import PredictionCache, make_cache_key
+from .prediction_store import PersistentPredictionStore, TieredPredictionCache
+
+logger = logging.getLogger(__name__)
+
+
+def gemini_cache_key(text: str, model_name: str, prompt_version: str) -> str:
+    return make_cache_key(text, f'gemini:{model_name}', prompt_version)
+
+
+class GeminiResponseCache:
+    """Tiered cache with single-flight computation of misses."""
+
+    def __init__(self, cache):
+        """
+        Args:
+            cache: PredictionCache or TieredPredictionCache holding the responses
+        """
+        self.cache = cache
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.coalesced = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self.cache.set(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], cacheable: Callable[[Any], bool] = None) -> Any:
+        """
+        Return the cached response for key, or compute it once.
+
+        Callers arriving while the same key is being computed wait for that
+        result instead of issuing their own request. Only results accepted by
+        cacheable (default: not None) are stored.
+        """
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            self.calls += 1
+            value = compute()
+            if value is not None and (cacheable is None or cacheable(value)):
+                self.cache.set(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get_stats(self) -> dict:
+        stats = self.cache.get_stats()
+        stats.update({'gemini_calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._inflight)})
+        return stats
+
+
+def build_gemini_cache(app) -> GeminiResponseCache:
+    """In-memory Gemini cache, backed by its own SQLite store when enabled."""
+    memory = PredictionCache(
+        max_entries=app.config.get('GEMINI_CACHE_MAX_ENTRIES', 2048),
+        max_bytes=app.config.get('GEMINI_CACHE_MAX_BYTES', 16 * 1024 * 1024),
+        ttl_seconds=app.config.get('GEMINI_CACHE_TTL', 24 * 3600)
+    )
+    store = None
+    if app.config.get('GEMINI_CACHE_STORE_ENABLED', True):
+        path = app.config.get('GEMINI_CACHE_STORE_PATH') or os.path.join(app.instance_path, 'gemini_cache.sqlite3')
+        try:
+            store = PersistentPredictionStore(
+                path,
+                max_bytes=app.config.get('GEMINI_CACHE_STORE_MAX_BYTES', 64 * 1024 * 1024),
+                ttl_seconds=app.config.get('GEMINI_CACHE_TTL', 24 * 3600)
+            )
+        except Exception:
+            logger.exception('Persistent Gemini cache unavailable, using in-memory cache only')
+    return GeminiResponseCache(TieredPredictionCache(memory, store))
+
+
+_fallback_cache = None
+_fallback_lock = threading.Lock()
+
+
+def get_gemini_cache() -> Optional[GeminiResponseCache]:
+    """
+    The app's Gemini cache (built on first use), or a process-wide in-memory
+    cache outside Flask. None when GEMINI_CACHE_ENABLED is off.
+    """
+    global _fallback_cache
+    try:
+        from flask import current_app, has_app_context
+    except ImportError:
+        has_app_context = lambda: False
+    try:
+        if has_app_context():
+            app = current_app._get_current_object()
+            if not app.config.get('GEMINI_CACHE_ENABLED', True):
+                return None
+            cache = app.config.get('GEMINI_CACHE')
+            if cache is None:
+                with _fallback_lock:
+                    cache = app.config.get('GEMINI_CACHE')
+                    if cache is None:
+                        cache = app.config['GEMINI_CACHE'] = build_gemini_cache(app)
+            return cache
+    except Exception:
+        logger.exception('Could not build the Gemini cache')
+    with _fallback_lock:
+        if _fallback_cache is None:
+            _fallback_cache = GeminiResponseCache(PredictionCache(max_entries=2048, ttl_seconds=24 * 3600))
+    return _fallback_cache
@@ -0,0 +1,134 @@
+"""
+Background execution of Gemini requests.
+A bounded thread pool lets callers start the Gemini round trip as soon as the
+article text is validated, run local inference meanwhile, and join the
+Gemini result under a deadline.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+DEFAULT_DEADLINE_SECONDS = 30.0
+
+_executor = None
+_executor_pid = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def config_value(key: str, default):
+    """App config value when running inside Flask, else default."""
+    try:
+        from flask import current_app, has_app_context
+        if has_app_context():
+            return current_app.config.get(key, default)
+    except ImportError:
+        pass
+    return default
+
+
+def _get_executor():
+    global _executor, _executor_pid, _slots
+    with _executor_lock:
+        # Pool threads do not survive fork(); build a fresh pool in each worker
+        if _executor is None or _executor_pid != os.getpid():
+            workers = max(1, int(config_value('GEMINI_MAX_CONCURRENCY', DEFAULT_WORKERS)))
+            queued = max(0, int(config_value('GEMINI_MAX_QUEUED', workers)))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gemini')
+            _slots = threading.BoundedSemaphore(workers + queued)
+            _executor_pid = os.getpid()
+        return _executor, _slots
+
+
+class GeminiCall:
+    """Handle on a Gemini request started with start_gemini_call()."""
+
+    def __init__(self, future: Optional[Future], deadline: float, reason: Optional[str] = None):
+        self.future = future
+        self.deadline = deadline
+        self.reason = reason
+        self.started_at = time.monotonic()
+
+    @classmethod
+    def skipped(cls, reason: str) -> 'GeminiCall':
+        """Handle for a request the routing policy decided not to make."""
+        return cls(None, time.monotonic(), reason)
+
+    @property
+    def called(self) -> bool:
+        return self.future is not None
+
+    def cancel(self) -> bool:
+        """Drop a call whose result is no longer needed; True if it had not started yet."""
+        return self.future is not None and self.future.cancel()
+
+    def result(self, default: Any = None) -> Any:
+        """The call's result, or default if it was skipped, failed or is still running at the deadline."""
+        if self.future is None:
+            return default
+        try:
+            return self.future.result(timeout=max(0.0, self.deadline - time.monotonic()))
+        except FutureTimeout:
+            logger.warning(f'Gemini call missed its deadline after {time.monotonic() - self.started_at:.1f}s; '
+                           'continuing with the local result')
+        except Exception as e:
+            logger.warning(f'Gemini call failed (non-blocking): {e}')
+        return default
+
+
+def start_gemini_call(fn: Callable, *args, timeout: Optional[float] = None,
+                      inline_when_full: bool = True, **kwargs) -> GeminiCall:
+    """
+    Run fn(*args, **kwargs) on the Gemini thread pool (inside the caller's
+    Flask app context) and return a handle to join it by the deadline.
+
+    When the pool and its queue are full the call runs inline instead, so
+    load never grows an unbounded backlog of outbound requests; with
+    inline_when_full=False it is skipped (reason 'saturated') instead.
+    """
+    if timeout is None:
+        timeout = float(config_value('GEMINI_DEADLINE_SECONDS', DEFAULT_DEADLINE_SECONDS))
+    deadline = time.monotonic() + timeout
+
+    app = None
+    try:
+        from flask import current_app, has_app_context
+        if has_app_context():
+            app = current_app._get_current_object()
+    except ImportError:
+        pass
+
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        if not inline_when_full:
+            return GeminiCall.skipped('saturated')
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return GeminiCall(future, deadline)
+
+    def run():
+        try:
+            if app is None:
+                return fn(*args, **kwargs)
+            with app.app_context():
+                return fn(*args, **kwargs)
+        finally:
+            slots.release()
+
+    try:
+        future = executor.submit(run)
+    except RuntimeError:
+        slots.release()
+        raise
+    # A call cancelled while queued never runs, so its slot is released here instead
+    future.add_done_callback(lambda f: f.cancelled() and slots.release())
+    return GeminiCall(future, deadline)
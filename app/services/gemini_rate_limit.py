@@ -0,0 +1,285 @@
+"""
+Token-bucket rate limiter for outbound Gemini calls, shared by all worker
+processes through a small SQLite database (no external services needed).
+
+Interactive requests take priority over bulk jobs: bulk callers wait while
+an interactive caller is queued and never take the last tokens of the burst
+reserved for interactive traffic. A 429 from Gemini drains the bucket so
+every process backs off together.
+
+SharedCallBudget keeps the routing policy's per-minute / per-day call
+budget in the same kind of database, so the budget is global too.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+
+# Longest sleep between attempts while queued
+POLL_INTERVAL_SECONDS = 0.25
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when a Gemini call waited longer than allowed for a token."""
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for Gemini quota errors (HTTP 429 / ResourceExhausted)."""
+    return type(error).__name__ in ('ResourceExhausted', 'TooManyRequests') or '429' in str(error)
+
+
+def _connection(local: threading.local, path: str) -> sqlite3.Connection:
+    # One autocommit connection per thread and per process (connections must not cross fork())
+    conn = getattr(local, 'conn', None)
+    if conn is None or getattr(local, 'pid', None) != os.getpid():
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        local.conn = conn
+        local.pid = os.getpid()
+    return conn
+
+
+class SharedTokenBucket:
+    """Cross-process token bucket with a priority queue (thread- and fork-safe)."""
+
+    def __init__(self, path: str, calls_per_minute: float, burst: int = 10, bulk_reserve: float = 0.2):
+        """
+        Args:
+            path: SQLite database shared by the workers
+            calls_per_minute: Sustained refill rate
+            burst: Bucket capacity
+            bulk_reserve: Fraction of the burst only interactive calls may use
+        """
+        self.path = path
+        self.rate = float(calls_per_minute) / 60.0
+        self.burst = max(1, int(burst))
+        self.bulk_floor = min(self.burst - 1, self.burst * float(bulk_reserve))
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            priority: {'acquired': 0, 'timeouts': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+            for priority in (INTERACTIVE, BULK)
+        }
+        self.throttled = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS bucket (id INTEGER PRIMARY KEY CHECK (id = 1), tokens REAL, updated REAL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS waiters (id TEXT PRIMARY KEY, priority TEXT, expires_at REAL)')
+        conn.execute('INSERT OR IGNORE INTO bucket (id, tokens, updated) VALUES (1, ?, ?)', (self.burst, time.time()))
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        return _connection(self._local, self.path)
+
+    def _try_take(self, priority: str) -> float:
+        """Take a token if allowed; returns 0.0 on success, else seconds to wait."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            tokens, updated = conn.execute('SELECT tokens, updated FROM bucket WHERE id = 1').fetchone()
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            floor = 0.0
+            if priority == BULK:
+                conn.execute('DELETE FROM waiters WHERE expires_at < ?', (now,))
+                if conn.execute('SELECT 1 FROM waiters WHERE priority = ? LIMIT 1', (INTERACTIVE,)).fetchone():
+                    conn.execute('UPDATE bucket SET tokens = ?, updated = ? WHERE id = 1', (tokens, now))
+                    conn.execute('COMMIT')
+                    return POLL_INTERVAL_SECONDS
+                floor = self.bulk_floor
+            if tokens - 1.0 >= floor:
+                conn.execute('UPDATE bucket SET tokens = ?, updated = ? WHERE id = 1', (tokens - 1.0, now))
+                conn.execute('COMMIT')
+                return 0.0
+            conn.execute('UPDATE bucket SET tokens = ?, updated = ? WHERE id = 1', (tokens, now))
+            conn.execute('COMMIT')
+            return (floor + 1.0 - tokens) / self.rate if self.rate > 0 else POLL_INTERVAL_SECONDS
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _set_waiting(self, waiter_id: str, priority: str, expires_at: Optional[float]) -> None:
+        conn = self._conn()
+        if expires_at is None:
+            conn.execute('DELETE FROM waiters WHERE id = ?', (waiter_id,))
+        else:
+            conn.execute('INSERT OR REPLACE INTO waiters (id, priority, expires_at) VALUES (?, ?, ?)',
+                         (waiter_id, priority, expires_at))
+
+    def acquire(self, priority: str = INTERACTIVE, max_wait: float = 5.0) -> float:
+        """
+        Wait for a token.
+
+        Returns:
+            float: Seconds spent queued
+
+        Raises:
+            RateLimitTimeout: No token within max_wait seconds
+        """
+        start = time.monotonic()
+        waiter_id = None
+        try:
+            while True:
+                delay = self._try_take(priority)
+                waited = time.monotonic() - start
+                if delay == 0.0:
+                    self._record(priority, waited)
+                    return waited
+                if waited + min(delay, POLL_INTERVAL_SECONDS) > max_wait:
+                    self._record(priority, waited, timed_out=True)
+                    raise RateLimitTimeout(f'No Gemini rate-limit token within {max_wait:.1f}s ({priority})')
+                if priority == INTERACTIVE:
+                    # Registered while queued so bulk callers in every process hold back
+                    waiter_id = waiter_id or uuid.uuid4().hex
+                    self._set_waiting(waiter_id, priority, time.time() + max_wait)
+                time.sleep(min(delay, POLL_INTERVAL_SECONDS))
+        finally:
+            if waiter_id is not None:
+                try:
+                    self._set_waiting(waiter_id, priority, None)
+                except sqlite3.Error:
+                    logger.warning('Could not clear the Gemini rate-limit waiter entry')
+
+    def try_acquire(self, priority: str = INTERACTIVE) -> bool:
+        """Take a token only if one is available right now (never waits)."""
+        if self._try_take(priority) != 0.0:
+            return False
+        self._record(priority, 0.0)
+        return True
+
+    def penalize(self) -> None:
+        """Drain the bucket after a 429 so every process backs off."""
+        conn = self._conn()
+        conn.execute('UPDATE bucket SET tokens = MIN(tokens, 0), updated = ? WHERE id = 1', (time.time(),))
+        self.throttled += 1
+
+    def _record(self, priority: str, waited: float, timed_out: bool = False) -> None:
+        with self._stats_lock:
+            stats = self._stats[priority]
+            stats['timeouts' if timed_out else 'acquired'] += 1
+            stats['wait_seconds'] += waited
+            stats['max_wait_seconds'] = max(stats['max_wait_seconds'], waited)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            queues = {}
+            for priority, stats in self._stats.items():
+                total = stats['acquired'] + stats['timeouts']
+                queues[priority] = {
+                    'acquired': stats['acquired'],
+                    'timeouts': stats['timeouts'],
+                    'avg_wait_ms': (stats['wait_seconds'] / total * 1000) if total else 0.0,
+                    'max_wait_ms': stats['max_wait_seconds'] * 1000
+                }
+        tokens = None
+        try:
+            row = self._conn().execute('SELECT tokens, updated FROM bucket WHERE id = 1').fetchone()
+            tokens = round(min(self.burst, row[0] + max(0.0, time.time() - row[1]) * self.rate), 2)
+        except sqlite3.Error:
+            pass
+        return {
+            'calls_per_minute': self.rate * 60,
+            'burst': self.burst,
+            'tokens': tokens,
+            'throttled_429': self.throttled,
+            'queues': queues
+        }
+
+
+class SharedCallBudget:
+    """Per-minute and per-day Gemini call budget counted across all processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS minute_calls (ts REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_minute_calls_ts ON minute_calls (ts)')
+        conn.execute('CREATE TABLE IF NOT EXISTS day_calls (day TEXT PRIMARY KEY, calls INTEGER NOT NULL)')
+
+    def _conn(self) -> sqlite3.Connection:
+        return _connection(self._local, self.path)
+
+    def reserve(self, calls_per_minute: int, calls_per_day: int) -> Optional[str]:
+        """Count one call; returns the exhausted budget's name ('budget_day' / 'budget_minute') instead if any."""
+        now = time.time()
+        today = time.strftime('%Y-%m-%d', time.gmtime(now))
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM minute_calls WHERE ts <= ?', (now - 60,))
+            row = conn.execute('SELECT calls FROM day_calls WHERE day = ?', (today,)).fetchone()
+            day_calls = row[0] if row else 0
+            minute_calls = conn.execute('SELECT COUNT(*) FROM minute_calls').fetchone()[0]
+            exhausted = None
+            if calls_per_day and day_calls >= calls_per_day:
+                exhausted = 'budget_day'
+            elif calls_per_minute and minute_calls >= calls_per_minute:
+                exhausted = 'budget_minute'
+            else:
+                conn.execute('INSERT INTO minute_calls (ts) VALUES (?)', (now,))
+                conn.execute(
+                    'INSERT INTO day_calls (day, calls) VALUES (?, 1) '
+                    'ON CONFLICT(day) DO UPDATE SET calls = calls + 1', (today,)
+                )
+                conn.execute('DELETE FROM day_calls WHERE day < ?', (today,))
+            conn.execute('COMMIT')
+            return exhausted
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def counts(self) -> Tuple[int, int]:
+        """(calls in the last minute, calls today) across all processes."""
+        now = time.time()
+        today = time.strftime('%Y-%m-%d', time.gmtime(now))
+        conn = self._conn()
+        minute_calls = conn.execute('SELECT COUNT(*) FROM minute_calls WHERE ts > ?', (now - 60,)).fetchone()[0]
+        row = conn.execute('SELECT calls FROM day_calls WHERE day = ?', (today,)).fetchone()
+        return minute_calls, row[0] if row else 0
+
+
+def build_rate_limiter(app) -> Optional[SharedTokenBucket]:
+    if not app.config.get('GEMINI_RATE_LIMIT_PER_MINUTE'):
+        return None
+    path = app.config.get('GEMINI_RATE_LIMIT_PATH') or os.path.join(app.instance_path, 'gemini_rate_limit.sqlite3')
+    try:
+        return SharedTokenBucket(
+            path,
+            calls_per_minute=app.config['GEMINI_RATE_LIMIT_PER_MINUTE'],
+            burst=app.config.get('GEMINI_RATE_LIMIT_BURST', 10),
+            bulk_reserve=app.config.get('GEMINI_RATE_LIMIT_BULK_RESERVE', 0.2)
+        )
+    except Exception:
+        logger.exception('Gemini rate limiter unavailable, calls are not rate limited')
+        return None
+
+
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[SharedTokenBucket]:
+    """The app's shared rate limiter (built on first use); None when disabled or outside Flask."""
+    try:
+        from flask import current_app, has_app_context
+    except ImportError:
+        return None
+    if not has_app_context():
+        return None
+    app = current_app._get_current_object()
+    if 'GEMINI_RATE_LIMITER' not in app.config:
+        with _limiter_lock:
+            if 'GEMINI_RATE_LIMITER' not in app.config:
+                app.config['GEMINI_RATE_LIMITER'] = build_rate_limiter(app)
+    return app.config['GEMINI_RATE_LIMITER']
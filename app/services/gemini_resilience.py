@@ -0,0 +1,347 @@
+"""
+Resilience layer around the Gemini client.
+Every generate_content call gets a hard deadline, optionally a hedged second
+attempt when the first is slow, and goes through a per-process circuit
+breaker. After repeated failures or slow calls the breaker opens and calls
+fail fast (callers fall back to ML-only results) until a half-open probe
+succeeds. Calls are admitted by the shared Gemini rate limiter first.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional, Tuple
+
+from .gemini_executor import config_value
+from .gemini_rate_limit import BULK, INTERACTIVE, get_rate_limiter, is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALL_TIMEOUT = 20.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+class AttemptsExhaustedError(RuntimeError):
+    """Raised when every Gemini attempt slot is held by a call that has not returned yet."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing (thread-safe, per process)."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, slow_call_seconds: float = 0.0,
+                 reset_seconds: float = 30.0, half_open_probes: int = 1):
+        """
+        Args:
+            failure_threshold: Consecutive failed or slow calls that open the breaker
+            slow_call_seconds: Successful calls slower than this count as failures (0 = off)
+            reset_seconds: How long the breaker stays open before probing again
+            half_open_probes: Concurrent probe calls allowed while half-open
+        """
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.slow_call_seconds = float(slow_call_seconds)
+        self.reset_seconds = float(reset_seconds)
+        self.half_open_probes = max(1, int(half_open_probes))
+
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._consecutive = 0
+        self._probes = 0
+
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+        self.timeouts = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _open(self) -> None:
+        if self.state != self.OPEN:
+            self.times_opened += 1
+            logger.warning(f'Gemini circuit breaker opened after {self._consecutive} consecutive failures; '
+                           f'probing again in {self.reset_seconds:.0f}s')
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+
+    def available(self) -> bool:
+        """False while open and not yet due for a probe (does not change state)."""
+        with self._lock:
+            return self.state != self.OPEN or time.monotonic() - self._opened_at >= self.reset_seconds
+
+    def allow(self) -> bool:
+        """Reserve a call; False means short-circuit without calling Gemini."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    self.short_circuited += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probes = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self.short_circuited += 1
+                    return False
+                self._probes += 1
+            self.calls += 1
+            return True
+
+    def record(self, ok: bool, latency: float) -> None:
+        """Report the outcome of a call admitted by allow()."""
+        slow = ok and self.slow_call_seconds > 0 and latency > self.slow_call_seconds
+        failed = not ok or slow
+        with self._lock:
+            if not ok:
+                self.failures += 1
+            if slow:
+                self.slow_calls += 1
+            self._consecutive = self._consecutive + 1 if failed else 0
+            if self.state == self.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if failed:
+                    self._open()
+                else:
+                    logger.info('Gemini circuit breaker closed after a successful probe')
+                    self.state = self.CLOSED
+            elif failed and self._consecutive >= self.failure_threshold:
+                self._open()
+
+    def count(self, event: str) -> None:
+        """Increment one of the timeouts / hedged / hedge_wins counters."""
+        if event not in ('timeouts', 'hedged', 'hedge_wins'):
+            raise ValueError(f'Unknown circuit breaker counter: {event}')
+        with self._lock:
+            setattr(self, event, getattr(self, event) + 1)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+            return {
+                'state': self.state,
+                'consecutive_failures': self._consecutive,
+                'retry_in_seconds': round(retry_in, 1),
+                'calls': self.calls,
+                'failures': self.failures,
+                'slow_calls': self.slow_calls,
+                'short_circuited': self.short_circuited,
+                'times_opened': self.times_opened,
+                'timeouts': self.timeouts,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins
+            }
+
+
+def build_circuit_breaker(app) -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_threshold=app.config.get('GEMINI_BREAKER_FAILURES', 5),
+        slow_call_seconds=app.config.get('GEMINI_BREAKER_SLOW_SECONDS', 0),
+        reset_seconds=app.config.get('GEMINI_BREAKER_RESET_SECONDS', 30)
+    )
+
+
+_default_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """The app's circuit breaker (built on first use), or a default breaker outside Flask."""
+    global _default_breaker
+    try:
+        from flask import current_app, has_app_context
+    except ImportError:
+        has_app_context = lambda: False
+    if has_app_context():
+        app = current_app._get_current_object()
+        breaker = app.config.get('GEMINI_BREAKER')
+        if breaker is None:
+            with _breaker_lock:
+                breaker = app.config.get('GEMINI_BREAKER')
+                if breaker is None:
+                    breaker = app.config['GEMINI_BREAKER'] = build_circuit_breaker(app)
+        return breaker
+    with _breaker_lock:
+        if _default_breaker is None:
+            _default_breaker = CircuitBreaker()
+    return _default_breaker
+
+
+_attempts = None
+_attempt_slots = None
+_attempts_pid = None
+_attempts_lock = threading.Lock()
+
+
+def _attempt_pool() -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    global _attempts, _attempt_slots, _attempts_pid
+    with _attempts_lock:
+        if _attempts is None or _attempts_pid != os.getpid():
+            workers = 2 * max(1, int(config_value('GEMINI_MAX_CONCURRENCY', 8)))
+            _attempts = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gemini-attempt')
+            _attempt_slots = threading.BoundedSemaphore(workers)
+            _attempts_pid = os.getpid()
+        return _attempts, _attempt_slots
+
+
+def _submit_attempt(fn, args, kwargs, admit: Optional[Callable[[], bool]] = None) -> Optional[Future]:
+    """
+    Start one attempt if an attempt slot is free (and admit(), when given,
+    agrees once the slot is reserved), else None.
+
+    A slot is held until the attempt really returns, not until its caller
+    gives up: timed-out attempts cannot be interrupted, so during a brown-out
+    hung attempts would otherwise queue new calls behind them. They end when
+    the client's request_options timeout (GEMINI_CALL_TIMEOUT) fires.
+    """
+    pool, slots = _attempt_pool()
+    if not slots.acquire(blocking=False):
+        return None
+    try:
+        if admit is not None and not admit():
+            slots.release()
+            return None
+        future = pool.submit(fn, *args, **kwargs)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda f: slots.release())
+    return future
+
+
+class ResilientGenerativeModel:
+    """
+    Drop-in wrapper for genai.GenerativeModel whose generate_content() has a
+    hard timeout (GEMINI_CALL_TIMEOUT), an optional hedged second attempt
+    (GEMINI_HEDGE_AFTER seconds, only when a rate-limit token is free at once)
+    and goes through the circuit breaker. At most 2 * GEMINI_MAX_CONCURRENCY
+    attempts run at once per process; calls beyond that fail fast with
+    AttemptsExhaustedError (counted as breaker failures).
+
+    Pass priority='bulk' for batch jobs; calls default to interactive
+    priority with the shared rate limiter.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def generate_content(self, *args, priority: str = INTERACTIVE, **kwargs) -> Any:
+        breaker = get_circuit_breaker()
+        if not breaker.available():
+            breaker.allow()  # counts the short-circuit
+            raise CircuitOpenError('Gemini circuit breaker is open')
+
+        limiter = get_rate_limiter()
+        if limiter is not None:
+            max_wait = config_value(
+                'GEMINI_RATE_LIMIT_BULK_WAIT' if priority == BULK else 'GEMINI_RATE_LIMIT_INTERACTIVE_WAIT',
+                120.0 if priority == BULK else 5.0
+            )
+            waited = limiter.acquire(priority, float(max_wait))
+            if waited > 0.5:
+                logger.info(f'Gemini {priority} call queued {waited * 1000:.0f}ms for a rate-limit token')
+
+        if not breaker.allow():
+            raise CircuitOpenError('Gemini circuit breaker is open')
+
+        timeout = float(config_value('GEMINI_CALL_TIMEOUT', DEFAULT_CALL_TIMEOUT))
+        hedge_after = float(config_value('GEMINI_HEDGE_AFTER', 0))
+        if kwargs.get('stream'):
+            # Only the first chunk is awaited here; a second stream would duplicate output
+            hedge_after = 0
+        if timeout > 0:
+            # Lets the client drop the underlying request too, not just stop waiting
+            kwargs.setdefault('request_options', {'timeout': timeout})
+
+        start = time.monotonic()
+        ok = False
+        try:
+            response = self._call(breaker, limiter, priority, args, kwargs, timeout, hedge_after)
+            ok = True
+            return response
+        except Exception as e:
+            if limiter is not None and is_rate_limit_error(e):
+                limiter.penalize()
+            raise
+        finally:
+            breaker.record(ok, time.monotonic() - start)
+
+    @staticmethod
+    def _hedge_token(limiter, priority: str) -> bool:
+        """Take a rate-limit token for a hedged attempt without waiting; False skips the hedge."""
+        if limiter is None:
+            return True
+        try:
+            if limiter.try_acquire(priority):
+                return True
+        except sqlite3.Error:
+            logger.warning('Gemini rate limiter unavailable, not hedging')
+            return False
+        logger.debug(f'No spare Gemini rate-limit token, not hedging the {priority} call')
+        return False
+
+    def _call(self, breaker: CircuitBreaker, limiter, priority: str, args, kwargs,
+              timeout: float, hedge_after: float) -> Any:
+        started = time.monotonic()
+        deadline = started + timeout if timeout > 0 else None
+        first = _submit_attempt(self.model.generate_content, args, kwargs)
+        if first is None:
+            raise AttemptsExhaustedError('All Gemini attempt slots are held by calls that have not returned')
+        pending = {first}
+        hedge_at = started + hedge_after if hedge_after > 0 else None
+        error = None
+
+        while pending:
+            now = time.monotonic()
+            wait_until = min(t for t in (deadline, hedge_at) if t is not None) if (deadline or hedge_at) else None
+            done, pending = wait(pending, timeout=None if wait_until is None else max(0.0, wait_until - now),
+                                 return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is not first:
+                    breaker.count('hedge_wins')
+                for other in pending:
+                    other.cancel()
+                return response
+
+            now = time.monotonic()
+            if error is not None and is_rate_limit_error(error):
+                # Hedging a 429 only burns more quota
+                hedge_at = None
+            if hedge_at is not None and (error is not None or now >= hedge_at) \
+                    and (deadline is None or now < deadline):
+                # First attempt failed or is slow: race a second one against it,
+                # but only if the rate limiter has a token to spare right now
+                hedge_at = None
+                hedge = _submit_attempt(self.model.generate_content, args, kwargs,
+                                        admit=lambda: self._hedge_token(limiter, priority))
+                if hedge is not None:
+                    breaker.count('hedged')
+                    pending.add(hedge)
+                    continue
+            if deadline is not None and now >= deadline and pending:
+                for other in pending:
+                    other.cancel()
+                breaker.count('timeouts')
+                raise TimeoutError(f'Gemini call exceeded its {timeout:.1f}s deadline')
+
+        raise error
@@ -0,0 +1,209 @@
+"""
+Gemini routing policy.
+One place that decides whether an article goes to Gemini: cached responses
+are always used, an open circuit breaker, confidence bands and text length
+gate new calls, and a per-minute / per-day call budget (shared by all worker
+processes) degrades gracefully to ML-only results.
+Every decision is counted by reason.
+
+The policy is pluggable: set app.config['GEMINI_ROUTING'] to any object with
+decide() and get_stats() (optionally wants_result()), or GEMINI_ROUTING_POLICY to the import path of a
+GeminiRoutingPolicy subclass.
+"""
+import logging
+import threading
+import time
+from collections import Counter, deque
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingDecision(NamedTuple):
+    call: bool
+    reason: str
+
+
+class GeminiRoutingPolicy:
+    """Confidence-band, length and budget based routing (thread-safe, per process)."""
+
+    def __init__(
+        self,
+        verify_below: float = 80.0,
+        speculative: bool = False,
+        min_chars: int = 0,
+        max_chars: int = 0,
+        calls_per_minute: int = 0,
+        calls_per_day: int = 0,
+        budget_store=None
+    ):
+        """
+        Args:
+            verify_below: Call Gemini when the ML confidence (percent) is below this
+            speculative: Start Gemini before the ML confidence is known so it
+                overlaps local inference; confident articles then skip waiting
+                for it (see wants_result), but the call is still spent
+            min_chars: Skip articles shorter than this (0 = no limit)
+            max_chars: Skip articles longer than this (0 = no limit)
+            calls_per_minute: New Gemini calls allowed per minute (0 = unlimited)
+            calls_per_day: New Gemini calls allowed per calendar day (0 = unlimited)
+            budget_store: SharedCallBudget counting the budget across processes;
+                None counts it in this process only
+        """
+        self.verify_below = float(verify_below)
+        self.speculative = speculative
+        self.min_chars = int(min_chars)
+        self.max_chars = int(max_chars)
+        self.calls_per_minute = int(calls_per_minute)
+        self.calls_per_day = int(calls_per_day)
+        self.budget_store = budget_store
+
+        self._lock = threading.Lock()
+        self._minute = deque()
+        self._day = None
+        self._day_calls = 0
+        self.decisions = Counter()
+
+    def _reserve_budget(self) -> Optional[str]:
+        """Count one call against the budget; returns the exhausted budget's name instead if any."""
+        if self.budget_store is not None:
+            try:
+                return self.budget_store.reserve(self.calls_per_minute, self.calls_per_day)
+            except Exception:
+                logger.exception('Shared Gemini call budget unavailable, counting in this process')
+        now = time.time()
+        today = time.strftime('%Y-%m-%d', time.gmtime(now))
+        if self._day != today:
+            self._day, self._day_calls = today, 0
+        while self._minute and self._minute[0] <= now - 60:
+            self._minute.popleft()
+        if self.calls_per_day and self._day_calls >= self.calls_per_day:
+            return 'budget_day'
+        if self.calls_per_minute and len(self._minute) >= self.calls_per_minute:
+            return 'budget_minute'
+        self._day_calls += 1
+        self._minute.append(now)
+        return None
+
+    def decide(self, text: str, confidence: Optional[float] = None, cached: bool = False,
+               explicit: bool = False, available: bool = True) -> RoutingDecision:
+        """
+        Decide whether to call Gemini for an article.
+
+        Args:
+            text: Article text
+            confidence: ML confidence in percent (0-100), or None before local inference
+            cached: A Gemini response for this article is already cached
+            explicit: The user asked for the Gemini explanation (skips the confidence bands)
+            available: False while the Gemini circuit breaker is open
+
+        Returns:
+            RoutingDecision: (call, reason)
+        """
+        with self._lock:
+            if cached:
+                decision = RoutingDecision(True, 'cache_hit')
+            elif not available:
+                decision = RoutingDecision(False, 'circuit_open')
+            elif self.min_chars and len(text or '') < self.min_chars:
+                decision = RoutingDecision(False, 'too_short')
+            elif self.max_chars and len(text or '') > self.max_chars:
+                decision = RoutingDecision(False, 'too_long')
+            elif not explicit and confidence is None and not self.speculative:
+                decision = RoutingDecision(False, 'deferred')
+            elif not explicit and confidence is not None and confidence >= self.verify_below:
+                decision = RoutingDecision(False, 'confident_ml')
+            else:
+                exhausted = self._reserve_budget()
+                if exhausted:
+                    decision = RoutingDecision(False, exhausted)
+                elif explicit:
+                    decision = RoutingDecision(True, 'explicit')
+                elif confidence is None:
+                    decision = RoutingDecision(True, 'speculative')
+                else:
+                    decision = RoutingDecision(True, 'low_confidence')
+            self.decisions[decision.reason] += 1
+        return decision
+
+    def wants_result(self, confidence: Optional[float]) -> bool:
+        """
+        After a speculative start: whether the ML confidence (percent) still
+        calls for the Gemini result. Confident articles do not wait for it.
+        """
+        return confidence is None or confidence < self.verify_below
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            called = sum(n for r, n in self.decisions.items() if r in ('cache_hit', 'explicit', 'speculative', 'low_confidence'))
+            final = sum(n for r, n in self.decisions.items() if r != 'deferred')
+            calls_last_minute, calls_today = len(self._minute), self._day_calls
+        if self.budget_store is not None:
+            try:
+                calls_last_minute, calls_today = self.budget_store.counts()
+            except Exception:
+                pass
+        with self._lock:
+            return {
+                'verify_below': self.verify_below,
+                'speculative': self.speculative,
+                'decisions': dict(self.decisions),
+                'gemini_rate': (called / final) if final else 0.0,
+                'calls_last_minute': calls_last_minute,
+                'calls_today': calls_today,
+                'budget_shared': self.budget_store is not None,
+                'calls_per_minute': self.calls_per_minute or None,
+                'calls_per_day': self.calls_per_day or None
+            }
+
+
+def build_routing_policy(app):
+    policy_cls = GeminiRoutingPolicy
+    if app.config.get('GEMINI_ROUTING_POLICY'):
+        from werkzeug.utils import import_string
+        policy_cls = import_string(app.config['GEMINI_ROUTING_POLICY'])
+    budget_store = None
+    if app.config.get('GEMINI_CALLS_PER_MINUTE') or app.config.get('GEMINI_CALLS_PER_DAY'):
+        # The budget is global: count it in a database every worker shares
+        import os
+        from .gemini_rate_limit import SharedCallBudget
+        path = app.config.get('GEMINI_BUDGET_PATH') or os.path.join(app.instance_path, 'gemini_budget.sqlite3')
+        try:
+            budget_store = SharedCallBudget(path)
+        except Exception:
+            logger.exception('Shared Gemini call budget unavailable, counting per process')
+    return policy_cls(
+        verify_below=app.config.get('GEMINI_VERIFY_BELOW', 80.0),
+        speculative=app.config.get('GEMINI_ROUTE_SPECULATIVE', True),
+        min_chars=app.config.get('GEMINI_ROUTE_MIN_CHARS', 0),
+        max_chars=app.config.get('GEMINI_ROUTE_MAX_CHARS', 0),
+        calls_per_minute=app.config.get('GEMINI_CALLS_PER_MINUTE', 0),
+        calls_per_day=app.config.get('GEMINI_CALLS_PER_DAY', 0),
+        budget_store=budget_store
+    )
+
+
+_default_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_routing_policy():
+    """The app's routing policy (built on first use), or a default policy outside Flask."""
+    global _default_policy
+    try:
+        from flask import current_app, has_app_context
+    except ImportError:
+        has_app_context = lambda: False
+    if has_app_context():
+        app = current_app._get_current_object()
+        policy = app.config.get('GEMINI_ROUTING')
+        if policy is None:
+            with _policy_lock:
+                policy = app.config.get('GEMINI_ROUTING')
+                if policy is None:
+                    policy = app.config['GEMINI_ROUTING'] = build_routing_policy(app)
+        return policy
+    with _policy_lock:
+        if _default_policy is None:
+            _default_policy = GeminiRoutingPolicy()
+    return _default_policy
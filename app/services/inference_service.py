@@ -0,0 +1,428 @@
+"""
+Out-of-process inference service.
+
+A pool of model-owning processes runs the transformer forward passes so slow
+inference never holds the GIL of the web workers. Web workers tokenize
+locally, place the token matrices in a shared-memory block and send a small
+control message over a Unix socket; a model process writes the class
+probabilities back into the same block.
+
+Back-pressure: the request queue feeding the model processes is bounded. When
+it is full the service answers 'overloaded' immediately and the client backs
+off and retries until its deadline expires.
+"""
+import atexit
+import fcntl
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from .batch_inference import MicroBatcher
+from .length_buckets import PaddingStats, plan_buckets
+from .long_document import AGGREGATIONS, aggregate_window_probs, window_encodings
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceOverloaded(RuntimeError):
+    """The inference service queue stayed full until the request deadline."""
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # The creating process owns the block; don't let this process's tracker unlink it
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    return shm
+
+
+# ---------------------------------------------------------------------------
+# Server side
+# ---------------------------------------------------------------------------
+
+def _model_worker(requests, results, model_dirs: Dict[str, str], torch_threads: Optional[int]) -> None:
+    from transformers import AutoModelForSequenceClassification
+
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+    models = {}
+    for name, model_dir in model_dirs.items():
+        try:
+            model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+            model.eval()
+            model.requires_grad_(False)
+            models[name] = model
+        except Exception:
+            logger.exception(f'Inference worker failed to load {name} model')
+
+    while True:
+        conn_id, msg = requests.get()
+        reply = {'req_id': msg['req_id']}
+        shm = None
+        try:
+            model = models[msg['model']]
+            n, length = msg['shape']
+            shm = _attach(msg['shm'])
+            tokens = np.ndarray((2, n, length), dtype=np.int64, buffer=shm.buf)
+            with torch.inference_mode():
+                logits = model(
+                    input_ids=torch.from_numpy(tokens[0].copy()),
+                    attention_mask=torch.from_numpy(tokens[1].copy())
+                ).logits
+            probs = F.softmax(logits.float(), dim=-1).numpy()
+            out = np.ndarray(probs.shape, dtype=np.float32, buffer=shm.buf, offset=tokens.nbytes)
+            out[:] = probs
+            reply['ok'] = True
+        except Exception as e:
+            logger.exception('Inference worker request failed')
+            reply['error'] = str(e)
+        finally:
+            if shm is not None:
+                shm.close()
+        results.put((conn_id, reply))
+
+
+def serve(address: str, authkey: bytes, model_dirs: Dict[str, str], workers: int = 2,
+          queue_size: int = 64, torch_threads: Optional[int] = None) -> None:
+    """Run the inference service until the process is terminated."""
+    if os.path.exists(address) and _service_alive(address, authkey):
+        # Never steal the socket of a live service (it would be orphaned with its models)
+        logger.warning(f'An inference service already answers on {address}; not starting another')
+        return
+    ctx = multiprocessing.get_context('spawn')
+    requests = ctx.Queue(maxsize=queue_size)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_model_worker, args=(requests, results, model_dirs, torch_threads),
+                    name=f'inference-worker-{i}', daemon=True)
+        for i in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    if os.path.exists(address):
+        os.unlink(address)
+    listener = Listener(address, family='AF_UNIX', authkey=authkey)
+    connections = {}
+    connections_lock = threading.Lock()
+
+    def send(conn_id, reply):
+        with connections_lock:
+            entry = connections.get(conn_id)
+        if entry is None:
+            return
+        conn, send_lock = entry
+        try:
+            with send_lock:
+                conn.send(reply)
+        except Exception:
+            logger.warning(f'Inference client {conn_id} went away')
+
+    def route_results():
+        while True:
+            conn_id, reply = results.get()
+            send(conn_id, reply)
+
+    def serve_connection(conn_id, conn):
+        try:
+            while True:
+                msg = conn.recv()
+                if msg.get('op') == 'ping':
+                    send(conn_id, {'req_id': msg['req_id'], 'ok': True,
+                                   'workers': sum(p.is_alive() for p in procs)})
+                    continue
+                try:
+                    requests.put_nowait((conn_id, msg))
+                except queue.Full:
+                    send(conn_id, {'req_id': msg['req_id'], 'error': 'overloaded'})
+        except (EOFError, OSError):
+            pass
+        finally:
+            with connections_lock:
+                connections.pop(conn_id, None)
+            conn.close()
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    if threading.current_thread() is threading.main_thread():
+        # Terminating the service must take its model processes down with it
+        signal.signal(signal.SIGTERM, stop)
+
+    threading.Thread(target=route_results, name='inference-results', daemon=True).start()
+    logger.info(f'Inference service listening on {address} with {workers} workers')
+    try:
+        for conn_id in itertools.count():
+            try:
+                conn = listener.accept()
+            except Exception:
+                logger.exception('Inference service failed to accept a connection')
+                continue
+            with connections_lock:
+                connections[conn_id] = (conn, threading.Lock())
+            threading.Thread(target=serve_connection, args=(conn_id, conn), daemon=True).start()
+    finally:
+        for p in procs:
+            p.terminate()
+        listener.close()
+
+
+def _service_alive(address: str, authkey: bytes, timeout: float = 1.0) -> bool:
+    client = InferenceClient(address, authkey)
+    try:
+        return client.ping(timeout=timeout)
+    finally:
+        client.close()
+
+
+def start_inference_service(address: str, authkey: bytes, model_dirs: Dict[str, str],
+                            startup_timeout: float = 30.0, **kwargs):
+    """
+    Start serve() in a child process unless a service already answers on address.
+
+    Check-and-spawn runs under an exclusive lock on '<address>.lock', held until
+    the new service answers, so workers booting together start only one service.
+    """
+    with open(address + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if _service_alive(address, authkey):
+                return None
+            ctx = multiprocessing.get_context('spawn')
+            # Not daemonic: the service spawns its own worker processes
+            proc = ctx.Process(target=serve, args=(address, authkey, model_dirs), kwargs=kwargs,
+                               name='inference-service', daemon=False)
+            proc.start()
+            atexit.register(proc.terminate)
+            deadline = time.monotonic() + startup_timeout
+            while proc.is_alive() and time.monotonic() < deadline:
+                if os.path.exists(address) and _service_alive(address, authkey, timeout=0.5):
+                    break
+                time.sleep(0.1)
+            else:
+                logger.warning(f'Inference service did not answer on {address} within {startup_timeout:.0f}s')
+            return proc
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# ---------------------------------------------------------------------------
+# Client side
+# ---------------------------------------------------------------------------
+
+class InferenceClient:
+    """Thread-safe client; reconnects after fork and multiplexes requests on one socket."""
+
+    def __init__(self, address: str, authkey: bytes, timeout: float = 30.0):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._pending = {}
+        self._ids = itertools.count()
+
+        self.overloaded = 0
+
+    def _connection(self):
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+                self._pid = os.getpid()
+                self._pending = {}
+                threading.Thread(target=self._receive, args=(self._conn,),
+                                 name='inference-client', daemon=True).start()
+            return self._conn
+
+    def _receive(self, conn) -> None:
+        try:
+            while True:
+                reply = conn.recv()
+                future = self._pending.pop(reply.get('req_id'), None)
+                if future is not None:
+                    future.set_result(reply)
+        except (EOFError, OSError):
+            with self._lock:
+                if self._conn is conn:
+                    self._conn = None
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError('inference service connection lost'))
+
+    def _request(self, msg: dict, timeout: float) -> dict:
+        conn = self._connection()
+        msg['req_id'] = next(self._ids)
+        future = Future()
+        self._pending[msg['req_id']] = future
+        with self._lock:
+            conn.send(msg)
+        try:
+            return future.result(timeout=timeout)
+        finally:
+            self._pending.pop(msg['req_id'], None)
+
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def ping(self, timeout: float = 2.0) -> bool:
+        try:
+            return bool(self._request({'op': 'ping'}, timeout).get('ok'))
+        except Exception:
+            return False
+
+    def run(self, model: str, input_ids: np.ndarray, attention_mask: np.ndarray, num_labels: int) -> np.ndarray:
+        """Run one padded batch remotely and return its (n, num_labels) probabilities."""
+        n, length = input_ids.shape
+        token_bytes = 2 * n * length * 8
+        shm = shared_memory.SharedMemory(create=True, size=token_bytes + n * num_labels * 4)
+        try:
+            tokens = np.ndarray((2, n, length), dtype=np.int64, buffer=shm.buf)
+            tokens[0] = input_ids
+            tokens[1] = attention_mask
+
+            deadline = time.monotonic() + self.timeout
+            backoff = 0.005
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise InferenceOverloaded('inference service queue full')
+                reply = self._request({'op': 'predict', 'model': model, 'shm': shm.name,
+                                       'shape': (n, length)}, remaining)
+                if reply.get('error') == 'overloaded':
+                    self.overloaded += 1
+                    time.sleep(min(backoff, max(0.0, deadline - time.monotonic())))
+                    backoff = min(backoff * 2, 0.2)
+                    continue
+                if reply.get('error'):
+                    raise RuntimeError(f"inference service error: {reply['error']}")
+                break
+
+            probs = np.ndarray((n, num_labels), dtype=np.float32, buffer=shm.buf, offset=token_bytes)
+            return probs.copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+class RemotePipeline:
+    """Callable with the text-classification pipeline call convention (used by LIME)."""
+
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+        self.tokenizer = wrapper.tokenizer
+
+    def __call__(self, texts, return_all_scores=True, **kwargs):
+        if isinstance(texts, str):
+            return [self.wrapper.predict_batch([texts])[0]]
+        return self.wrapper.predict_batch(list(texts))
+
+
+class RemoteModelWrapper:
+    """SimpleModelWrapper counterpart that delegates forward passes to the inference service."""
+
+    def __init__(self, client: InferenceClient, model_dir: str, name: str, model_version=None,
+                 batching=True, max_batch_size=16, max_wait_ms=5.0, long_doc_aggregation='mean',
+                 long_doc_min_chars=2000, window_tokens=512, window_stride=128, max_windows=16,
+                 length_bucketing=True, max_batch_tokens=4096):
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.client = client
+        self.name = name
+        self.model_version = model_version
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        config = AutoConfig.from_pretrained(model_dir)
+        self.id2label = config.id2label
+        self.num_labels = config.num_labels
+        self.long_doc_aggregation = long_doc_aggregation if long_doc_aggregation in AGGREGATIONS else None
+        self.long_doc_min_chars = long_doc_min_chars
+        self.window_tokens = window_tokens
+        self.window_stride = window_stride
+        self.max_windows = max_windows
+        self.length_bucketing = length_bucketing
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.padding = PaddingStats()
+        self.pipeline = RemotePipeline(self)
+        self.batcher = None
+        if batching:
+            self.batcher = MicroBatcher(self.predict_batch, max_batch_size=max_batch_size,
+                                        max_wait_ms=max_wait_ms, name=name)
+
+    def predict(self, text: str):
+        return None
+
+    def is_long(self, text: str) -> bool:
+        return bool(self.long_doc_aggregation) and len(text) >= self.long_doc_min_chars
+
+    def _rows(self, text: str) -> List[List[int]]:
+        if self.is_long(text):
+            enc = window_encodings(self.tokenizer, text, self.window_tokens, self.window_stride, self.max_windows)
+            return [ids[mask.bool()].tolist() for ids, mask in zip(enc['input_ids'], enc['attention_mask'])]
+        return [self.tokenizer(text, truncation=True, max_length=self.window_tokens)['input_ids']]
+
+    def _run_rows(self, rows: List[List[int]]) -> np.ndarray:
+        length = max(len(r) for r in rows)
+        pad_id = self.tokenizer.pad_token_id or 0
+        input_ids = np.full((len(rows), length), pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(rows), length), dtype=np.int64)
+        for i, r in enumerate(rows):
+            input_ids[i, :len(r)] = r
+            attention_mask[i, :len(r)] = 1
+        return self.client.run(self.name, input_ids, attention_mask, self.num_labels)
+
+    def predict_batch(self, texts):
+        """Tokenize locally, run remote forward passes (one per length bucket), and return label scores per text."""
+        texts = list(texts)
+        if not texts:
+            return []
+        rows, spans = [], []
+        for t in texts:
+            r = self._rows(t)
+            spans.append((len(rows), len(rows) + len(r)))
+            rows.extend(r)
+
+        if self.length_bucketing:
+            lengths = [len(r) for r in rows]
+            probs = np.empty((len(rows), self.num_labels), dtype=np.float32)
+            for group in plan_buckets(lengths, self.max_batch_size, self.max_batch_tokens):
+                self.padding.record([lengths[j] for j in group])
+                probs[group] = self._run_rows([rows[j] for j in group])
+            probs = torch.from_numpy(probs)
+        else:
+            probs = torch.from_numpy(self._run_rows(rows))
+        out = []
+        for start, end in spans:
+            combined = aggregate_window_probs(probs[start:end], self.long_doc_aggregation or 'mean')
+            out.append([
+                {'label': self.id2label.get(i, f'LABEL_{i}'), 'score': float(s)}
+                for i, s in enumerate(combined.tolist())
+            ])
+        return out
+
+    def predict_scores(self, text: str):
+        if self.batcher is not None:
+            return self.batcher.predict(text)
+        return self.predict_batch([text])[0]
@@ -0,0 +1,78 @@
+"""
+Length-bucketed batch scheduling.
+Inputs are ordered by tokenized length and split into sub-batches under a
+padded-token budget, so short articles are not padded up to the longest
+article in the same request. Callers restore the original order.
+"""
+import threading
+from collections import deque
+from typing import List, Sequence
+
+
+def plan_buckets(lengths: Sequence[int], max_batch_size: int = 16, max_batch_tokens: int = 4096,
+                 min_efficiency: float = 0.5) -> List[List[int]]:
+    """
+    Group input indices into sub-batches of similar length.
+
+    Args:
+        lengths: Token count of each input
+        max_batch_size: Maximum inputs per sub-batch
+        max_batch_tokens: Maximum padded tokens (longest length * size) per sub-batch
+        min_efficiency: Start a new sub-batch rather than drop below this padding efficiency
+
+    Returns:
+        list: Lists of input indices, shortest inputs first
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets, current, real = [], [], 0
+    for i in order:
+        # Sorted ascending, so lengths[i] is the padded length if i joins the bucket
+        padded = max(1, lengths[i]) * (len(current) + 1)
+        if current and (len(current) >= max_batch_size or padded > max_batch_tokens
+                        or (real + lengths[i]) / padded < min_efficiency):
+            buckets.append(current)
+            current, real = [], 0
+        current.append(i)
+        real += lengths[i]
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def padding_efficiency(lengths: Sequence[int]) -> float:
+    """Real tokens / total tokens when the inputs are padded to the longest one."""
+    if not lengths:
+        return 1.0
+    total = max(lengths) * len(lengths)
+    return (sum(lengths) / total) if total else 1.0
+
+
+class PaddingStats:
+    """Thread-safe per-batch padding efficiency counters."""
+
+    def __init__(self, history: int = 50):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=history)
+        self.batches = 0
+        self.real_tokens = 0
+        self.total_tokens = 0
+
+    def record(self, lengths: Sequence[int]) -> float:
+        efficiency = padding_efficiency(lengths)
+        with self._lock:
+            self.batches += 1
+            self.real_tokens += sum(lengths)
+            self.total_tokens += max(lengths) * len(lengths) if lengths else 0
+            self._recent.append({'size': len(lengths), 'max_tokens': max(lengths) if lengths else 0,
+                                 'efficiency': round(efficiency, 4)})
+        return efficiency
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'real_tokens': self.real_tokens,
+                'total_tokens': self.total_tokens,
+                'padding_efficiency': (self.real_tokens / self.total_tokens) if self.total_tokens else 1.0,
+                'recent_batches': list(self._recent)
+            }
@@ -0,0 +1,130 @@
+"""
+Sliding-window inference for long articles.
+Splits text into overlapping token windows, scores all windows in a single
+forward pass and combines them into one label distribution.
+"""
+import logging
+from typing import Dict, List
+
+import torch
+import torch.nn.functional as F
+
+logger = logging.getLogger(__name__)
+
+AGGREGATIONS = ('mean', 'max', 'attention')
+
+
+def window_encodings(tokenizer, text: str, window_tokens: int, stride: int, max_windows: int) -> Dict[str, torch.Tensor]:
+    """
+    Tokenize text into overlapping windows of at most window_tokens tokens.
+
+    When the article yields more than max_windows windows, evenly spaced
+    windows are kept so the forward pass cost stays bounded.
+    """
+    window_tokens = min(window_tokens, getattr(tokenizer, 'model_max_length', window_tokens) or window_tokens)
+    stride = min(stride, window_tokens // 2)
+    enc = tokenizer(
+        text,
+        truncation=True,
+        max_length=window_tokens,
+        stride=stride,
+        return_overflowing_tokens=True,
+        padding=True,
+        return_tensors='pt'
+    )
+    enc = {k: v for k, v in enc.items() if k in ('input_ids', 'attention_mask', 'token_type_ids')}
+
+    n = enc['input_ids'].shape[0]
+    if n > max_windows:
+        keep = torch.linspace(0, n - 1, max_windows).round().long()
+        enc = {k: v[keep] for k, v in enc.items()}
+    return enc
+
+
+def aggregate_window_probs(probs: torch.Tensor, method: str = 'mean') -> torch.Tensor:
+    """
+    Combine per-window class probabilities (windows x labels) into one distribution.
+
+    Args:
+        probs: Softmax probabilities for each window
+        method: 'mean', 'max' (per-label max, renormalized) or 'attention'
+            (windows weighted by how confident they are)
+    """
+    if probs.shape[0] == 1:
+        return probs[0]
+    if method == 'max':
+        combined = probs.max(dim=0).values
+        return combined / combined.sum()
+    if method == 'attention':
+        # Confident windows carry the signal; near-uniform windows are mostly filler
+        confidence = probs.max(dim=1).values
+        weights = F.softmax(confidence * probs.shape[1], dim=0)
+        return (weights.unsqueeze(1) * probs).sum(dim=0)
+    return probs.mean(dim=0)
+
+
+def windowed_scores(
+    pipeline,
+    text: str,
+    window_tokens: int = 512,
+    stride: int = 128,
+    max_windows: int = 16,
+    aggregation: str = 'mean'
+) -> List[Dict[str, float]]:
+    """
+    Score a long article with a text-classification pipeline's model.
+
+    Returns:
+        list: [{'label', 'score'}, ...] in the same format as
+            pipeline(text, return_all_scores=True)
+    """
+    enc = window_encodings(pipeline.tokenizer, text, window_tokens, stride, max_windows)
+    return encoded_scores(pipeline.model, enc, aggregation)
+
+
+def encoded_scores(model, enc: Dict[str, torch.Tensor], aggregation: str = 'mean') -> List[Dict[str, float]]:
+    """
+    Score already-tokenized input (one row, or one row per window) with a model.
+
+    Returns:
+        list: [{'label', 'score'}, ...] for the combined distribution
+    """
+    combined = aggregate_window_probs(_forward_probs(model, enc), aggregation)
+    return _label_scores(model, combined.tolist())
+
+
+def encoded_batch_scores(model, enc: Dict[str, torch.Tensor]) -> List[List[Dict[str, float]]]:
+    """Label scores of each row of a padded batch of independent inputs (one forward pass)."""
+    return [_label_scores(model, row) for row in _forward_probs(model, enc).tolist()]
+
+
+def pad_encodings(tokenizer, enc, rows: List[int]) -> Dict[str, torch.Tensor]:
+    """
+    Pad selected rows of an unpadded batch encoding into model-ready tensors,
+    so inputs tokenized once for length bucketing are not tokenized again.
+    """
+    width = max(len(enc['input_ids'][i]) for i in rows)
+    fill = {'input_ids': tokenizer.pad_token_id or 0, 'attention_mask': 0, 'token_type_ids': 0}
+    left = getattr(tokenizer, 'padding_side', 'right') == 'left'
+    padded = {}
+    for key in ('input_ids', 'attention_mask', 'token_type_ids'):
+        if key not in enc:
+            continue
+        data = []
+        for i in rows:
+            seq = list(enc[key][i])
+            pad = [fill[key]] * (width - len(seq))
+            data.append(pad + seq if left else seq + pad)
+        padded[key] = torch.tensor(data, dtype=torch.long)
+    return padded
+
+
+def _forward_probs(model, enc: Dict[str, torch.Tensor]) -> torch.Tensor:
+    with torch.inference_mode():
+        logits = model(**enc).logits
+    return F.softmax(torch.as_tensor(logits).float(), dim=-1)
+
+
+def _label_scores(model, probs: List[float]) -> List[Dict[str, float]]:
+    id2label = model.config.id2label
+    return [{'label': id2label.get(i, f'LABEL_{i}'), 'score': float(score)} for i, score in enumerate(probs)]
@@ -0,0 +1,295 @@
+"""
+Near-duplicate article index.
+MinHash signatures over word shingles with LSH banding, so re-submitted wire
+stories with small edits can reuse a previously stored verdict instead of
+running the models and Gemini again.
+"""
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# ArticleResult columns carried along with each indexed article
+VERDICT_FIELDS = (
+    'predicted_category',
+    'category_confidence',
+    'fake_news_label',
+    'fake_confidence',
+    'gemini_result',
+    'final_displayed_result',
+    'comparison_status',
+)
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Lower-cased word n-grams of the article text."""
+    words = _WORD_RE.findall((text or '').lower())
+    if len(words) < size:
+        return [' '.join(words)] if words else []
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def verdict_from_result(result: Any) -> Dict[str, Any]:
+    """Extract the verdict fields from an ArticleResult instance or column dict."""
+    if isinstance(result, dict):
+        return {f: result.get(f) for f in VERDICT_FIELDS}
+    return {f: getattr(result, f, None) for f in VERDICT_FIELDS}
+
+
+class NearDuplicateIndex:
+    """Thread-safe MinHash/LSH index mapping article signatures to verdicts."""
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        bands: int = 16,
+        threshold: float = 0.85,
+        max_entries: int = 100000,
+        shingle_size: int = 3,
+        min_shingles: int = 10,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError('num_perm must be divisible by bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+        self._entries = OrderedDict()  # doc key -> (signature, verdict)
+        self._buckets = [dict() for _ in range(bands)]  # band -> {band hash: set(doc keys)}
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._pending = None  # adds made while a rebuild runs, replayed before the swap
+
+        self.ready = False
+        self.lookups = 0
+        self.matches = 0
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of the article, or None if it is too short to compare."""
+        grams = set(shingles(text, self.shingle_size))
+        if len(grams) < self.min_shingles:
+            return None
+        hv = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=4).digest(), 'little') for g in grams),
+            dtype=np.uint64,
+            count=len(grams)
+        )
+        phv = ((np.outer(hv, self._a) + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return phv.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray) -> List[bytes]:
+        return [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, text: str, verdict: Dict[str, Any]) -> bool:
+        """Index an article with its verdict. Returns False if it is too short to index."""
+        sig = self.signature(text)
+        if sig is None:
+            return False
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((sig, verdict))
+            self._insert(sig, verdict)
+        return True
+
+    def _insert(self, sig: np.ndarray, verdict: Dict[str, Any]) -> None:
+        doc_key = hashlib.sha1(sig.tobytes()).hexdigest()
+        with self._lock:
+            if doc_key in self._entries:
+                self._entries.move_to_end(doc_key)
+                self._entries[doc_key] = (sig, verdict)
+                return
+            self._entries[doc_key] = (sig, verdict)
+            for band, key in enumerate(self._band_keys(sig)):
+                self._buckets[band].setdefault(key, set()).add(doc_key)
+            while len(self._entries) > self.max_entries:
+                self._remove(*self._entries.popitem(last=False))
+
+    def _remove(self, doc_key: str, entry) -> None:
+        sig, _ = entry
+        for band, key in enumerate(self._band_keys(sig)):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(doc_key)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def lookup(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the most similar indexed article above the threshold.
+
+        Returns:
+            dict: The stored verdict plus 'similarity', or None
+        """
+        sig = self.signature(text)
+        if sig is None:
+            return None
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for band, key in enumerate(self._band_keys(sig)):
+                candidates.update(self._buckets[band].get(key, ()))
+            best, best_sim = None, 0.0
+            for doc_key in candidates:
+                cand_sig, verdict = self._entries[doc_key]
+                sim = float(np.count_nonzero(cand_sig == sig)) / self.num_perm
+                if sim > best_sim:
+                    best, best_sim = verdict, sim
+            if best is None or best_sim < self.threshold:
+                return None
+            self.matches += 1
+        match = dict(best)
+        match['similarity'] = best_sim
+        return match
+
+    def rebuild(self, rows: Iterable[Any]) -> int:
+        """Replace the index contents with (article_text, verdict source) rows."""
+        with self._rebuild_lock:
+            fresh = NearDuplicateIndex(
+                num_perm=self.num_perm, bands=self.bands, threshold=self.threshold,
+                max_entries=self.max_entries, shingle_size=self.shingle_size,
+                min_shingles=self.min_shingles
+            )
+            fresh._a, fresh._b = self._a, self._b
+            with self._lock:
+                self._pending = []
+            count = 0
+            try:
+                for text, result in rows:
+                    if fresh.add(text, verdict_from_result(result)):
+                        count += 1
+            except BaseException:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                # Articles remembered while rebuilding are newer than every row
+                for sig, verdict in self._pending:
+                    fresh._insert(sig, verdict)
+                self._pending = None
+                self._entries = fresh._entries
+                self._buckets = fresh._buckets
+                self.ready = True
+        return count
+
+    def rebuild_from_db(self) -> int:
+        """Rebuild from the most recent ArticleResult rows (requires an app context)."""
+        from ..models import ArticleResult
+
+        newest = (
+            ArticleResult.query
+            .with_entities(ArticleResult.id)
+            .filter(ArticleResult.fake_news_label.isnot(None))
+            .order_by(ArticleResult.timestamp.desc(), ArticleResult.id.desc())
+            .limit(self.max_entries)
+            .subquery()
+        )
+        # Oldest first so the LRU order matches submission order, streamed in chunks
+        query = (
+            ArticleResult.query
+            .filter(ArticleResult.id.in_(newest.select()))
+            .order_by(ArticleResult.timestamp.asc(), ArticleResult.id.asc())
+            .yield_per(1000)
+        )
+
+        def rows():
+            # Runs inside rebuild() so results remembered during the query are replayed
+            for r in query:
+                yield r.article_text, verdict_from_result(r)
+
+        count = self.rebuild(rows())
+        logger.info(f"Near-duplicate index rebuilt with {count} articles")
+        return count
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'entries': len(self._entries),
+                'threshold': self.threshold,
+                'lookups': self.lookups,
+                'matches': self.matches,
+                'match_rate': (self.matches / self.lookups) if self.lookups else 0.0
+            }
+
+
+def get_index():
+    """The app's near-duplicate index, or None when disabled / outside Flask."""
+    try:
+        from flask import current_app, has_app_context
+        if has_app_context():
+            return current_app.config.get('NEAR_DUP_INDEX')
+    except Exception:
+        pass
+    return None
+
+
+def find_near_duplicate(text: str) -> Optional[Dict[str, Any]]:
+    """Stored verdict of a near-duplicate of text, if one is indexed."""
+    index = get_index()
+    if index is None:
+        return None
+    try:
+        return index.lookup(text)
+    except Exception:
+        logger.exception('Near-duplicate lookup failed')
+        return None
+
+
+def remember_results(results: Iterable[Any]) -> None:
+    """Add saved ArticleResult instances or column dicts to the index."""
+    index = get_index()
+    if index is None:
+        return
+    for result in results:
+        text = result.get('article_text') if isinstance(result, dict) else getattr(result, 'article_text', None)
+        if not text:
+            continue
+        try:
+            index.add(text, verdict_from_result(result))
+        except Exception:
+            logger.exception('Failed to index article result')
+
+
+def init_near_duplicate_index(app, background: bool = True) -> Optional[NearDuplicateIndex]:
+    """Create the index and rebuild it from the database (in a background thread by default)."""
+    if not app.config.get('NEAR_DUP_ENABLED', True):
+        return None
+    index = NearDuplicateIndex(
+        num_perm=app.config.get('NEAR_DUP_NUM_PERM', 128),
+        bands=app.config.get('NEAR_DUP_BANDS', 16),
+        threshold=app.config.get('NEAR_DUP_THRESHOLD', 0.85),
+        max_entries=app.config.get('NEAR_DUP_MAX_ENTRIES', 100000)
+    )
+    app.config['NEAR_DUP_INDEX'] = index
+
+    def build():
+        with app.app_context():
+            try:
+                index.rebuild_from_db()
+            except Exception:
+                logger.exception('Near-duplicate index rebuild failed')
+
+    if background:
+        threading.Thread(target=build, name='near-dup-rebuild', daemon=True).start()
+    else:
+        build()
+    return index
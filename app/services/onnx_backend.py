@@ -0,0 +1,176 @@
+"""
+ONNX Runtime inference backend.
+Exports the local transformers to ONNX (optionally INT8-quantized) and serves
+them through a regular text-classification pipeline, so SimpleModelWrapper
+and the predict_* helpers work unchanged.
+
+Requires the optional ``optimum[onnxruntime]`` package.
+"""
+import logging
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ONNX_FILE = 'model.onnx'
+QUANTIZED_FILE = 'model_quantized.onnx'
+
+# Sample articles for the backend parity check
+DEFAULT_SAMPLES = [
+    'The Federal Reserve announced a 0.5% interest rate increase to combat inflation.',
+    'Breaking: Scientists discover Earth is flat and NASA has been covering it up for decades!',
+    'The local football club won the championship after a dramatic penalty shootout.',
+    'A new smartphone with improved battery life was unveiled at the annual tech conference.',
+    'Doctors warn that a miracle fruit cures all cancers overnight, pharmaceutical companies furious.',
+    'The city council approved a new budget for public libraries and community gardens.',
+]
+
+
+def onnx_export_dir(model_dir: str, instance_path: Optional[str] = None) -> str:
+    """
+    Export cache for model_dir: <instance>/onnx/<model name>-<weights fingerprint>.
+
+    The fingerprint is the one model_version() keys cached predictions on, so
+    changed weights get a fresh export instead of reusing a stale graph.
+    """
+    from ..utils import model_version
+
+    if instance_path is None:
+        from flask import current_app
+        instance_path = current_app.instance_path
+    name = os.path.basename(os.path.normpath(model_dir))
+    return os.path.join(instance_path, 'onnx', f'{name}-{model_version(model_dir)}')
+
+
+def _export(model_dir: str, export_dir: str) -> None:
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer
+
+    logger.info(f"Exporting {model_dir} to ONNX in {export_dir}")
+    # Written aside and renamed into place so workers booting together never load a partial export
+    staging = f'{export_dir}.tmp-{os.getpid()}'
+    ort_model = ORTModelForSequenceClassification.from_pretrained(model_dir, export=True)
+    ort_model.save_pretrained(staging)
+    AutoTokenizer.from_pretrained(model_dir).save_pretrained(staging)
+    try:
+        os.rename(staging, export_dir)
+    except OSError:
+        # Another worker finished the same export first
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _quantize(export_dir: str) -> None:
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    logger.info(f"Applying dynamic INT8 quantization to {export_dir}")
+    # Quantized aside and moved into place atomically, like the export itself
+    staging = f'{export_dir}.quantize-{os.getpid()}'
+    try:
+        quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=ONNX_FILE)
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=staging, quantization_config=qconfig)
+        os.replace(os.path.join(staging, QUANTIZED_FILE), os.path.join(export_dir, QUANTIZED_FILE))
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def build_onnx_pipeline(
+    model_dir: str,
+    quantize: bool = False,
+    export_dir: Optional[str] = None,
+    intra_op_threads: Optional[int] = None
+):
+    """
+    Build a text-classification pipeline backed by ONNX Runtime.
+
+    The export (and quantization) is done once and cached in the instance
+    folder under the weights' fingerprint; later boots with the same weights
+    load the cached ONNX graph directly.
+
+    Args:
+        model_dir: Directory with the fine-tuned transformers model
+        quantize: Apply dynamic INT8 quantization
+        export_dir: Where to cache the ONNX graph (default: onnx_export_dir())
+        intra_op_threads: Optional ONNX Runtime intra-op thread count
+
+    Returns:
+        transformers Pipeline with the same call interface as the PyTorch one
+    """
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer, pipeline
+
+    export_dir = export_dir or onnx_export_dir(model_dir)
+    if not os.path.exists(os.path.join(export_dir, ONNX_FILE)):
+        _export(model_dir, export_dir)
+
+    file_name = ONNX_FILE
+    if quantize:
+        if not os.path.exists(os.path.join(export_dir, QUANTIZED_FILE)):
+            _quantize(export_dir)
+        file_name = QUANTIZED_FILE
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if intra_op_threads:
+        session_options.intra_op_num_threads = intra_op_threads
+
+    ort_model = ORTModelForSequenceClassification.from_pretrained(
+        export_dir,
+        file_name=file_name,
+        provider='CPUExecutionProvider',
+        session_options=session_options
+    )
+    tokenizer = AutoTokenizer.from_pretrained(export_dir)
+    return pipeline('text-classification', model=ort_model, tokenizer=tokenizer)
+
+
+def compare_backends(
+    reference,
+    candidate,
+    samples: Optional[List[str]] = None,
+    score_tolerance: float = 0.05
+) -> Dict[str, Any]:
+    """
+    Compare labels and scores of two pipelines on a sample set.
+
+    Args:
+        reference: Reference (PyTorch) pipeline
+        candidate: Candidate (ONNX) pipeline
+        samples: Texts to compare on (default: DEFAULT_SAMPLES)
+        score_tolerance: Maximum allowed absolute score difference per label
+
+    Returns:
+        dict: label_agreement ratio, max/mean absolute score difference,
+            per-sample mismatches and an overall 'passed' flag
+    """
+    samples = samples or DEFAULT_SAMPLES
+    kwargs = {'return_all_scores': True, 'truncation': True}
+    ref_out = reference(samples, **kwargs)
+    cand_out = candidate(samples, **kwargs)
+
+    agree = 0
+    diffs = []
+    mismatches = []
+    for i, (ref_scores, cand_scores) in enumerate(zip(ref_out, cand_out)):
+        ref_map = {s['label']: s['score'] for s in ref_scores}
+        cand_map = {s['label']: s['score'] for s in cand_scores}
+        ref_label = max(ref_map, key=ref_map.get)
+        cand_label = max(cand_map, key=cand_map.get)
+        if ref_label == cand_label:
+            agree += 1
+        else:
+            mismatches.append({'index': i, 'reference': ref_label, 'candidate': cand_label})
+        diffs.extend(abs(ref_map[k] - cand_map.get(k, 0.0)) for k in ref_map)
+
+    max_diff = max(diffs) if diffs else 0.0
+    return {
+        'samples': len(samples),
+        'label_agreement': agree / len(samples) if samples else 1.0,
+        'max_abs_score_diff': max_diff,
+        'mean_abs_score_diff': sum(diffs) / len(diffs) if diffs else 0.0,
+        'mismatches': mismatches,
+        'passed': not mismatches and max_diff <= score_tolerance
+    }
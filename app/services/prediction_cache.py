@@ -0,0 +1,113 @@
+"""
+In-process prediction cache.
+Keeps (label, confidence) results keyed by a hash of the normalized article
+text and the model version, with LRU eviction, a TTL and entry/byte bounds.
+"""
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially re-formatted submissions share a key."""
+    return ' '.join((text or '').split())
+
+
+def make_cache_key(text: str, model_name: str, model_version: Optional[str] = None) -> str:
+    """SHA-256 of model name, model version and the normalized text."""
+    h = hashlib.sha256()
+    h.update(f"{model_name}\0{model_version or ''}\0".encode('utf-8'))
+    h.update(normalize_text(text).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _estimate_size(key: str, value: Any) -> int:
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(sys.getsizeof(v) for v in value)
+    elif isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    return size
+
+
+class PredictionCache:
+    """Thread-safe LRU + TTL cache bounded by entry count and approximate bytes."""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 32 * 1024 * 1024, ttl_seconds: float = 3600):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl = float(ttl_seconds)
+
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None on a miss/expired entry."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting least-recently-used entries to stay in bounds."""
+        size = _estimate_size(key, value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Entry count, approximate bytes, hit/miss/eviction counters and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0
+            }
@@ -0,0 +1,202 @@
+"""
+Disk-backed prediction store shared by all worker processes.
+A SQLite database in WAL mode under the instance folder, so every gunicorn
+worker can read concurrently and results survive restarts.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Re-check the total store size after this many writes
+EVICTION_CHECK_INTERVAL = 256
+# Only refresh the LRU timestamp of an entry once per this many seconds
+TOUCH_INTERVAL_SECONDS = 60
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value)
+
+
+def _decode(raw: str) -> Any:
+    value = json.loads(raw)
+    # (label, confidence) tuples come back from JSON as lists
+    return tuple(value) if isinstance(value, list) else value
+
+
+class PersistentPredictionStore:
+    """SQLite key-value store with TTL and size-based LRU eviction."""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl_seconds)
+        self._local = threading.local()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS predictions ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_predictions_accessed ON predictions (accessed_at)')
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread and per process (connections must not cross fork())
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None when missing, expired or on error."""
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                'SELECT value, accessed_at FROM predictions WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] < now - TOUCH_INTERVAL_SECONDS:
+                conn.execute('UPDATE predictions SET accessed_at = ? WHERE key = ?', (now, key))
+                conn.commit()
+            self.hits += 1
+            return _decode(row[0])
+        except Exception:
+            self.errors += 1
+            logger.exception('Prediction store read failed')
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Insert or replace a value; failures are logged and ignored."""
+        now = time.time()
+        try:
+            raw = _encode(value)
+            conn = self._conn()
+            conn.execute(
+                'INSERT OR REPLACE INTO predictions (key, value, size, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, raw, len(key) + len(raw), now + self.ttl, now)
+            )
+            conn.commit()
+            self._writes += 1
+            if self._writes % EVICTION_CHECK_INTERVAL == 0:
+                self.evict()
+        except Exception:
+            self.errors += 1
+            logger.exception('Prediction store write failed')
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones until under max_bytes."""
+        conn = self._conn()
+        removed = conn.execute('DELETE FROM predictions WHERE expires_at <= ?', (time.time(),)).rowcount
+        total, count = conn.execute('SELECT COALESCE(SUM(size), 0), COUNT(*) FROM predictions').fetchone()
+        if total > self.max_bytes and count:
+            # Shrink to 90% of the budget to avoid evicting on every check
+            excess = total - int(self.max_bytes * 0.9)
+            n = min(count, max(1, int(excess / (total / count)) + 1))
+            removed += conn.execute(
+                'DELETE FROM predictions WHERE key IN '
+                '(SELECT key FROM predictions ORDER BY accessed_at LIMIT ?)',
+                (n,)
+            ).rowcount
+        conn.commit()
+        return removed
+
+    def iter_recent(self, limit: int):
+        """Yield (key, value) for the most recently used live entries."""
+        rows = self._conn().execute(
+            'SELECT key, value FROM predictions WHERE expires_at > ? ORDER BY accessed_at DESC LIMIT ?',
+            (time.time(), int(limit))
+        ).fetchall()
+        for key, raw in rows:
+            yield key, _decode(raw)
+
+    def get_stats(self) -> dict:
+        try:
+            total, count = self._conn().execute(
+                'SELECT COALESCE(SUM(size), 0), COUNT(*) FROM predictions'
+            ).fetchone()
+        except Exception:
+            total, count = None, None
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'entries': count,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0
+        }
+
+
+class TieredPredictionCache:
+    """
+    In-process LRU in front of the shared disk store.
+
+    Exposes the same get/set/get_stats interface as PredictionCache so
+    callers do not need to know whether a persistent tier is configured.
+    """
+
+    def __init__(self, memory, store: Optional[PersistentPredictionStore] = None):
+        self.memory = memory
+        self.store = store
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None or self.store is None:
+            return value
+        value = self.store.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.store is not None:
+            self.store.set(key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+    def warm_start(self, limit: int = 1000) -> int:
+        """Load the most recently used persistent entries into memory."""
+        if self.store is None or limit <= 0:
+            return 0
+        loaded = 0
+        try:
+            for key, value in self.store.iter_recent(min(limit, self.memory.max_entries)):
+                self.memory.set(key, value)
+                loaded += 1
+        except Exception:
+            logger.exception('Prediction cache warm start failed')
+        return loaded
+
+    def get_stats(self) -> dict:
+        stats = self.memory.get_stats()
+        stats['persistent'] = self.store.get_stats() if self.store is not None else None
+        return stats
@@ -0,0 +1,98 @@
+"""
+Prompt-budget stage for Gemini requests.
+Articles whose estimated token count exceeds the budget are reduced to their
+most informative sentences before the prompt is built. Sentences are ranked
+by TF-IDF centrality (cosine similarity to the whole document), computed as
+one sparse matrix-vector product so megabyte uploads stay cheap.
+"""
+import logging
+import re
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English text
+CHARS_PER_TOKEN = 4
+# Marks the places where sentences were dropped
+OMISSION = ' [...] '
+
+_SENTENCE_RE = re.compile(r'[^.!?\n]+(?:[.!?]+["\')\]]*|\n+|$)')
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for prompt size limits."""
+    return len(text or '') // CHARS_PER_TOKEN + 1
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.findall(text or '') if s.strip()]
+
+
+def sentence_centrality(sentences: List[str]) -> np.ndarray:
+    """TF-IDF centrality of each sentence: cosine similarity to the document centroid."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    try:
+        matrix = TfidfVectorizer(stop_words='english', sublinear_tf=True).fit_transform(sentences)
+    except ValueError:
+        # Only stop words / no tokens at all
+        return np.zeros(len(sentences))
+    centroid = np.asarray(matrix.sum(axis=0)).ravel()
+    norm = np.linalg.norm(centroid)
+    if norm == 0:
+        return np.zeros(len(sentences))
+    return matrix.dot(centroid / norm)
+
+
+def compress_article(text: str, max_tokens: int) -> Tuple[str, Dict[str, float]]:
+    """
+    Fit an article into max_tokens by keeping its most central sentences.
+
+    The lead sentence is always kept and selected sentences stay in their
+    original order; OMISSION marks each gap.
+
+    Returns:
+        tuple: (text, stats) where stats has original_tokens, tokens,
+            tokens_saved and compress_ms
+    """
+    original = estimate_tokens(text)
+    stats = {'original_tokens': original, 'tokens': original, 'tokens_saved': 0, 'compress_ms': 0.0}
+    if not max_tokens or original <= max_tokens:
+        return text, stats
+
+    start = time.perf_counter()
+    sentences = split_sentences(text)
+    budget = max_tokens * CHARS_PER_TOKEN
+    if len(sentences) < 2:
+        compressed = text[:budget]
+    else:
+        scores = sentence_centrality(sentences)
+        lengths = np.fromiter((len(s) + 1 for s in sentences), dtype=np.int64, count=len(sentences))
+        order = np.argsort(-scores, kind='stable')
+        keep = np.zeros(len(sentences), dtype=bool)
+        keep[0] = True
+        used = min(lengths[0], budget)
+        shortest = lengths.min() + len(OMISSION)
+        for i in order:
+            if used + shortest > budget:
+                break
+            if not keep[i] and used + lengths[i] + len(OMISSION) <= budget:
+                keep[i] = True
+                used += lengths[i]
+        parts, previous = [], -1
+        for i in np.flatnonzero(keep):
+            if parts and i != previous + 1:
+                parts.append(OMISSION.strip())
+            parts.append(sentences[i])
+            previous = i
+        if previous != len(sentences) - 1:
+            parts.append(OMISSION.strip())
+        compressed = ' '.join(parts)[:budget]
+
+    stats['tokens'] = estimate_tokens(compressed)
+    stats['tokens_saved'] = original - stats['tokens']
+    stats['compress_ms'] = (time.perf_counter() - start) * 1000
+    return compressed, stats
@@ -0,0 +1,70 @@
+"""
+Optimized PyTorch CPU execution mode.
+Loads models with scaled-dot-product attention kernels, runs every forward
+pass under torch.inference_mode and optionally compiles it with
+torch.compile. Compiled graphs are built by the boot-time warm-up.
+"""
+import logging
+from typing import Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+COMPILE_MODES = ('default', 'reduce-overhead', 'max-autotune')
+
+
+def load_torch_pipeline(model_dir: str, attention: Optional[str] = None):
+    """
+    Build a CPU text-classification pipeline, requesting an attention
+    implementation ('sdpa', 'eager') when given. Falls back to the default
+    implementation if this transformers version or model does not support it.
+    """
+    from transformers import pipeline
+
+    if attention:
+        try:
+            return pipeline('text-classification', model=model_dir, device=-1,
+                            model_kwargs={'attn_implementation': attention})
+        except (TypeError, ValueError, ImportError):
+            logger.warning(f'{attention} attention unavailable for {model_dir}, using the default implementation')
+    return pipeline('text-classification', model=model_dir, device=-1)
+
+
+def optimize_torch_model(model: torch.nn.Module, compile_mode: Optional[str] = None) -> torch.nn.Module:
+    """
+    Freeze a model for inference and wrap its forward pass in torch.inference_mode,
+    compiling it first when compile_mode is set.
+    """
+    model.eval()
+    model.requires_grad_(False)
+
+    forward = model.forward
+    model.compile_mode = None
+    if compile_mode:
+        if compile_mode not in COMPILE_MODES:
+            # A typo in TORCH_COMPILE must not take the models down
+            logger.warning(f'Unknown torch.compile mode {compile_mode!r} (expected one of {COMPILE_MODES}), '
+                           'running the model eagerly')
+        elif hasattr(torch, 'compile'):
+            try:
+                # dynamic=True: one graph for all sequence lengths / batch sizes instead of one per shape
+                forward = torch.compile(forward, mode=compile_mode, dynamic=True)
+                model.compile_mode = compile_mode
+            except Exception:
+                logger.exception('torch.compile failed, running the model eagerly')
+        else:
+            logger.warning('torch.compile requires PyTorch 2.0+, running the model eagerly')
+
+    model.forward = torch.inference_mode()(forward)
+    return model
+
+
+def describe(model: torch.nn.Module) -> dict:
+    """Execution settings of a loaded model, for logs and benchmarks."""
+    config = getattr(model, 'config', None)
+    return {
+        'attention': getattr(config, '_attn_implementation', None),
+        'compile_mode': getattr(model, 'compile_mode', None),
+        'threads': torch.get_num_threads(),
+    }
@@ -3,38 +3,95 @@ Explainable AI Pipeline Service
 Orchestrates ML classification, performance tracking, and Gemini explanations.
 """
 import logging
-from typing import Dict, Any, Optional, Tuple
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterator, Optional, Tuple
 from ..services.metrics_service import MetricsTracker
 from ..services.gemini_service import GeminiService
+from ..services.gemini_executor import GeminiCall, config_value, start_gemini_call
+from ..services.gemini_routing import get_routing_policy
 from ..services.insight_service import save_classification_insight
 
 logger = logging.getLogger(__name__)
 
 
+def _wants_result(confidence: float) -> bool:
+    wants_result = getattr(get_routing_policy(), 'wants_result', None)
+    return wants_result is None or wants_result(confidence)
+
+
 class XAIPipeline:
     """Main orchestrator for the Explainable AI pipeline."""
     
     def __init__(self):
         """Initialize the XAI pipeline."""
         self.gemini_service = None
+        self.routing_reason = None
+        self._routed_text = None  # article already routed before local inference
         try:
             self.gemini_service = GeminiService()
         except ValueError as e:
             logger.warning(f"Gemini service not initialized: {str(e)}")
     
+    def start_gemini(
+        self,
+        article_text: str,
+        confidence: Optional[float] = None,
+        explicit: bool = False
+    ) -> Optional[GeminiCall]:
+        """
+        Ask the routing policy whether to call Gemini and, if so, start the
+        analysis in the background so it overlaps local inference.
+        
+        Args:
+            article_text: The article to analyze
+            confidence: ML confidence, or None when routing before local inference
+            explicit: The user explicitly asked for the Gemini explanation
+        
+        Returns:
+            GeminiCall: Handle to join by the deadline, or None when not routed to Gemini
+        """
+        if self.gemini_service is None:
+            self.routing_reason = 'unavailable'
+            return None
+        if confidence is None:
+            self._routed_text = article_text
+        try:
+            decision = get_routing_policy().decide(
+                article_text, confidence,
+                cached=self.gemini_service.is_cached(article_text),
+                explicit=explicit,
+                available=self.gemini_service.is_available()
+            )
+            self.routing_reason = decision.reason
+            if not decision.call:
+                return None
+            return start_gemini_call(self.gemini_service.analyze_article_comprehensive, article_text)
+        except Exception as e:
+            logger.warning(f"Could not start Gemini analysis (non-blocking): {str(e)}")
+            return None
+    
     def process_classification(
         self,
         article_text: str,
         predict_fn,
-        user_id: Optional[int] = None
+        user_id: Optional[int] = None,
+        gemini_call: Optional[GeminiCall] = None,
+        explicit: bool = False
     ) -> Dict[str, Any]:
         """
-        Execute the complete XAI pipeline: ML -> Metrics -> Gemini -> DB.
+        Execute the complete XAI pipeline: (Gemini || ML) -> Metrics -> DB.
         
         Args:
             article_text: The article to classify
             predict_fn: Function that returns (label, confidence) tuple
             user_id: Optional user ID for database persistence
+            gemini_call: Gemini analysis already started with start_gemini();
+                routed here, before the ML model runs, when omitted
+            explicit: The user asked for the Gemini explanation (bypasses the
+                routing policy's confidence bands, not its budget)
         
         Returns:
             dict: Complete classification result with explanations and metrics
@@ -49,10 +106,16 @@ class XAIPipeline:
             'decision_source': 'ML_ONLY',
             'processing_time_ms': 0.0,
             'cpu_usage_percent': 0.0,
+            'routing_reason': None,
+            'gemini_analysis': None,
             'error': None
         }
         
         try:
+            # Step 0: Launch Gemini (if routed) so it runs while the local model predicts
+            if gemini_call is None and self._routed_text != article_text:
+                gemini_call = self.start_gemini(article_text, explicit=explicit)
+            
             # Step 1: Start performance tracking
             metrics = MetricsTracker()
             metrics.start()
@@ -72,23 +135,25 @@ class XAIPipeline:
             result['processing_time_ms'] = metrics.get_processing_time_ms()
             result['cpu_usage_percent'] = metrics.get_cpu_usage_percent()
             
-            # Step 4: Determine if Gemini verification is needed
-            should_verify = (
-                self.gemini_service is not None and 
-                confidence is not None and 
-                confidence < 60
-            )
+            # Step 4: Routing deferred until the ML confidence was known
+            if gemini_call is None and self.routing_reason == 'deferred':
+                gemini_call = self.start_gemini(article_text, confidence=float(confidence or 0.0), explicit=explicit)
+            elif gemini_call is not None and self.routing_reason == 'speculative' and not explicit \
+                    and not _wants_result(float(confidence or 0.0)):
+                # Confident ML result: do not wait for the speculative call (a call already running still fills the cache)
+                gemini_call.cancel()
+                gemini_call = None
+                self.routing_reason = 'confident_ml'
             
-            result['verification_triggered'] = should_verify
+            result['verification_triggered'] = gemini_call is not None
+            result['routing_reason'] = self.routing_reason
             
-            # Step 5: Call Gemini for explanations (if available)
-            if self.gemini_service is not None:
+            # Step 5: Join the Gemini explanation (if routed) under its deadline
+            if gemini_call is not None:
                 try:
-                    summary, explanation, conf_explanation = self.gemini_service.generate_explanation(
-                        article_text=article_text,
-                        prediction_label=label,
-                        confidence_score=float(confidence or 0.0)
-                    )
+                    analysis = gemini_call.result()
+                    result['gemini_analysis'] = analysis
+                    summary, explanation, conf_explanation = GeminiService.explanation_from_analysis(analysis)
                     
                     if summary is not None:
                         result['summary'] = summary
@@ -127,6 +192,148 @@ class XAIPipeline:
         
         return result
     
+    def stream_explanation(
+        self,
+        article_text: str,
+        predict_fn,
+        lime_fn: Optional[Callable[[str], Any]] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of process_classification for an explicitly requested
+        explanation: results are yielded as soon as each stage has them.
+        
+        Yields (event, data) pairs:
+            'prediction': prediction_label, confidence_score, processing_time_ms
+            'gemini': summary / explanation parsed so far, while Gemini streams
+            'lime': lime (lime_fn's return value), when lime_fn is given
+            'result': the complete process_classification-style result
+        
+        Gemini and LIME run concurrently and their events are interleaved in
+        the order they finish; the Gemini stream is abandoned once
+        GEMINI_DEADLINE_SECONDS have passed.
+        
+        Args:
+            article_text: The article to explain
+            predict_fn: Function that returns (label, confidence) tuple
+            lime_fn: Optional local explainer, run alongside the Gemini stream
+        """
+        result = {
+            'prediction_label': None,
+            'confidence_score': 0.0,
+            'summary': None,
+            'explanation': None,
+            'confidence_explanation': None,
+            'verification_triggered': False,
+            'decision_source': 'ML_ONLY',
+            'processing_time_ms': 0.0,
+            'cpu_usage_percent': 0.0,
+            'routing_reason': None,
+            'gemini_analysis': None,
+            'lime': None,
+            'error': None
+        }
+        lime_pool = None
+        cancelled = threading.Event()
+        try:
+            metrics = MetricsTracker()
+            metrics.start()
+            label, confidence = predict_fn(article_text)
+            if confidence is not None and confidence <= 1.0:
+                confidence = confidence * 100
+            metrics.stop()
+            result['prediction_label'] = label
+            result['confidence_score'] = float(confidence or 0.0)
+            result['processing_time_ms'] = metrics.get_processing_time_ms()
+            result['cpu_usage_percent'] = metrics.get_cpu_usage_percent()
+            yield 'prediction', {
+                'prediction_label': label,
+                'confidence_score': result['confidence_score'],
+                'processing_time_ms': result['processing_time_ms']
+            }
+            
+            # LIME (local CPU) and Gemini (network) run concurrently and report into one queue
+            events = queue.Queue()
+            lime_pending = lime_fn is not None
+            if lime_pending:
+                lime_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lime')
+                lime_pool.submit(lime_fn, article_text).add_done_callback(lambda f: events.put(('lime', f)))
+            
+            routed = False
+            if self.gemini_service is None:
+                self.routing_reason = 'unavailable'
+            else:
+                decision = get_routing_policy().decide(
+                    article_text, result['confidence_score'],
+                    cached=self.gemini_service.is_cached(article_text),
+                    explicit=True,
+                    available=self.gemini_service.is_available()
+                )
+                self.routing_reason = decision.reason
+                routed = decision.call
+            result['verification_triggered'] = routed
+            result['routing_reason'] = self.routing_reason
+            
+            gemini_pending = routed
+            if routed:
+                def pump_gemini():
+                    stream = self.gemini_service.stream_article_comprehensive(article_text)
+                    try:
+                        for event in stream:
+                            if cancelled.is_set():
+                                break
+                            events.put(event)
+                    finally:
+                        stream.close()
+                # Never inline: the deadline below must bound how long this request waits
+                if not start_gemini_call(pump_gemini, inline_when_full=False).called:
+                    gemini_pending = False
+                    result['routing_reason'] = self.routing_reason = 'saturated'
+                    result['verification_triggered'] = False
+            deadline = time.monotonic() + float(config_value('GEMINI_DEADLINE_SECONDS', 30.0))
+            
+            while gemini_pending or lime_pending:
+                timeout = max(0.0, deadline - time.monotonic()) if gemini_pending else None
+                try:
+                    event, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    logger.warning('Gemini stream missed its deadline; continuing with the local result')
+                    cancelled.set()
+                    gemini_pending = False
+                    yield 'gemini', {'summary': None, 'explanation': None, 'done': True}
+                    continue
+                
+                if event == 'lime':
+                    lime_pending = False
+                    try:
+                        result['lime'] = payload.result()
+                    except Exception as e:
+                        logger.warning(f"LIME explanation failed (non-blocking): {str(e)}")
+                    yield 'lime', {'lime': result['lime']}
+                elif not gemini_pending:
+                    continue  # late Gemini chunk after the deadline
+                elif event == 'partial':
+                    yield 'gemini', {'summary': payload['summary'], 'explanation': payload['explanation'], 'done': False}
+                else:
+                    gemini_pending = False
+                    result['gemini_analysis'] = payload
+                    summary, explanation, conf_explanation = GeminiService.explanation_from_analysis(payload)
+                    if payload is not None:
+                        result['summary'] = summary
+                        result['explanation'] = explanation
+                        result['confidence_explanation'] = conf_explanation
+                        result['decision_source'] = 'ML_GEMINI'
+                    yield 'gemini', {'summary': result['summary'], 'explanation': result['explanation'], 'done': True}
+        
+        except Exception as e:
+            logger.exception(f"XAI streaming pipeline error: {str(e)}")
+            result['error'] = str(e)
+        finally:
+            cancelled.set()
+            if lime_pool is not None:
+                lime_pool.shutdown(wait=False)
+        
+        yield 'result', result
+    
     @staticmethod
     def format_for_display(result: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -5,7 +5,8 @@ from .models import User
 import os
 import logging
 import html
-from flask import current_app, g
+import threading
+from flask import current_app, g, flash, redirect
 
 # --- LIME IMPORTS ---
 import lime
@@ -16,6 +17,13 @@ import numpy as np
 # --------------------
 
 from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from .services.batch_inference import MicroBatcher
+from .services.length_buckets import PaddingStats, plan_buckets
+from .services.long_document import (
+    AGGREGATIONS, encoded_batch_scores, encoded_scores, pad_encodings, window_encodings, windowed_scores
+)
+from .services.prediction_cache import PredictionCache
+from .services.prediction_store import PersistentPredictionStore, TieredPredictionCache
 
 logger = logging.getLogger(__name__)
 
@@ -108,8 +116,29 @@ def explain_prediction(text: str, model_wrapper):
 
 
 class SimpleModelWrapper:
-    def __init__(self, pipeline=None):
+    def __init__(self, pipeline=None, batching=True, max_batch_size=16, max_wait_ms=5.0, name='model', model_version=None,
+                 long_doc_aggregation='mean', long_doc_min_chars=2000, window_tokens=512,
+                 window_stride=128, max_windows=16, length_bucketing=True, max_batch_tokens=4096):
         self.pipeline = pipeline
+        self.name = name
+        self.model_version = model_version
+        self.long_doc_aggregation = long_doc_aggregation if long_doc_aggregation in AGGREGATIONS else None
+        self.long_doc_min_chars = long_doc_min_chars
+        self.window_tokens = window_tokens
+        self.window_stride = window_stride
+        self.max_windows = max_windows
+        self.length_bucketing = length_bucketing
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.padding = PaddingStats()
+        self.batcher = None
+        if pipeline is not None and batching:
+            self.batcher = MicroBatcher(
+                self.predict_batch,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms,
+                name=name
+            )
 
     def predict(self, text: str):
         if not self.pipeline:
@@ -120,34 +149,486 @@ class SimpleModelWrapper:
             logger.exception("Model prediction failed")
             return None
 
+    def is_long(self, text: str) -> bool:
+        return bool(self.long_doc_aggregation) and len(text) >= self.long_doc_min_chars
+
+    def predict_long(self, text: str):
+        """Label scores for a long article from overlapping token windows."""
+        return windowed_scores(
+            self.pipeline,
+            text,
+            window_tokens=self.window_tokens,
+            stride=self.window_stride,
+            max_windows=self.max_windows,
+            aggregation=self.long_doc_aggregation or 'mean'
+        )
+
+    def encode(self, texts):
+        """
+        Unpadded, truncated encodings of texts, or None when the pipeline has
+        no local model and tokenizer to run them through.
+        """
+        tokenizer = getattr(self.pipeline, 'tokenizer', None)
+        if tokenizer is None or getattr(self.pipeline, 'model', None) is None:
+            return None
+        max_length = min(self.window_tokens, getattr(tokenizer, 'model_max_length', None) or self.window_tokens)
+        return tokenizer(list(texts), truncation=True, max_length=max_length)
+
+    def token_lengths(self, texts):
+        """Token count of each text after truncation (whitespace estimate without a tokenizer)."""
+        enc = self.encode(texts)
+        if enc is None:
+            return [min(len(t.split()) + 2, self.window_tokens) for t in texts]
+        return [len(ids) for ids in enc['input_ids']]
+
+    def buckets(self, lengths):
+        """Sub-batches (lists of indices) for inputs of the given token lengths."""
+        if not self.length_bucketing or len(lengths) < 2:
+            return [list(range(len(lengths)))]
+        return plan_buckets(lengths, self.max_batch_size, self.max_batch_tokens)
+
+    def _run_pipeline(self, texts):
+        results = self.pipeline(texts, return_all_scores=True, batch_size=len(texts), truncation=True)
+        # A single input may come back un-nested
+        if results and isinstance(results[0], dict):
+            results = [results]
+        return results
+
+    def predict_batch(self, texts):
+        """
+        Return a list of label scores per text.
+
+        The inputs are tokenized once: the encodings drive length bucketing
+        (sub-batches of similar token length, one forward pass each) and are
+        then padded per sub-batch and fed to the model directly.
+        """
+        texts = list(texts)
+        if not self.pipeline or not texts:
+            return [None for _ in texts]
+
+        results = [None] * len(texts)
+        short_idx = []
+        for i, t in enumerate(texts):
+            if self.is_long(t):
+                results[i] = self.predict_long(t)
+            else:
+                short_idx.append(i)
+        if not short_idx:
+            return results
+
+        short_texts = [texts[i] for i in short_idx]
+        enc = self.encode(short_texts)
+        lengths = self.token_lengths(short_texts) if enc is None else [len(ids) for ids in enc['input_ids']]
+        for group in self.buckets(lengths):
+            if self.length_bucketing:
+                self.padding.record([lengths[j] for j in group])
+            if enc is None:
+                group_results = self._run_pipeline([short_texts[j] for j in group])
+            else:
+                batch = pad_encodings(self.pipeline.tokenizer, enc, group)
+                group_results = encoded_batch_scores(self.pipeline.model, batch)
+            for j, res in zip(group, group_results):
+                results[short_idx[j]] = res
+        return results
+
+    def predict_scores(self, text: str):
+        """Label scores for one text, routed through the micro-batcher when enabled."""
+        if not self.pipeline:
+            return None
+        if self.is_long(text):
+            return self.predict_long(text)
+        if self.batcher is not None:
+            return self.batcher.predict(text)
+        return self.predict_batch([text])[0]
+
+
+_TOKENIZER_MATCH = {}
+
+
+def _tokenizer_spec(tokenizer) -> dict:
+    """
+    Serialized fast tokenizer (vocab, normalizer, pre-tokenizer, post-processor)
+    without its truncation and padding settings, which are call-time state.
+    """
+    import json
+    spec = json.loads(tokenizer.backend_tokenizer.to_str())
+    spec.pop('truncation', None)
+    spec.pop('padding', None)
+    return spec
+
+
+def tokenizers_match(a, b) -> bool:
+    """True when two tokenizers produce identical encodings (same vocabulary, normalization and limits)."""
+    if a is b:
+        return True
+    if (a, b) not in _TOKENIZER_MATCH:
+        try:
+            if hasattr(a, 'backend_tokenizer') and hasattr(b, 'backend_tokenizer'):
+                same = _tokenizer_spec(a) == _tokenizer_spec(b)
+            else:
+                same = (
+                    type(a) is type(b)
+                    and a.get_vocab() == b.get_vocab()
+                    and getattr(a, 'do_lower_case', None) == getattr(b, 'do_lower_case', None)
+                )
+            same = same and a.model_max_length == b.model_max_length and a.all_special_tokens == b.all_special_tokens
+        except Exception:
+            logger.exception('Could not compare tokenizers')
+            same = False
+        _TOKENIZER_MATCH[(a, b)] = same
+    return _TOKENIZER_MATCH[(a, b)]
+
+
+class FusedScorer:
+    """
+    Scores several local models that share a tokenizer from one tokenization
+    per batch. Micro-batched like a single model when any of them batches.
+    """
+
+    def __init__(self, wrappers):
+        self.wrappers = list(wrappers)
+        self.batcher = None
+        batchers = [w.batcher for w in self.wrappers if getattr(w, 'batcher', None) is not None]
+        if batchers:
+            self.batcher = MicroBatcher(
+                self.score_batch,
+                max_batch_size=batchers[0].max_batch_size,
+                max_wait_ms=batchers[0].max_wait * 1000,
+                name='+'.join(w.name for w in self.wrappers)
+            )
+
+    def score_batch(self, texts):
+        """Per text, the label scores of every model (in wrapper order)."""
+        first = self.wrappers[0]
+        enc = first.encode(texts)
+        lengths = [len(ids) for ids in enc['input_ids']]
+        results = [None] * len(lengths)
+        for group in first.buckets(lengths):
+            if first.length_bucketing:
+                first.padding.record([lengths[j] for j in group])
+            batch = pad_encodings(first.pipeline.tokenizer, enc, group)
+            per_model = [encoded_batch_scores(w.pipeline.model, batch) for w in self.wrappers]
+            for row, j in enumerate(group):
+                results[j] = [scores[row] for scores in per_model]
+        return results
+
+
+_FUSED_SCORERS = {}
+_fused_lock = threading.Lock()
+
+
+def _fused_scorer(wrappers) -> FusedScorer:
+    key = tuple(wrappers)
+    with _fused_lock:
+        if key not in _FUSED_SCORERS:
+            _FUSED_SCORERS[key] = FusedScorer(wrappers)
+        return _FUSED_SCORERS[key]
+
+
+def fused_scores(wrappers, text):
+    """
+    Label scores of text for several local models from a single tokenization.
+
+    Short texts go through a micro-batcher shared by the models when batching
+    is on, so concurrent requests are still coalesced. Returns None when the
+    models cannot share encodings (different tokenizers or models served out
+    of process), so callers score each model separately.
+    """
+    pipes = [getattr(w, 'pipeline', None) for w in wrappers]
+    if any(getattr(p, 'model', None) is None or getattr(p, 'tokenizer', None) is None for p in pipes):
+        return None
+    tokenizer = pipes[0].tokenizer
+    if not all(tokenizers_match(tokenizer, p.tokenizer) for p in pipes[1:]):
+        return None
+
+    first = wrappers[0]
+    if first.is_long(text):
+        enc = window_encodings(tokenizer, text, first.window_tokens, first.window_stride, first.max_windows)
+        return [encoded_scores(p.model, enc, first.long_doc_aggregation) for p in pipes]
+    scorer = _fused_scorer(wrappers)
+    if scorer.batcher is not None:
+        return scorer.batcher.predict(text)
+    return scorer.score_batch([text])[0]
+
+
+def model_version(model_dir, backend='torch', app=None):
+    """Fingerprint of the model files and backend, used to key cached predictions."""
+    import hashlib
+    h = hashlib.sha1(backend.encode('utf-8'))
+    if backend == 'onnx' and app is not None and app.config.get('ONNX_QUANTIZE'):
+        h.update(b'int8')
+    for fname in sorted(os.listdir(model_dir)):
+        path = os.path.join(model_dir, fname)
+        if os.path.isfile(path):
+            st = os.stat(path)
+            h.update(f'{fname}:{st.st_size}:{int(st.st_mtime)}'.encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def build_pipeline(model_dir, backend='torch', app=None):
+    """Build a text-classification pipeline for model_dir on the requested backend."""
+    from transformers import pipeline
+    config = app.config if app is not None else {}
+    if backend == 'onnx':
+        try:
+            from .services.onnx_backend import build_onnx_pipeline, onnx_export_dir
+            return build_onnx_pipeline(
+                model_dir,
+                quantize=config.get('ONNX_QUANTIZE', False),
+                export_dir=onnx_export_dir(model_dir, app.instance_path if app is not None else None),
+                intra_op_threads=config.get('ONNX_INTRA_OP_THREADS')
+            )
+        except Exception:
+            logger.exception(f'ONNX backend unavailable for {model_dir}, falling back to PyTorch')
+    if not config.get('TORCH_OPTIMIZE', False):
+        pipe = pipeline('text-classification', model=model_dir, device=-1)
+    else:
+        from .services.torch_optimize import load_torch_pipeline
+        pipe = load_torch_pipeline(model_dir, attention=config.get('TORCH_ATTENTION') or None)
+    if config.get('SAFETENSORS_MMAP', False):
+        from .prefork import mmap_model_weights
+        mmap_model_weights(pipe.model, model_dir)
+    if config.get('TORCH_OPTIMIZE', False):
+        from .services.torch_optimize import optimize_torch_model
+        optimize_torch_model(pipe.model, compile_mode=config.get('TORCH_COMPILE') or None)
+    return pipe
+
+
+MODEL_NAMES = ('classifier', 'fake')
+
+
+def warm_up_model(wrapper, seq_lengths=(32, 128, 512), batch_sizes=(1, 8)):
+    """Run synthetic inputs of representative lengths through the model once."""
+    import time
+    start = time.perf_counter()
+    for n_tokens in seq_lengths:
+        # One word-piece per word for the uncased BERT vocab, minus [CLS]/[SEP]
+        text = ' '.join(['news'] * max(1, int(n_tokens) - 2))
+        for batch_size in batch_sizes:
+            wrapper.predict_batch([text] * max(1, int(batch_size)))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(f'Warmed up {wrapper.name} model in {elapsed_ms:.0f} ms')
+    return elapsed_ms
+
 
 def load_models(app):
-    models = {'classifier': None, 'fake': None}
+    """
+    Load and warm up the local models.
+
+    app.config['MODEL_STATUS'] tracks each model through
+    pending -> loading -> warming -> ready (or missing / failed); a model is
+    only published in app.config['ML_MODELS'] once it is warm.
+    """
+    models = app.config.get('ML_MODELS') or {name: None for name in MODEL_NAMES}
+    status = app.config.get('MODEL_STATUS') or {name: 'pending' for name in MODEL_NAMES}
+    app.config['ML_MODELS'] = models
+    app.config['MODEL_STATUS'] = status
+
+    if app.config.get('PREDICTION_CACHE_ENABLED', True) and app.config.get('PREDICTION_CACHE') is None:
+        app.config['PREDICTION_CACHE'] = build_prediction_cache(app)
+
+    backend = app.config.get('INFERENCE_BACKEND', 'torch')
+    wrapper_kwargs = {
+        'batching': app.config.get('INFERENCE_BATCHING', True),
+        'max_batch_size': app.config.get('INFERENCE_MAX_BATCH_SIZE', 16),
+        'max_wait_ms': app.config.get('INFERENCE_MAX_WAIT_MS', 5.0),
+        'long_doc_aggregation': app.config.get('LONG_DOC_AGGREGATION', 'mean'),
+        'long_doc_min_chars': app.config.get('LONG_DOC_MIN_CHARS', 2000),
+        'window_tokens': app.config.get('LONG_DOC_WINDOW_TOKENS', 512),
+        'window_stride': app.config.get('LONG_DOC_WINDOW_STRIDE', 128),
+        'max_windows': app.config.get('LONG_DOC_MAX_WINDOWS', 16),
+        'length_bucketing': app.config.get('LENGTH_BUCKETING', True),
+        'max_batch_tokens': app.config.get('LENGTH_BUCKET_MAX_TOKENS', 4096),
+    }
     try:
-        from transformers import pipeline
-        classifier_dir = os.path.join(app.root_path, 'models', 'classifier')
-        fake_dir = os.path.join(app.root_path, 'models', 'fake')
+        import transformers
+    except Exception:
+        logger.exception('Transformers not available or failed to initialize')
+        for name in MODEL_NAMES:
+            status[name] = 'failed'
+        return models
 
-        if os.path.isdir(classifier_dir) and os.listdir(classifier_dir):
-            try:
-                models['classifier'] = SimpleModelWrapper(pipeline('text-classification', model=classifier_dir, device=-1))
-            except Exception:
-                logger.exception('Failed to load classifier model')
-                models['classifier'] = None
+    client = None
+    if app.config.get('INFERENCE_SERVICE', 'off') != 'off':
+        try:
+            client = build_inference_client(app)
+        except Exception:
+            logger.exception('Inference service unavailable, loading models in-process')
 
-        if os.path.isdir(fake_dir) and os.listdir(fake_dir):
+    for name in MODEL_NAMES:
+        model_dir = os.path.join(app.root_path, 'models', name)
+        if not (os.path.isdir(model_dir) and os.listdir(model_dir)):
+            status[name] = 'missing'
+            continue
+
+        status[name] = 'loading'
+        try:
+            if client is not None:
+                from .services.inference_service import RemoteModelWrapper
+                wrapper = RemoteModelWrapper(
+                    client, model_dir,
+                    name=name, model_version=model_version(model_dir, 'service', app), **wrapper_kwargs
+                )
+            else:
+                wrapper = SimpleModelWrapper(
+                    build_pipeline(model_dir, backend, app),
+                    name=name, model_version=model_version(model_dir, backend, app), **wrapper_kwargs
+                )
+        except Exception:
+            logger.exception(f'Failed to load {name} model')
+            status[name] = 'failed'
+            continue
+
+        # Compiled graphs are built on first use, so always warm them up before serving
+        compiled = app.config.get('TORCH_OPTIMIZE', False) and app.config.get('TORCH_COMPILE') and client is None
+        if app.config.get('WARMUP_ENABLED', True) or compiled:
+            status[name] = 'warming'
             try:
-                models['fake'] = SimpleModelWrapper(pipeline('text-classification', model=fake_dir, device=-1))
+                warm_up_model(
+                    wrapper,
+                    seq_lengths=app.config.get('WARMUP_SEQ_LENGTHS', (32, 128, 512)),
+                    batch_sizes=app.config.get('WARMUP_BATCH_SIZES', (1, 8))
+                )
             except Exception:
-                logger.exception('Failed to load fake-news model')
-                models['fake'] = None
+                logger.exception(f'Warm-up of {name} model failed')
 
-    except Exception:
-        logger.exception('Transformers not available or failed to initialize')
+        models[name] = wrapper
+        status[name] = 'ready'
 
-    app.config['ML_MODELS'] = models
     return models
 
+
+def inference_service_settings(app):
+    """Socket address, auth key and model directories of the inference service."""
+    address = app.config.get('INFERENCE_SERVICE_ADDRESS') or os.path.join(app.instance_path, 'inference.sock')
+    authkey = str(app.config.get('SECRET_KEY', '')).encode('utf-8')
+    model_dirs = {}
+    for name in MODEL_NAMES:
+        model_dir = os.path.join(app.root_path, 'models', name)
+        if os.path.isdir(model_dir) and os.listdir(model_dir):
+            model_dirs[name] = model_dir
+    return address, authkey, model_dirs
+
+
+def build_inference_client(app):
+    """
+    Client for the out-of-process inference service.
+
+    INFERENCE_SERVICE='auto' starts the service as a child process when none
+    is running yet; 'connect' expects one started with 'flask serve-inference'.
+    """
+    import time
+    from .services.inference_service import InferenceClient, start_inference_service
+
+    address, authkey, model_dirs = inference_service_settings(app)
+    os.makedirs(os.path.dirname(address), exist_ok=True)
+    if app.config.get('INFERENCE_SERVICE') == 'auto':
+        start_inference_service(
+            address, authkey, model_dirs,
+            workers=app.config.get('INFERENCE_SERVICE_WORKERS', 2),
+            queue_size=app.config.get('INFERENCE_SERVICE_QUEUE_SIZE', 64),
+            torch_threads=app.config.get('TORCH_INTRA_OP_THREADS')
+        )
+
+    client = InferenceClient(address, authkey, timeout=app.config.get('INFERENCE_SERVICE_TIMEOUT', 30.0))
+    deadline = time.monotonic() + app.config.get('INFERENCE_SERVICE_CONNECT_TIMEOUT', 60.0)
+    while not client.ping(timeout=1.0):
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f'No inference service answering on {address}')
+        time.sleep(0.5)
+    return client
+
+
+def load_models_in_background(app):
+    """Start load_models in a daemon thread so the app can accept traffic immediately."""
+    import threading
+    app.config.setdefault('ML_MODELS', {name: None for name in MODEL_NAMES})
+    app.config.setdefault('MODEL_STATUS', {name: 'pending' for name in MODEL_NAMES})
+
+    def run():
+        with app.app_context():
+            load_models(app)
+
+    thread = threading.Thread(target=run, name='model-loader', daemon=True)
+    thread.start()
+    return thread
+
+
+def models_ready(app) -> bool:
+    status = app.config.get('MODEL_STATUS') or {}
+    return bool(status) and all(state == 'ready' for state in status.values())
+
+
+def models_loading(app) -> bool:
+    """True while this process is still loading or warming up a model."""
+    busy = ('pending', 'loading', 'warming')
+    return any(state in busy for state in (app.config.get('MODEL_STATUS') or {}).values())
+
+
+def model_readiness(app) -> dict:
+    """
+    Readiness of this process' models.
+
+    state is 'loading' while a model is pending, loading or warming up, then
+    final: 'ready' (every model loaded), 'degraded' (serving the models that
+    loaded; the others are missing or failed) or 'failed' (none loaded).
+    """
+    status = dict(app.config.get('MODEL_STATUS') or {})
+    unavailable = {name: state for name, state in status.items() if state in ('missing', 'failed')}
+    if models_loading(app):
+        state = 'loading'
+    elif status and not unavailable:
+        state = 'ready'
+    elif len(unavailable) < len(status):
+        state = 'degraded'
+    else:
+        state = 'failed'
+    return {
+        'ready': state in ('ready', 'degraded'),
+        'state': state,
+        'models': status,
+        'unavailable': unavailable
+    }
+
+
+def wait_for_models(app, timeout=None) -> bool:
+    """Block until no model is pending/loading/warming; returns models_ready(app)."""
+    import time
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while models_loading(app):
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        time.sleep(0.2)
+    return models_ready(app)
+
+
+def build_prediction_cache(app):
+    """In-memory prediction cache, backed by the shared SQLite store when enabled."""
+    memory = PredictionCache(
+        max_entries=app.config.get('PREDICTION_CACHE_MAX_ENTRIES', 10000),
+        max_bytes=app.config.get('PREDICTION_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+        ttl_seconds=app.config.get('PREDICTION_CACHE_TTL', 3600)
+    )
+    if not app.config.get('PREDICTION_STORE_ENABLED', True):
+        return memory
+
+    store = None
+    path = app.config.get('PREDICTION_STORE_PATH') or os.path.join(app.instance_path, 'prediction_cache.sqlite3')
+    try:
+        store = PersistentPredictionStore(
+            path,
+            max_bytes=app.config.get('PREDICTION_STORE_MAX_BYTES', 256 * 1024 * 1024),
+            ttl_seconds=app.config.get('PREDICTION_STORE_TTL', 7 * 24 * 3600)
+        )
+    except Exception:
+        logger.exception('Persistent prediction store unavailable, using in-memory cache only')
+
+    cache = TieredPredictionCache(memory, store)
+    warmed = cache.warm_start(app.config.get('PREDICTION_STORE_WARM_START', 1000))
+    if warmed:
+        logger.info(f'Warm-started prediction cache with {warmed} entries')
+    return cache
+
 def hash_password(password: str) -> str:
     return generate_password_hash(password)
 
@@ -174,6 +655,32 @@ def token_auth_required(fn):
     return wrapper
 
 
+def models_required(fn):
+    """
+    Answer POSTs with 503 (API / JSON) or a flash message (form posts) while
+    this worker is still loading its models, or when none could be loaded,
+    instead of classifying with no model. Degraded workers keep serving.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if request.method == 'POST':
+            state = model_readiness(current_app)['state']
+            if state in ('loading', 'failed'):
+                loading = state == 'loading'
+                if request.is_json or request.blueprint == 'api':
+                    response = jsonify({'error': 'Models are warming up, retry shortly' if loading
+                                        else 'No classification model is available'})
+                    response.status_code = 503
+                    if loading:
+                        response.headers['Retry-After'] = '5'
+                    return response
+                flash('The classification models are still warming up. Please try again in a few seconds.' if loading
+                      else 'The classification models are unavailable.', 'warning')
+                return redirect(request.url)
+        return fn(*args, **kwargs)
+    return wrapper
+
+
 def role_required(role):
     def decorator(fn):
         @wraps(fn)
@@ -0,0 +1,18 @@
+# gunicorn -c gunicorn.conf.py run:app
+#
+# Preload mode loads both transformers once in the master process; forked
+# workers share the read-only weight pages instead of each loading a copy.
+import os
+
+os.environ.setdefault('MODEL_PRELOAD', '1')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = os.environ['MODEL_PRELOAD'] == '1'
+
+
+def post_fork(server, worker):
+    from app.prefork import init_worker_process
+    init_worker_process(server.app.wsgi())
@@ -0,0 +1,103 @@
+"""
+Benchmark length-bucketed batching against a single unbucketed pipeline call.
+
+    python scripts/benchmark_length_buckets.py --model fake --batch 64
+    python scripts/benchmark_length_buckets.py --input articles.jsonl --text-field text
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from transformers import pipeline
+
+from app.services.length_buckets import padding_efficiency
+from app.utils import SimpleModelWrapper
+
+MODEL_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app', 'models'))
+WORDS = ('the government said on tuesday that new figures show inflation slowed while officials '
+         'warned markets remain volatile and analysts expect further changes next quarter').split()
+
+
+def synthetic_articles(n, seed=0):
+    """Mix of headline-, snippet- and article-length texts."""
+    rng = random.Random(seed)
+    lengths = [15, 40, 120, 350]
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.choice(lengths))) for _ in range(n)]
+
+
+def load_articles(path, text_field, n):
+    texts = []
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            if line.strip():
+                texts.append(json.loads(line)[text_field])
+            if len(texts) >= n:
+                break
+    return texts
+
+
+def top_labels(results):
+    return [max(r, key=lambda s: s['score'])['label'] for r in results]
+
+
+def timed(fn, repeat):
+    best, out = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='fake', choices=('fake', 'classifier'))
+    parser.add_argument('--input', help='JSONL file of articles (default: synthetic mixed lengths)')
+    parser.add_argument('--text-field', default='text')
+    parser.add_argument('--batch', type=int, default=64, help='Articles per predict_batch call')
+    parser.add_argument('--max-batch-size', type=int, default=16)
+    parser.add_argument('--max-batch-tokens', type=int, default=4096)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pipe = pipeline('text-classification', model=os.path.join(MODEL_ROOT, args.model), device=-1)
+    texts = load_articles(args.input, args.text_field, args.batch) if args.input else synthetic_articles(args.batch)
+
+    plain = SimpleModelWrapper(pipe, batching=False, long_doc_aggregation=None, length_bucketing=False)
+    bucketed = SimpleModelWrapper(pipe, batching=False, long_doc_aggregation=None, length_bucketing=True,
+                                  max_batch_size=args.max_batch_size, max_batch_tokens=args.max_batch_tokens)
+
+    lengths = bucketed.token_lengths(texts)
+    print(f'{len(texts)} articles, tokens min/mean/max = '
+          f'{min(lengths)}/{sum(lengths) / len(lengths):.0f}/{max(lengths)}')
+
+    plain.predict_batch(texts[:2])  # warm up
+    t_plain, out_plain = timed(lambda: plain.predict_batch(texts), args.repeat)
+    t_bucket, out_bucket = timed(lambda: bucketed.predict_batch(texts), args.repeat)
+
+    stats = bucketed.padding.get_stats()
+    sub_batches = stats['batches'] // args.repeat
+    print(f'unbucketed: {len(texts) / t_plain:8.1f} articles/s  padding efficiency {padding_efficiency(lengths):.1%}')
+    print(f'bucketed:   {len(texts) / t_bucket:8.1f} articles/s  padding efficiency '
+          f"{stats['padding_efficiency']:.1%} over {sub_batches} sub-batches")
+    print(f'speed-up {t_plain / t_bucket:.2f}x')
+
+    mismatches = sum(a != b for a, b in zip(top_labels(out_plain), top_labels(out_bucket)))
+    print(f'label mismatches: {mismatches}')
+
+    # Interactive traffic: micro-batches of one article, where bucketing must not add a tokenizer pass
+    singles = texts[:min(len(texts), 32)]
+    t_pipe, _ = timed(lambda: [pipe(t, truncation=True) for t in singles], args.repeat)
+    t_single, _ = timed(lambda: [bucketed.predict_batch([t]) for t in singles], args.repeat)
+    print(f'single article: pipeline {t_pipe / len(singles) * 1000:6.1f} ms/article, '
+          f'bucketed wrapper {t_single / len(singles) * 1000:6.1f} ms/article')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark the optimized PyTorch execution mode (TORCH_OPTIMIZE) against the
+default eager pipeline, by sequence length and batch size.
+
+    python scripts/benchmark_torch_modes.py --model fake
+    python scripts/benchmark_torch_modes.py --compile reduce-overhead --seq-lengths 64,256,512
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from transformers import pipeline
+
+from app.services.torch_optimize import describe, load_torch_pipeline, optimize_torch_model
+
+MODEL_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app', 'models'))
+
+
+def make_batch(n_tokens, batch_size):
+    # One word-piece per word for the uncased BERT vocab, minus [CLS]/[SEP]
+    return [' '.join(['news'] * max(1, n_tokens - 2))] * batch_size
+
+
+def run(pipe, texts):
+    return pipe(texts, return_all_scores=True, batch_size=len(texts), truncation=True)
+
+
+def measure(pipe, texts, repeat):
+    run(pipe, texts)  # warm-up (triggers compilation for this shape)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(pipe, texts)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def max_score_diff(a, b):
+    return max(
+        abs(x['score'] - y['score'])
+        for ra, rb in zip(a, b)
+        for x, y in zip(sorted(ra, key=lambda s: s['label']), sorted(rb, key=lambda s: s['label']))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='fake', choices=('fake', 'classifier'))
+    parser.add_argument('--attention', default='sdpa', help="Attention implementation ('sdpa', 'eager')")
+    parser.add_argument('--compile', default='', help="torch.compile mode (empty: no compilation)")
+    parser.add_argument('--seq-lengths', default='32,128,256,512')
+    parser.add_argument('--batch-sizes', default='1,8')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    model_dir = os.path.join(MODEL_ROOT, args.model)
+    default = pipeline('text-classification', model=model_dir, device=-1)
+    optimized = load_torch_pipeline(model_dir, attention=args.attention or None)
+    optimize_torch_model(optimized.model, compile_mode=args.compile or None)
+
+    print(f'default:   {describe(default.model)}')
+    print(f'optimized: {describe(optimized.model)}')
+    print(f"{'tokens':>6} {'batch':>5} | {'default ms':>10} {'art/s':>8} | {'optimized ms':>12} {'art/s':>8} | "
+          f"{'speed-up':>8} {'max |dp|':>9}")
+
+    for n_tokens in [int(n) for n in args.seq_lengths.split(',') if n.strip()]:
+        for batch_size in [int(n) for n in args.batch_sizes.split(',') if n.strip()]:
+            texts = make_batch(n_tokens, batch_size)
+            t_default = measure(default, texts, args.repeat)
+            t_optimized = measure(optimized, texts, args.repeat)
+            diff = max_score_diff(run(default, texts), run(optimized, texts))
+            print(f'{n_tokens:>6} {batch_size:>5} | {t_default * 1000:>10.1f} {batch_size / t_default:>8.1f} | '
+                  f'{t_optimized * 1000:>12.1f} {batch_size / t_optimized:>8.1f} | '
+                  f'{t_default / t_optimized:>7.2f}x {diff:>9.2e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'app', 'models')
+
+
+@pytest.fixture
+def tiny_pipeline():
+    """Factory for a text-classification pipeline with a tiny random BERT and the shipped tokenizer."""
+    torch = pytest.importorskip('torch')
+    transformers = pytest.importorskip('transformers')
+    tokenizer = transformers.AutoTokenizer.from_pretrained(os.path.join(MODELS_DIR, 'classifier'))
+
+    def build(num_labels=2, seed=0):
+        torch.manual_seed(seed)
+        config = transformers.BertConfig(
+            vocab_size=len(tokenizer), hidden_size=32, num_hidden_layers=1, num_attention_heads=2,
+            intermediate_size=37, max_position_embeddings=512, num_labels=num_labels
+        )
+        model = transformers.BertForSequenceClassification(config).eval()
+        return transformers.pipeline('text-classification', model=model, tokenizer=tokenizer, device=-1)
+
+    return build
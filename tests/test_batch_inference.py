@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from app.services.batch_inference import MicroBatcher
+
+
+def test_predict_returns_each_callers_output():
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_wait_ms=1)
+    assert batcher.predict(21, timeout=5) == 42
+
+
+def test_concurrent_requests_are_coalesced():
+    release = threading.Event()
+    sizes = []
+
+    def batch_fn(items):
+        release.wait(5)
+        sizes.append(len(items))
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+    first = batcher.submit('a')
+    futures = [batcher.submit(c) for c in 'bcdef']
+    release.set()
+
+    assert first.result(timeout=5) == 'A'
+    assert [f.result(timeout=5) for f in futures] == list('BCDEF')
+    assert sum(sizes) == 6
+    assert len(sizes) < 6
+    stats = batcher.get_stats()
+    assert stats['items_run'] == 6
+    assert stats['batches_run'] == len(sizes)
+
+
+def test_batch_size_is_bounded():
+    sizes = []
+    batcher = MicroBatcher(lambda items: sizes.append(len(items)) or items, max_batch_size=3, max_wait_ms=20)
+    futures = [batcher.submit(i) for i in range(10)]
+    assert [f.result(timeout=5) for f in futures] == list(range(10))
+    assert max(sizes) <= 3
+
+
+def test_batch_errors_reach_every_caller():
+    def batch_fn(items):
+        raise ValueError('boom')
+
+    batcher = MicroBatcher(batch_fn, max_wait_ms=1)
+    with pytest.raises(ValueError, match='boom'):
+        batcher.predict('x', timeout=5)
+
+
+def test_wrong_output_count_is_an_error():
+    batcher = MicroBatcher(lambda items: [], max_wait_ms=1)
+    with pytest.raises(RuntimeError, match='0 outputs for 1 inputs'):
+        batcher.predict('x', timeout=5)
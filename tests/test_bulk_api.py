@@ -0,0 +1,129 @@
+import io
+import json
+
+import flask
+import pytest
+
+from app.database import db
+from app.models import ArticleResult, User
+
+ARTICLE = 'The city council approved a new budget for public libraries on Tuesday.'
+
+
+def fake_predictions(monkeypatch):
+    monkeypatch.setattr('app.classification.predict_category_batch',
+                        lambda texts: [('politics', 0.9) for _ in texts])
+    monkeypatch.setattr('app.classification.predict_fake_news_batch',
+                        lambda texts: [('fake' if 'hoax' in t else 'real', 0.8) for t in texts])
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    from app.api import api_bp
+
+    app = flask.Flask(__name__, instance_path=str(tmp_path))
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'app.db'}",
+        MODEL_STATUS={'classifier': 'ready', 'fake': 'ready'},
+        API_BATCH_MAX_ITEMS=3,
+        STREAM_CHUNK_SIZE=2,
+    )
+    db.init_app(app)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+        user = User(name='Reader', email='reader@example.com', password_hash='x', api_token='token')
+        db.session.add(user)
+        db.session.commit()
+    fake_predictions(monkeypatch)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = 'Bearer token'
+    return client
+
+
+def saved_texts(app):
+    with app.app_context():
+        return [r.article_text for r in ArticleResult.query.order_by(ArticleResult.id)]
+
+
+def test_batch_classifies_in_order_and_reports_invalid_items(app, client):
+    response = client.post('/api/classify/batch', json={'articles': [
+        ARTICLE, {'id': 'b', 'text': 'A hoax about the moon landing.'}, {'id': 'c', 'text': ' '}
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [r['model_result'] for r in body['results'][:2]] == ['real', 'fake']
+    assert body['results'][1]['id'] == 'b'
+    assert body['results'][2]['error'] == 'text required'
+    assert (body['saved'], body['errors']) == (2, 1)
+    assert len(saved_texts(app)) == 2
+
+
+def test_batch_items_are_sanitized_like_single_articles(app, client):
+    response = client.post('/api/classify/batch', json={'articles': [
+        '<script>alert(1)</script> ' + ARTICLE, {'id': 1, 'text': 'Q&A: ' + ARTICLE}
+    ]})
+    assert response.status_code == 200
+    assert saved_texts(app) == ['&lt;script&gt;alert(1)&lt;/script&gt; ' + ARTICLE, 'Q&amp;A: ' + ARTICLE]
+
+
+def test_batch_over_the_item_limit_is_rejected(app, client):
+    response = client.post('/api/classify/batch', json={'articles': [ARTICLE] * 4})
+    assert response.status_code == 413
+    assert saved_texts(app) == []
+
+
+def test_batch_requires_a_list_and_a_token(app, client):
+    assert client.post('/api/classify/batch', json={'articles': ARTICLE}).status_code == 400
+    assert app.test_client().post('/api/classify/batch', json={'articles': [ARTICLE]}).status_code == 401
+
+
+def stream(client, body, **kwargs):
+    response = client.post('/api/classify/stream', data=body, content_type='application/x-ndjson', **kwargs)
+    return response, [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_returns_one_ndjson_result_per_line(app, client):
+    body = '\n'.join([json.dumps(ARTICLE), '{not json', '', json.dumps({'id': 7, 'text': 'A hoax story.'})]) + '\n'
+    response, results = stream(client, body)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert [r['index'] for r in results] == [0, 1, 2]
+    assert results[0]['model_result'] == 'real'
+    assert results[1]['error'] == 'invalid JSON'
+    assert (results[2]['id'], results[2]['model_result']) == (7, 'fake')
+    assert len(saved_texts(app)) == 2
+
+
+def test_stream_rejects_oversized_lines_and_keeps_going(app, client):
+    app.config['STREAM_MAX_LINE_BYTES'] = 200
+    body = json.dumps('x' * 500) + '\n' + json.dumps(ARTICLE) + '\n'
+    _, results = stream(client, body, query_string={'persist': '0'})
+    assert results[0]['error'] == 'line too long'
+    assert results[1]['model_result'] == 'real'
+    assert saved_texts(app) == []
+
+
+def test_stream_body_is_limited_by_default(app, client):
+    from app.config import Config
+
+    assert Config.STREAM_MAX_CONTENT_LENGTH
+    app.config['STREAM_MAX_CONTENT_LENGTH'] = 100
+    response = client.post('/api/classify/stream', data=(json.dumps(ARTICLE) + '\n') * 5,
+                           content_type='application/x-ndjson')
+    assert response.status_code == 413
+    assert saved_texts(app) == []
+
+
+def test_ndjson_lines_are_read_with_a_bounded_buffer():
+    from app.services.bulk_classification import iter_ndjson_articles
+
+    raw = io.BytesIO(b'"short"\n' + b'"' + b'y' * 64 + b'"\n' + b'{"text": "ok"}')
+    assert list(iter_ndjson_articles(raw, max_line_bytes=16)) == [
+        'short', {'_parse_error': 'line too long'}, {'text': 'ok'}
+    ]
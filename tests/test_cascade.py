@@ -0,0 +1,76 @@
+import flask
+import pytest
+
+from app.services.cascade import ConfidenceCascade, FastFakeNewsModel, init_cascade, train_fast_model
+
+REAL = [f'The council approved the {w} budget after a public hearing on Tuesday.'
+        for w in ('library', 'school', 'transport', 'parks', 'housing', 'water', 'health', 'police', 'fire', 'roads')]
+FAKE = [f'Shocking secret cure for {w} that doctors do not want you to know about!!!'
+        for w in ('cancer', 'ageing', 'baldness', 'diabetes', 'flu', 'obesity', 'arthritis', 'asthma', 'acne', 'stress')]
+
+
+class StubFastModel:
+    def __init__(self, answers):
+        self.answers = answers
+
+    def predict_batch(self, texts):
+        return [self.answers[t] for t in texts]
+
+
+def test_confident_articles_skip_the_transformer():
+    cascade = ConfidenceCascade(StubFastModel({'a': ('real', 0.97), 'b': ('fake', 0.6), 'c': ('fake', 0.95)}),
+                                threshold=0.9)
+    escalated = []
+
+    def transformer(batch):
+        escalated.append(list(batch))
+        return [('real', 0.8) for _ in batch]
+
+    assert cascade.predict_batch(['a', 'b', 'c'], transformer) == [('real', 0.97), ('real', 0.8), ('fake', 0.95)]
+    assert escalated == [['b']]
+    stats = cascade.get_stats()
+    assert (stats['stage1_answered'], stats['escalated']) == (2, 1)
+    assert stats['stage1_hit_rate'] == pytest.approx(2 / 3)
+
+
+def test_fully_confident_batch_never_calls_the_transformer():
+    cascade = ConfidenceCascade(StubFastModel({'a': ('real', 0.99)}), threshold=0.9)
+    assert cascade.predict('a', lambda text: pytest.fail('escalated')) == ('real', 0.99)
+
+
+def test_training_reports_coverage_and_round_trips(tmp_path):
+    model, report = train_fast_model(REAL + FAKE, ['real'] * 10 + ['fake'] * 10, threshold=0.5, holdout=0.2)
+    assert report['samples'] == 20
+    assert 0.0 <= report['stage1_coverage'] <= 1.0 and 0.0 <= report['holdout_accuracy'] <= 1.0
+
+    path = str(tmp_path / 'cascade_fake.pkl')
+    model.save(path)
+    loaded = FastFakeNewsModel.load(path)
+    assert loaded.predict_batch([REAL[0], FAKE[0]]) == model.predict_batch([REAL[0], FAKE[0]])
+    assert [label for label, _ in loaded.predict_batch([REAL[0], FAKE[0]])] == ['real', 'fake']
+
+
+def test_training_needs_both_labels():
+    with pytest.raises(ValueError):
+        train_fast_model(REAL, ['real'] * len(REAL))
+
+
+def test_init_cascade_without_a_trained_model_is_not_ready(tmp_path):
+    app = flask.Flask(__name__, instance_path=str(tmp_path))
+    assert init_cascade(app) is None
+
+    app.config.update(CASCADE_ENABLED=True, CASCADE_THRESHOLD=0.8)
+    cascade = init_cascade(app)
+    assert app.config['CASCADE'] is cascade
+    assert cascade.threshold == 0.8 and not cascade.ready
+
+
+def test_fake_news_predictions_go_through_the_cascade(tmp_path):
+    from app.classification import predict_fake_news_batch
+
+    app = flask.Flask(__name__, instance_path=str(tmp_path))
+    app.config.update(ML_MODELS={'fake': None}, PREDICTION_CACHE=None,
+                      CASCADE=ConfidenceCascade(StubFastModel({'a': ('fake', 0.99), 'b': ('real', 0.55)})))
+    with app.app_context():
+        # No transformer loaded: only the uncertain article is left without a verdict
+        assert predict_fake_news_batch(['a', 'b']) == [('fake', 0.99), (None, 0.0)]
@@ -0,0 +1,122 @@
+import json
+import pickle
+
+import click
+import click.testing
+import flask
+import pytest
+
+from app import cli
+from app.cli import classify_file_command, worker_config
+from app.database import db
+from app.models import ArticleResult
+
+ARTICLES = [f'Article number {i} about the city council budget vote.' for i in range(5)]
+
+
+def fake_classify(items):
+    return [{'index': i, 'id': item.get('id'), 'error': None, 'text': item['text'], 'category': 'politics',
+             'category_confidence': 0.9, 'model_result': 'real', 'model_confidence': 0.8,
+             'gemini_result': None, 'final_displayed_result': 'real', 'comparison_status': 'model_only'}
+            for i, item in enumerate(items)]
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = flask.Flask(__name__, instance_path=str(tmp_path))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'app.db'}"
+    db.init_app(app)
+    app.cli.add_command(classify_file_command)
+    with app.app_context():
+        db.create_all()
+    monkeypatch.setattr(cli, '_load_for_classification', lambda app: None)
+    monkeypatch.setattr('app.services.bulk_classification.classify_articles', fake_classify)
+    return app
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / 'articles.jsonl'
+    path.write_text(''.join(json.dumps({'id': i, 'text': t}) + '\n' for i, t in enumerate(ARTICLES)))
+    return str(path)
+
+
+def classify(app, input_file, checkpoint):
+    return app.test_cli_runner().invoke(args=[
+        'classify-file', input_file, '--workers', '0', '--batch-size', '2', '--insert-batch', '2',
+        '--checkpoint', checkpoint
+    ])
+
+
+def saved_texts(app):
+    with app.app_context():
+        return [r.article_text for r in ArticleResult.query.order_by(ArticleResult.id)]
+
+
+def test_classifies_and_checkpoints_every_record(app, input_file, tmp_path):
+    checkpoint = str(tmp_path / 'run.checkpoint')
+    result = classify(app, input_file, checkpoint)
+    assert result.exit_code == 0, result.output
+    assert saved_texts(app) == ARTICLES
+    with open(checkpoint) as fh:
+        assert json.load(fh)['offset'] == len(ARTICLES)
+
+    # A finished checkpoint makes a rerun a no-op
+    assert classify(app, input_file, checkpoint).exit_code == 0
+    assert saved_texts(app) == ARTICLES
+
+
+def test_crash_between_insert_and_checkpoint_does_not_duplicate(app, input_file, tmp_path, monkeypatch):
+    checkpoint = str(tmp_path / 'run.checkpoint')
+    write_checkpoint = cli._write_checkpoint
+    calls = []
+
+    def crash_after_second_insert(path, input_path, offset, pending=None):
+        calls.append(pending)
+        if len(calls) == 4:
+            raise RuntimeError('killed')
+        write_checkpoint(path, input_path, offset, pending)
+
+    monkeypatch.setattr(cli, '_write_checkpoint', crash_after_second_insert)
+    result = classify(app, input_file, checkpoint)
+    assert isinstance(result.exception, RuntimeError)
+    assert saved_texts(app) == ARTICLES[:4]
+    with open(checkpoint) as fh:
+        assert json.load(fh)['offset'] == 2
+
+    monkeypatch.setattr(cli, '_write_checkpoint', write_checkpoint)
+    result = classify(app, input_file, checkpoint)
+    assert result.exit_code == 0, result.output
+    assert 'Resuming from record 4' in result.output
+    assert saved_texts(app) == ARTICLES
+
+
+def test_uncommitted_pending_batch_is_redone(app, input_file, tmp_path):
+    checkpoint = str(tmp_path / 'run.checkpoint')
+    cli._write_checkpoint(checkpoint, input_file, 0, {
+        'offset': 2, 'after_id': 0, 'user_id': None, 'last_text': ARTICLES[1]
+    })
+    result = classify(app, input_file, checkpoint)
+    assert result.exit_code == 0, result.output
+    assert saved_texts(app) == ARTICLES
+
+
+def test_worker_config_keeps_settings_and_drops_runtime_objects():
+    app = flask.Flask(__name__)
+    app.config.update(LENGTH_BUCKETING=False, LONG_DOC_AGGREGATION='max', WARMUP_SEQ_LENGTHS=[32, 64],
+                      ML_MODELS={'fake': object()}, MODEL_STATUS={'fake': 'ready'}, PREDICTION_CACHE=object())
+    config = worker_config(app.config)
+    assert config['LENGTH_BUCKETING'] is False
+    assert config['LONG_DOC_AGGREGATION'] == 'max'
+    assert config['WARMUP_SEQ_LENGTHS'] == [32, 64]
+    assert not {'ML_MODELS', 'MODEL_STATUS', 'PREDICTION_CACHE'} & set(config)
+    pickle.dumps(config)
+
+
+def test_cli_commands_build_the_app_without_models():
+    @click.command('probe')
+    def probe():
+        click.echo(cli.running_cli_command())
+
+    assert not cli.running_cli_command()
+    assert click.testing.CliRunner().invoke(probe).output.strip() == 'True'
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+
+import pytest
+
+flask = pytest.importorskip('flask')
+pytest.importorskip('google.generativeai')
+
+from app import classification  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.services import xai_pipeline  # noqa: E402
+
+TEXT = 'The council approved the library budget on Tuesday, officials said. ' * 5
+SUMMARY = '- approved'
+EXPLANATION = 'Matches public records.'
+
+
+class StreamingGemini:
+    """Stands in for GeminiService: streams two partial parses, then the analysis."""
+
+    explanation_from_analysis = staticmethod(xai_pipeline.GeminiService.explanation_from_analysis)
+
+    def __init__(self, chunk_delay=0.05, stall=None):
+        self.chunk_delay = chunk_delay
+        self.stall = stall
+
+    def is_cached(self, article_text, verdict_only=False):
+        return False
+
+    def is_available(self):
+        return True
+
+    def stream_article_comprehensive(self, article_text):
+        time.sleep(self.chunk_delay)
+        yield 'partial', {'summary': SUMMARY, 'explanation': None}
+        if self.stall is not None:
+            self.stall.wait(5)
+        time.sleep(self.chunk_delay)
+        yield 'partial', {'summary': SUMMARY, 'explanation': EXPLANATION}
+        yield 'analysis', {'verdict': 'REAL', 'summary': SUMMARY, 'explanation': EXPLANATION}
+
+
+def parse_sse(body):
+    events = []
+    for block in body.split('\n\n'):
+        if not block.strip():
+            continue
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = flask.Flask(__name__, instance_path=str(tmp_path))
+    app.config.from_object(Config)
+    app.config.update(MODEL_STATUS={'classifier': 'ready', 'fake': 'ready'}, ML_MODELS={'fake': None})
+    app.register_blueprint(classification.classify_bp)
+    monkeypatch.setattr(classification, 'predict_fake_news', lambda text: ('real', 0.91))
+    return app
+
+
+def use_gemini(monkeypatch, fake):
+    class Service(StreamingGemini):
+        def __new__(cls):
+            return fake
+
+    monkeypatch.setattr(xai_pipeline, 'GeminiService', Service)
+
+
+def explain(app):
+    response = app.test_client().post('/get_explanation/stream', json={'text': TEXT})
+    return response, parse_sse(response.get_data(as_text=True))
+
+
+def test_events_are_framed_and_end_with_the_full_payload(app, monkeypatch):
+    use_gemini(monkeypatch, StreamingGemini())
+    monkeypatch.setattr(classification, 'explain_prediction', lambda text, model: ('<p>lime</p>', None))
+    response, events = explain(app)
+
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.headers['X-Accel-Buffering'] == 'no'
+    names = [name for name, _ in events]
+    assert names[0] == 'prediction' and names[-1] == 'done'
+    assert events[0][1]['prediction_label'] == 'real'
+    assert events[0][1]['confidence_score'] == pytest.approx(91.0)
+    assert ('lime', {'lime_html': '<p>lime</p>'}) in events
+
+    gemini = [data for name, data in events if name == 'gemini']
+    assert [g['done'] for g in gemini] == [False, False, True]
+    assert gemini[-1]['explanation'] == EXPLANATION
+
+    done = events[-1][1]
+    assert (done['summary'], done['explanation'], done['lime_html']) == (SUMMARY, EXPLANATION, '<p>lime</p>')
+
+
+def test_lime_is_sent_while_gemini_still_streams(app, monkeypatch):
+    stall = threading.Event()
+    use_gemini(monkeypatch, StreamingGemini(stall=stall))
+
+    def lime(text, model):
+        time.sleep(0.2)
+        stall.set()  # Gemini only finishes after LIME
+        return '<p>lime</p>', None
+
+    monkeypatch.setattr(classification, 'explain_prediction', lime)
+    _, events = explain(app)
+    names = [name if name != 'gemini' else ('gemini-done' if data['done'] else 'gemini')
+             for name, data in events]
+    assert names.index('lime') < names.index('gemini-done')
+    assert names.index('gemini') < names.index('lime')
+
+
+def test_a_stalled_gemini_stream_is_cut_at_the_deadline(app, monkeypatch):
+    stall = threading.Event()
+    app.config['GEMINI_DEADLINE_SECONDS'] = 0.5
+    use_gemini(monkeypatch, StreamingGemini(stall=stall))
+    monkeypatch.setattr(classification, 'explain_prediction', lambda text, model: ('<p>lime</p>', None))
+    try:
+        started = time.monotonic()
+        _, events = explain(app)
+        assert time.monotonic() - started < 3
+    finally:
+        stall.set()
+
+    gemini = [data for name, data in events if name == 'gemini']
+    assert gemini[-1] == {'summary': None, 'explanation': None, 'done': True}
+    done = events[-1]
+    assert done[0] == 'done' and done[1]['lime_html'] == '<p>lime</p>'
+    assert done[1]['summary'] == 'No summary available.'
+
+
+def test_missing_text_is_rejected(app):
+    assert app.test_client().post('/get_explanation/stream', json={}).status_code == 400
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip('torch')
+flask = pytest.importorskip('flask')
+
+from app.classification import classify_article  # noqa: E402
+from app.utils import SimpleModelWrapper, fused_scores  # noqa: E402
+
+from .test_model_wrapper import assert_same_scores, count_tokenizer_calls  # noqa: E402
+
+SHORT = 'Officials confirmed the new budget for public libraries on Tuesday.'
+
+
+@pytest.fixture
+def wrappers(tiny_pipeline):
+    classifier = SimpleModelWrapper(tiny_pipeline(num_labels=9, seed=1), batching=True, name='classifier')
+    fake = SimpleModelWrapper(tiny_pipeline(num_labels=2, seed=2), batching=True, name='fake')
+    return classifier, fake
+
+
+def test_short_texts_are_fused_when_batching_is_on(wrappers, monkeypatch):
+    classifier, fake = wrappers
+    expected = [classifier.predict_batch([SHORT])[0], fake.predict_batch([SHORT])[0]]
+    calls = count_tokenizer_calls(monkeypatch, classifier.pipeline.tokenizer)
+
+    scores = fused_scores([classifier, fake], SHORT)
+
+    assert scores is not None
+    assert len(calls) == 1
+    assert_same_scores(expected, scores)
+    assert classifier.batcher.get_stats()['items_run'] == 0
+    assert fake.batcher.get_stats()['items_run'] == 0
+
+
+def test_classify_article_takes_the_fused_path(wrappers, monkeypatch):
+    classifier, fake = wrappers
+    app = flask.Flask(__name__)
+    app.config.update(ML_MODELS={'classifier': classifier, 'fake': fake}, PREDICTION_CACHE=None)
+    calls = count_tokenizer_calls(monkeypatch, classifier.pipeline.tokenizer)
+
+    with app.app_context():
+        result = classify_article(SHORT)
+
+    assert len(calls) == 1
+    assert result['fake_news_label'] in ('real', 'fake')
+    assert result['category']
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip('google.generativeai')
+
+from app.services.gemini_service import GeminiService, pack_batches  # noqa: E402
+
+parse = GeminiService._parse_batch_verdicts
+
+
+def test_pack_batches_respects_item_and_token_limits():
+    items = [(f'id{i}', 'word ' * 400) for i in range(7)]
+    batches = pack_batches(items, max_items=3, max_tokens=100000, item_max_tokens=2000)
+    assert [len(b) for b in batches] == [3, 3, 1]
+
+    batches = pack_batches(items, max_items=20, max_tokens=1000, item_max_tokens=2000, overhead_tokens=100)
+    assert all(len(b) <= 1000 // 521 for b in batches)
+    assert [item for b in batches for item in b] == items
+
+
+def test_long_items_are_charged_at_most_the_item_limit():
+    items = [('a', 'word ' * 100000), ('b', 'word ' * 100000)]
+    assert len(pack_batches(items, max_items=20, max_tokens=5000, item_max_tokens=2000)) == 1
+
+
+def test_parse_json_verdicts():
+    text = '```json\n[{"id": "A1", "verdict": "real"}, {"id": "A2", "verdict": "FAKE"}, {"id": "A3", "verdict": "maybe"}]\n```'
+    assert parse(text) == {'A1': 'REAL', 'A2': 'FAKE'}
+
+
+def test_parse_line_fallback():
+    assert parse('A1: REAL\n- A2 - fake\nA3 unsure') == {'A1': 'REAL', 'A2': 'FAKE'}
+
+
+def test_duplicate_ids_reject_the_response():
+    assert parse('[{"id": "A1", "verdict": "REAL"}, {"id": "A1", "verdict": "FAKE"}]') == {}
+    assert parse('A1: REAL\nA2: FAKE\nA2: REAL') == {}
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from app.services.gemini_cache import GeminiResponseCache, gemini_cache_key
+from app.services.prediction_cache import PredictionCache
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = GeminiResponseCache(PredictionCache())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'verdict': 'REAL'}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{'verdict': 'REAL'}] * 5
+    assert cache.get_stats()['coalesced'] == 4
+    assert cache.get_or_compute('k', compute) == {'verdict': 'REAL'}
+    assert len(calls) == 1
+
+
+def test_uncacheable_results_are_not_stored():
+    cache = GeminiResponseCache(PredictionCache())
+    assert cache.get_or_compute('k', lambda: {'verdict': 'ERROR'}, cacheable=lambda v: v['verdict'] != 'ERROR')
+    assert cache.get('k') is None
+    assert cache.get_or_compute('none', lambda: None) is None
+    assert cache.get_stats()['gemini_calls'] == 2
+
+
+def test_errors_propagate_and_clear_the_in_flight_entry():
+    cache = GeminiResponseCache(PredictionCache())
+
+    def fail():
+        raise RuntimeError('quota')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('k', fail)
+    assert cache.get_stats()['in_flight'] == 0
+    assert cache.get_or_compute('k', lambda: {'verdict': 'FAKE'}) == {'verdict': 'FAKE'}
+
+
+def test_key_depends_on_prompt_version():
+    assert gemini_cache_key('text', 'gemini-2.5-flash', 'v1') != gemini_cache_key('text', 'gemini-2.5-flash', 'v2')
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+flask = pytest.importorskip('flask')
+pytest.importorskip('google.generativeai')
+
+from app.config import Config  # noqa: E402
+from app.services import classification_comparison, xai_pipeline  # noqa: E402
+
+TEXT = 'The council approved the library budget on Tuesday, officials said. ' * 5
+ANALYSIS = {'verdict': 'REAL', 'summary': '- approved', 'explanation': 'Matches public records.'}
+
+
+class FakeGemini:
+    """Stands in for GeminiService: records when each call starts and takes `delay` seconds."""
+
+    explanation_from_analysis = staticmethod(xai_pipeline.GeminiService.explanation_from_analysis)
+
+    def __init__(self, delay=0.3):
+        self.delay = delay
+        self.started = threading.Event()
+
+    def is_cached(self, article_text, verdict_only=False):
+        return False
+
+    def is_available(self):
+        return True
+
+    def analyze_article_comprehensive(self, article_text):
+        self.started.set()
+        time.sleep(self.delay)
+        return ANALYSIS
+
+    def verify_article(self, article_text):
+        self.started.set()
+        time.sleep(self.delay)
+        return {'verdict': 'FAKE'}
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = flask.Flask(__name__, instance_path=str(tmp_path))
+    app.config.from_object(Config)
+    return app
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    fake = FakeGemini()
+
+    class Service(FakeGemini):
+        def __new__(cls):
+            return fake
+
+    monkeypatch.setattr(xai_pipeline, 'GeminiService', Service)
+    monkeypatch.setattr(classification_comparison, 'GeminiService', Service)
+    return fake
+
+
+def test_gemini_overlaps_local_inference_by_default(app, gemini):
+    def predict(text):
+        # Gemini must already be running while the local model predicts
+        assert gemini.started.wait(2)
+        return 'Fake', 55.0
+
+    with app.app_context():
+        result = xai_pipeline.XAIPipeline().process_classification(TEXT, predict)
+
+    assert result['routing_reason'] == 'speculative'
+    assert result['verification_triggered']
+    assert result['decision_source'] == 'ML_GEMINI'
+    assert result['summary'] == '- approved'
+
+
+def test_confident_results_do_not_wait_for_gemini(app, gemini):
+    gemini.delay = 2.0
+    with app.app_context():
+        started = time.monotonic()
+        result = xai_pipeline.XAIPipeline().process_classification(TEXT, lambda text: ('Real', 97.0))
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+    assert result['routing_reason'] == 'confident_ml'
+    assert not result['verification_triggered']
+    assert result['decision_source'] == 'ML_ONLY'
+
+
+def test_comparison_verification_overlaps_and_respects_confidence(app, gemini):
+    with app.app_context():
+        service = classification_comparison.ClassificationComparisonService()
+        call = service.start_verification(TEXT)
+        assert gemini.started.wait(2)
+        uncertain = service.classify_with_comparison(TEXT, 'real', 0.55, gemini_call=call)
+
+        gemini.delay = 2.0
+        call = service.start_verification(TEXT)
+        started = time.monotonic()
+        confident = service.classify_with_comparison(TEXT, 'real', 0.97, gemini_call=call)
+        elapsed = time.monotonic() - started
+
+    assert uncertain['processing_details']['gemini_routing'] == 'speculative'
+    assert uncertain['comparison_status'] == 'conflict'
+    assert confident['processing_details']['gemini_routing'] == 'confident_ml'
+    assert confident['comparison_status'] == 'model_only'
+    assert elapsed < 1.0
@@ -0,0 +1,49 @@
+import pytest
+
+from app.services.gemini_rate_limit import BULK, INTERACTIVE, RateLimitTimeout, SharedTokenBucket
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    # Practically no refill during a test
+    return SharedTokenBucket(str(tmp_path / 'bucket.sqlite3'), calls_per_minute=0.001, burst=5, bulk_reserve=0.4)
+
+
+def test_bulk_calls_leave_the_interactive_reserve(bucket):
+    taken = 0
+    while bucket._try_take(BULK) == 0.0:
+        taken += 1
+    assert taken == 3  # 2 of the 5 tokens are reserved for interactive calls
+    assert bucket._try_take(INTERACTIVE) == 0.0
+    assert bucket._try_take(INTERACTIVE) == 0.0
+    assert bucket._try_take(INTERACTIVE) > 0.0
+
+
+def test_bulk_waits_while_interactive_callers_are_queued(bucket):
+    bucket._set_waiting('w1', INTERACTIVE, 9e9)
+    assert bucket._try_take(BULK) > 0.0
+    bucket._set_waiting('w1', INTERACTIVE, None)
+    assert bucket._try_take(BULK) == 0.0
+
+
+def test_acquire_times_out_when_empty(bucket):
+    for _ in range(5):
+        bucket.acquire(INTERACTIVE, max_wait=0)
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(INTERACTIVE, max_wait=0.1)
+    queue = bucket.get_stats()['queues'][INTERACTIVE]
+    assert (queue['acquired'], queue['timeouts']) == (5, 1)
+
+
+def test_penalize_drains_the_bucket_for_every_instance(bucket, tmp_path):
+    other = SharedTokenBucket(str(tmp_path / 'bucket.sqlite3'), calls_per_minute=0.001, burst=5)
+    bucket.penalize()
+    assert other._try_take(INTERACTIVE) > 0.0
+    assert bucket.get_stats()['throttled_429'] == 1
+
+
+def test_try_acquire_never_waits_and_counts_tokens(bucket):
+    assert all(bucket.try_acquire(INTERACTIVE) for _ in range(5))
+    assert not bucket.try_acquire(INTERACTIVE)
+    queue = bucket.get_stats()['queues'][INTERACTIVE]
+    assert (queue['acquired'], queue['timeouts']) == (5, 0)
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+from app.services import gemini_resilience
+from app.services.gemini_rate_limit import SharedTokenBucket
+from app.services.gemini_resilience import AttemptsExhaustedError, CircuitBreaker, ResilientGenerativeModel
+
+
+def fail(breaker, times=1):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record(False, 0.1)
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    fail(breaker, 2)
+    assert breaker.state == CircuitBreaker.CLOSED
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.available()
+    assert not breaker.allow()
+    stats = breaker.get_stats()
+    assert (stats['times_opened'], stats['short_circuited']) == (1, 1)
+
+
+def test_success_resets_the_failure_streak():
+    breaker = CircuitBreaker(failure_threshold=2)
+    fail(breaker)
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=1.0)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record(True, 2.5)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.get_stats()['slow_calls'] == 2
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05, half_open_probes=1)
+    fail(breaker)
+    time.sleep(0.1)
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.1)
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_event_counters():
+    breaker = CircuitBreaker()
+    breaker.count('hedged')
+    breaker.count('hedge_wins')
+    breaker.count('timeouts')
+    stats = breaker.get_stats()
+    assert (stats['hedged'], stats['hedge_wins'], stats['timeouts']) == (1, 1, 1)
+
+
+class SlowModel:
+    """First call takes `first_delay` seconds, later calls return at once; `release` unblocks hung calls."""
+
+    def __init__(self, first_delay=0.5):
+        self.first_delay = first_delay
+        self.calls = 0
+        self.release = threading.Event()
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        if self.calls == 1 or self.first_delay is None:
+            self.release.wait(self.first_delay)
+        return f'response {self.calls}'
+
+
+@pytest.fixture
+def resilient(monkeypatch):
+    """Configure gemini_resilience outside Flask; returns a factory taking config overrides."""
+    breaker = CircuitBreaker(failure_threshold=100)
+    state = {'limiter': None}
+    monkeypatch.setattr(gemini_resilience, 'get_circuit_breaker', lambda: breaker)
+    monkeypatch.setattr(gemini_resilience, 'get_rate_limiter', lambda: state['limiter'])
+    monkeypatch.setattr(gemini_resilience, '_attempts', None)
+
+    def build(model, limiter=None, **config):
+        state['limiter'] = limiter
+        monkeypatch.setattr(gemini_resilience, 'config_value', lambda key, default: config.get(key, default))
+        return ResilientGenerativeModel(model), breaker
+
+    return build
+
+
+def test_hedge_takes_a_rate_limit_token(resilient, tmp_path):
+    bucket = SharedTokenBucket(str(tmp_path / 'bucket.sqlite3'), calls_per_minute=0.001, burst=3)
+    model, breaker = resilient(SlowModel(), limiter=bucket, GEMINI_HEDGE_AFTER=0.05)
+    assert model.generate_content('x') == 'response 2'
+    assert breaker.get_stats()['hedged'] == 1
+    assert breaker.get_stats()['hedge_wins'] == 1
+    assert bucket.get_stats()['queues']['interactive']['acquired'] == 2
+
+
+def test_no_hedge_without_a_spare_token(resilient, tmp_path):
+    bucket = SharedTokenBucket(str(tmp_path / 'bucket.sqlite3'), calls_per_minute=0.001, burst=1)
+    slow = SlowModel(first_delay=0.2)
+    model, breaker = resilient(slow, limiter=bucket, GEMINI_HEDGE_AFTER=0.05)
+    assert model.generate_content('x') == 'response 1'
+    assert slow.calls == 1
+    assert breaker.get_stats()['hedged'] == 0
+
+
+def test_hung_attempts_hold_their_slots(resilient):
+    hung = SlowModel(first_delay=None)
+    hung.release.clear()
+    model, breaker = resilient(hung, GEMINI_MAX_CONCURRENCY=1, GEMINI_CALL_TIMEOUT=0.05)
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            model.generate_content('x')
+    with pytest.raises(AttemptsExhaustedError):
+        model.generate_content('x')
+    assert breaker.get_stats()['timeouts'] == 2
+
+    hung.release.set()
+    time.sleep(0.1)
+    assert model.generate_content('x').startswith('response')
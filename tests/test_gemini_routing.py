@@ -0,0 +1,46 @@
+from app.services.gemini_rate_limit import SharedCallBudget
+from app.services.gemini_routing import GeminiRoutingPolicy
+
+TEXT = 'An article long enough to verify. ' * 10
+
+
+def test_confidence_bands():
+    policy = GeminiRoutingPolicy(verify_below=80)
+    assert policy.decide(TEXT, confidence=95.0) == (False, 'confident_ml')
+    assert policy.decide(TEXT, confidence=42.0) == (True, 'low_confidence')
+    assert policy.decide(TEXT) == (False, 'deferred')
+    assert policy.decide(TEXT, confidence=95.0, explicit=True) == (True, 'explicit')
+
+
+def test_confidence_is_in_percent():
+    policy = GeminiRoutingPolicy(verify_below=80)
+    assert policy.decide(TEXT, confidence=0.99) == (True, 'low_confidence')
+
+
+def test_cache_breaker_and_length_gates():
+    policy = GeminiRoutingPolicy(min_chars=50, max_chars=1000)
+    assert policy.decide('short', cached=True) == (True, 'cache_hit')
+    assert policy.decide(TEXT, confidence=10.0, available=False) == (False, 'circuit_open')
+    assert policy.decide('short', confidence=10.0) == (False, 'too_short')
+    assert policy.decide(TEXT * 10, confidence=10.0) == (False, 'too_long')
+
+
+def test_speculative_calls_before_confidence_is_known():
+    assert GeminiRoutingPolicy(speculative=True).decide(TEXT) == (True, 'speculative')
+
+
+def test_per_minute_budget():
+    policy = GeminiRoutingPolicy(calls_per_minute=2)
+    reasons = [policy.decide(TEXT, confidence=10.0).reason for _ in range(3)]
+    assert reasons == ['low_confidence', 'low_confidence', 'budget_minute']
+    assert policy.get_stats()['decisions'] == {'low_confidence': 2, 'budget_minute': 1}
+
+
+def test_shared_budget_is_counted_across_policies(tmp_path):
+    path = str(tmp_path / 'budget.sqlite3')
+    first = GeminiRoutingPolicy(calls_per_day=2, budget_store=SharedCallBudget(path))
+    second = GeminiRoutingPolicy(calls_per_day=2, budget_store=SharedCallBudget(path))
+    assert first.decide(TEXT, confidence=10.0).call
+    assert second.decide(TEXT, confidence=10.0).call
+    assert first.decide(TEXT, confidence=10.0) == (False, 'budget_day')
+    assert second.get_stats()['calls_today'] == 2
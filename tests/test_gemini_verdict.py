@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+
+flask = pytest.importorskip('flask')
+pytest.importorskip('google.generativeai')
+
+from app.services.gemini_service import (  # noqa: E402
+    VERDICT_SCHEMA,
+    GeminiService,
+    finish_reason,
+    get_usage_stats,
+    response_text,
+)
+
+ARTICLE = 'The city council approved a new budget for public libraries on Tuesday, officials said.'
+
+
+class NoTextPart:
+    """Mimics a candidate cut off before any text: .text raises like the real client."""
+
+    def __init__(self, reason):
+        self.candidates = [SimpleNamespace(finish_reason=SimpleNamespace(name=reason))]
+        self.usage_metadata = SimpleNamespace(candidates_token_count=0, prompt_token_count=40)
+
+    @property
+    def text(self):
+        raise ValueError('The response has no text part')
+
+
+def reply(text, reason='STOP', output_tokens=5):
+    return SimpleNamespace(
+        text=text,
+        candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name=reason))],
+        usage_metadata=SimpleNamespace(candidates_token_count=output_tokens, prompt_token_count=40)
+    )
+
+
+class FakeModel:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls.append((prompt, kwargs))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = flask.Flask(__name__, instance_path=str(tmp_path))
+    app.config.update(GEMINI_CACHE_ENABLED=False, GEMINI_VERDICT_MAX_OUTPUT_TOKENS=256)
+    with app.app_context():
+        yield app
+
+
+def service(*responses):
+    svc = GeminiService.__new__(GeminiService)
+    svc.model_name = 'gemini-test'
+    svc.model = FakeModel(*responses)
+    return svc
+
+
+def test_verdict_mode_requests_schema_constrained_json(app):
+    svc = service(reply('{"verdict": "fake"}'))
+    assert svc.verify_article(ARTICLE) == {'verdict': 'FAKE'}
+    prompt, kwargs = svc.model.calls[0]
+    config = kwargs['generation_config']
+    assert config['response_mime_type'] == 'application/json'
+    assert config['response_schema'] == VERDICT_SCHEMA
+    assert config['max_output_tokens'] == 256
+    assert config['temperature'] == 0.0
+    assert ARTICLE in prompt
+
+
+def test_non_json_verdicts_fall_back_to_the_first_label(app):
+    assert service(reply('Verdict: REAL.')).verify_article(ARTICLE) == {'verdict': 'REAL'}
+    assert service(reply('{"verdict": "UNSURE"}')).verify_article(ARTICLE) is None
+
+
+def test_max_tokens_finish_without_text_is_a_miss_and_is_counted(app):
+    svc = service(NoTextPart('MAX_TOKENS'))
+    assert svc.verify_article(ARTICLE) is None
+    stats = get_usage_stats().get_stats()['verdict']
+    assert (stats['calls'], stats['max_tokens_finishes']) == (1, 1)
+
+    service(reply('{"verdict": "REAL"}')).verify_article(ARTICLE)
+    stats = get_usage_stats().get_stats()['verdict']
+    assert (stats['calls'], stats['max_tokens_finishes']) == (2, 1)
+    assert stats['avg_output_tokens'] == pytest.approx(2.5)
+
+
+def test_finish_reason_and_text_helpers():
+    assert finish_reason(reply('x', reason='MAX_TOKENS')) == 'MAX_TOKENS'
+    assert finish_reason(SimpleNamespace(candidates=[SimpleNamespace(finish_reason=2)])) == 'MAX_TOKENS'
+    assert finish_reason(SimpleNamespace(candidates=[])) is None
+    assert response_text(NoTextPart('MAX_TOKENS')) == ''
+    assert response_text(None) == ''
+
+
+def test_cached_verdicts_skip_the_call(tmp_path):
+    app = flask.Flask(__name__, instance_path=str(tmp_path))
+    app.config.update(GEMINI_CACHE_STORE_ENABLED=False)
+    with app.app_context():
+        svc = service(reply('{"verdict": "REAL"}'))
+        assert svc.verify_article(ARTICLE) == {'verdict': 'REAL'}
+        assert svc.is_cached(ARTICLE, verdict_only=True)
+        assert svc.verify_article(ARTICLE) == {'verdict': 'REAL'}
+        assert len(svc.model.calls) == 1
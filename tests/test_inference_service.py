@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Listener
+
+import numpy as np
+import pytest
+
+from app.services import inference_service
+from app.services.inference_service import (
+    InferenceClient,
+    InferenceOverloaded,
+    serve,
+    start_inference_service,
+)
+
+AUTHKEY = b'secret'
+
+
+@pytest.fixture
+def address():
+    # AF_UNIX paths are limited to ~100 bytes, too short for pytest's tmp_path
+    directory = tempfile.mkdtemp(prefix='inf-')
+    yield os.path.join(directory, 'inference.sock')
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class FakeService:
+    """Answers pings, and predict requests by writing fixed probabilities into the shared block."""
+
+    def __init__(self, address, overloaded_replies=0):
+        self.overloaded_replies = overloaded_replies
+        self.requests = 0
+        self.listener = Listener(address, family='AF_UNIX', authkey=AUTHKEY)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            while True:
+                msg = conn.recv()
+                if msg['op'] == 'ping':
+                    conn.send({'req_id': msg['req_id'], 'ok': True})
+                    continue
+                self.requests += 1
+                if self.requests <= self.overloaded_replies:
+                    conn.send({'req_id': msg['req_id'], 'error': 'overloaded'})
+                    continue
+                n, length = msg['shape']
+                shm = inference_service._attach(msg['shm'])
+                tokens = np.ndarray((2, n, length), dtype=np.int64, buffer=shm.buf)
+                out = np.ndarray((n, 2), dtype=np.float32, buffer=shm.buf, offset=tokens.nbytes)
+                # Probability of label 1 = share of real tokens in the row
+                out[:, 1] = tokens[1].sum(axis=1) / length
+                out[:, 0] = 1 - out[:, 1]
+                shm.close()
+                conn.send({'req_id': msg['req_id'], 'ok': True})
+        except (EOFError, OSError):
+            pass
+
+    def close(self):
+        self.listener.close()
+
+
+def test_client_reads_results_from_shared_memory_and_backs_off_when_overloaded(address):
+    service = FakeService(address, overloaded_replies=2)
+    client = InferenceClient(address, AUTHKEY, timeout=5.0)
+    try:
+        ids = np.array([[101, 7, 102, 0], [101, 7, 8, 102]])
+        probs = client.run('fake', ids, (ids != 0).astype(np.int64), num_labels=2)
+        np.testing.assert_allclose(probs, [[0.25, 0.75], [0.0, 1.0]])
+        assert client.overloaded == 2
+    finally:
+        client.close()
+        service.close()
+
+
+def test_client_gives_up_when_the_queue_stays_full(address):
+    service = FakeService(address, overloaded_replies=10 ** 6)
+    client = InferenceClient(address, AUTHKEY, timeout=0.2)
+    try:
+        ids = np.ones((1, 3), dtype=np.int64)
+        with pytest.raises(InferenceOverloaded):
+            client.run('fake', ids, ids, num_labels=2)
+    finally:
+        client.close()
+        service.close()
+
+
+def test_a_live_service_is_never_replaced(address):
+    service = FakeService(address)
+    try:
+        start = time.monotonic()
+        assert start_inference_service(address, AUTHKEY, {}) is None
+        # serve() returns instead of unlinking the live socket and listening itself
+        serve(address, AUTHKEY, {}, workers=0)
+        assert time.monotonic() - start < 5
+        assert inference_service._service_alive(address, AUTHKEY)
+    finally:
+        service.close()
+
+
+def test_remote_wrapper_matches_the_local_pipeline(tiny_pipeline, address, tmp_path):
+    pytest.importorskip('torch')
+    from app.services.inference_service import RemoteModelWrapper
+
+    pipe = tiny_pipeline()
+    model_dir = str(tmp_path / 'fake')
+    pipe.save_pretrained(model_dir)
+    proc = start_inference_service(address, AUTHKEY, {'fake': model_dir}, startup_timeout=60.0, workers=1)
+    client = InferenceClient(address, AUTHKEY, timeout=30.0)
+    try:
+        wrapper = RemoteModelWrapper(client, model_dir, name='fake', batching=False, long_doc_aggregation=None)
+        texts = ['The council approved the budget.', 'Scientists discover the earth is flat, sources say.']
+        remote = wrapper.predict_batch(texts)
+        local = pipe(texts, top_k=None, truncation=True)
+        for got, expected in zip(remote, local):
+            assert {s['label']: s['score'] for s in got} == pytest.approx(
+                {s['label']: s['score'] for s in expected}, abs=1e-5)
+    finally:
+        client.close()
+        if proc is not None:
+            proc.terminate()
+            proc.join(10)
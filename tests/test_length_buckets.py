@@ -0,0 +1,32 @@
+from app.services.length_buckets import padding_efficiency, plan_buckets
+
+
+def test_every_index_is_planned_once():
+    lengths = [50, 400, 12, 12, 300, 90, 510, 7]
+    buckets = plan_buckets(lengths, max_batch_size=3, max_batch_tokens=1024)
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(len(lengths)))
+
+
+def test_buckets_respect_size_and_token_limits():
+    lengths = [30, 500, 480, 25, 40, 510, 35, 300]
+    for bucket in plan_buckets(lengths, max_batch_size=2, max_batch_tokens=1000):
+        assert len(bucket) <= 2
+        assert max(lengths[i] for i in bucket) * len(bucket) <= 1000
+
+
+def test_short_and_long_inputs_are_not_padded_together():
+    lengths = [10, 512, 12, 500, 11]
+    buckets = plan_buckets(lengths, max_batch_size=16, max_batch_tokens=100000)
+    assert [sorted(b) for b in buckets] == [[0, 2, 4], [1, 3]]
+    assert all(padding_efficiency([lengths[i] for i in b]) >= 0.5 for b in buckets)
+
+
+def test_buckets_are_ordered_shortest_first():
+    lengths = [300, 20, 150, 20]
+    buckets = plan_buckets(lengths, max_batch_size=1)
+    assert [lengths[b[0]] for b in buckets] == [20, 20, 150, 300]
+
+
+def test_empty_input():
+    assert plan_buckets([]) == []
+    assert padding_efficiency([]) == 1.0
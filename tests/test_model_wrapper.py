@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip('torch')
+
+from app.utils import SimpleModelWrapper  # noqa: E402
+
+TEXTS = [
+    'Short headline.',
+    'A somewhat longer snippet about the central bank and interest rates this week.',
+    ' '.join(['A long article sentence about the budget vote in the city council.'] * 20),
+    'Another short one.',
+]
+
+
+def count_tokenizer_calls(monkeypatch, tokenizer):
+    calls = []
+    original = type(tokenizer).__call__
+
+    def counting(self, *args, **kwargs):
+        calls.append(args[0] if args else kwargs.get('text'))
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(tokenizer), '__call__', counting)
+    return calls
+
+
+def assert_same_scores(expected, actual):
+    assert len(expected) == len(actual)
+    for exp, act in zip(expected, actual):
+        assert {s['label']: s['score'] for s in act} == pytest.approx({s['label']: s['score'] for s in exp}, abs=1e-5)
+
+
+@pytest.mark.parametrize('bucketing', [True, False])
+def test_predict_batch_matches_the_pipeline(tiny_pipeline, bucketing):
+    pipe = tiny_pipeline()
+    wrapper = SimpleModelWrapper(pipe, batching=False, long_doc_aggregation=None,
+                                 length_bucketing=bucketing, max_batch_size=2)
+    expected = pipe(TEXTS, top_k=None, truncation=True)
+    assert_same_scores(expected, wrapper.predict_batch(TEXTS))
+
+
+def test_each_text_is_tokenized_once(tiny_pipeline, monkeypatch):
+    pipe = tiny_pipeline()
+    wrapper = SimpleModelWrapper(pipe, batching=False, long_doc_aggregation=None, max_batch_size=2)
+    calls = count_tokenizer_calls(monkeypatch, pipe.tokenizer)
+
+    wrapper.predict_batch(TEXTS)
+    assert len(calls) == 1
+
+    calls.clear()
+    wrapper.predict_batch(TEXTS[:1])
+    assert len(calls) == 1
+    assert wrapper.padding.get_stats()['batches'] == 3
@@ -0,0 +1,100 @@
+import threading
+
+from app.services.near_duplicate import NearDuplicateIndex
+
+ARTICLE = (
+    'The city council approved a new budget on Tuesday that increases funding for public libraries, '
+    'community gardens and after-school programs across all five districts, officials said. The mayor '
+    'called the vote a turning point for neighbourhood services after years of cuts.'
+)
+OTHER = (
+    'Researchers at the university published a study showing that regular exercise improves sleep quality '
+    'in older adults, with the largest effect among participants who walked at least thirty minutes daily '
+    'and kept a consistent bedtime routine throughout the trial.'
+)
+VERDICT = {'fake_news_label': 'Real', 'fake_confidence': 0.93}
+
+
+def test_lookup_finds_near_duplicates():
+    index = NearDuplicateIndex()
+    assert index.add(ARTICLE, VERDICT)
+    edited = ARTICLE.replace('officials said', 'officials confirmed')
+    match = index.lookup(edited)
+    assert match['fake_news_label'] == 'Real'
+    assert index.threshold <= match['similarity'] < 1.0
+    assert index.lookup(OTHER) is None
+
+
+def test_short_texts_are_not_indexed():
+    index = NearDuplicateIndex()
+    assert not index.add('too short to compare', VERDICT)
+    assert index.lookup('too short to compare') is None
+
+
+def test_oldest_entries_are_evicted():
+    index = NearDuplicateIndex(max_entries=1)
+    index.add(ARTICLE, VERDICT)
+    index.add(OTHER, {'fake_news_label': 'Fake'})
+    assert index.lookup(ARTICLE) is None
+    assert index.lookup(OTHER)['fake_news_label'] == 'Fake'
+    assert index.get_stats()['entries'] == 1
+
+
+def test_rebuild_replaces_contents():
+    index = NearDuplicateIndex()
+    index.add(OTHER, VERDICT)
+    assert index.rebuild([(ARTICLE, {'fake_news_label': 'Fake'})]) == 1
+    assert index.ready
+    assert index.lookup(OTHER) is None
+    assert index.lookup(ARTICLE)['fake_news_label'] == 'Fake'
+
+
+def test_adds_during_rebuild_are_kept():
+    index = NearDuplicateIndex()
+    reading = threading.Event()
+    added = threading.Event()
+
+    def rows():
+        reading.set()
+        added.wait(5)
+        yield ARTICLE, VERDICT
+
+    def remember():
+        reading.wait(5)
+        index.add(OTHER, {'fake_news_label': 'Fake'})
+        added.set()
+
+    worker = threading.Thread(target=remember)
+    worker.start()
+    index.rebuild(rows())
+    worker.join()
+
+    assert index.lookup(ARTICLE)['fake_news_label'] == 'Real'
+    assert index.lookup(OTHER)['fake_news_label'] == 'Fake'
+
+
+def test_rebuild_from_db_keeps_the_newest_rows_oldest_first(tmp_path):
+    from datetime import datetime, timedelta
+
+    import flask
+
+    from app.database import db
+    from app.models import ArticleResult
+
+    app = flask.Flask(__name__, instance_path=str(tmp_path))
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    third = ARTICLE.replace('Tuesday', 'Friday').replace('five districts', 'nine wards and two suburbs')
+    start = datetime(2024, 1, 1)
+    with app.app_context():
+        db.create_all()
+        for minutes, (text, label) in enumerate([(OTHER, 'Fake'), (ARTICLE, 'Real'), (third, 'Fake')]):
+            db.session.add(ArticleResult(article_text=text, fake_news_label=label,
+                                         timestamp=start + timedelta(minutes=minutes)))
+        db.session.add(ArticleResult(article_text='unclassified ' + OTHER, timestamp=start + timedelta(hours=1)))
+        db.session.commit()
+
+        index = NearDuplicateIndex(max_entries=2)
+        assert index.rebuild_from_db() == 2
+        assert index.lookup(OTHER) is None
+        assert list(v['fake_news_label'] for _, v in index._entries.values()) == ['Real', 'Fake']
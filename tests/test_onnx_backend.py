@@ -0,0 +1,92 @@
+import os
+import sys
+import types
+
+import pytest
+
+from app.services import onnx_backend
+from app.services.onnx_backend import QUANTIZED_FILE, onnx_export_dir
+
+
+def write_model(path, weights=b'weights'):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'config.json'), 'w') as fh:
+        fh.write('{}')
+    with open(os.path.join(path, 'model.safetensors'), 'wb') as fh:
+        fh.write(weights)
+
+
+def test_export_dir_lives_under_instance_and_is_stable(tmp_path):
+    model_dir = str(tmp_path / 'models' / 'fake')
+    write_model(model_dir)
+    instance = str(tmp_path / 'instance')
+
+    export_dir = onnx_export_dir(model_dir, instance)
+    assert export_dir.startswith(os.path.join(instance, 'onnx', 'fake-'))
+    assert onnx_export_dir(model_dir, instance) == export_dir
+
+
+def test_export_dir_changes_with_the_weights(tmp_path):
+    model_dir = str(tmp_path / 'fake')
+    write_model(model_dir)
+    before = onnx_export_dir(model_dir, str(tmp_path))
+    write_model(model_dir, weights=b'retrained weights')
+    assert onnx_export_dir(model_dir, str(tmp_path)) != before
+
+
+def fake_optimum(monkeypatch, quantize):
+    class ORTQuantizer:
+        @classmethod
+        def from_pretrained(cls, export_dir, file_name):
+            return cls()
+
+        def quantize(self, save_dir, quantization_config):
+            quantize(save_dir)
+
+    class AutoQuantizationConfig:
+        @staticmethod
+        def avx2(**kwargs):
+            return kwargs
+
+    ort = types.ModuleType('optimum.onnxruntime')
+    ort.ORTQuantizer = ORTQuantizer
+    configuration = types.ModuleType('optimum.onnxruntime.configuration')
+    configuration.AutoQuantizationConfig = AutoQuantizationConfig
+    monkeypatch.setitem(sys.modules, 'optimum', types.ModuleType('optimum'))
+    monkeypatch.setitem(sys.modules, 'optimum.onnxruntime', ort)
+    monkeypatch.setitem(sys.modules, 'optimum.onnxruntime.configuration', configuration)
+
+
+def test_quantize_moves_the_finished_file_into_place(tmp_path, monkeypatch):
+    export_dir = tmp_path / 'fake-0123'
+    export_dir.mkdir()
+    target = export_dir / QUANTIZED_FILE
+
+    def quantize(save_dir):
+        # Nothing may appear in the shared export dir while quantizing
+        assert not target.exists()
+        os.makedirs(save_dir, exist_ok=True)
+        with open(os.path.join(save_dir, QUANTIZED_FILE), 'wb') as fh:
+            fh.write(b'int8 graph')
+
+    fake_optimum(monkeypatch, quantize)
+    onnx_backend._quantize(str(export_dir))
+    assert target.read_bytes() == b'int8 graph'
+    assert sorted(os.listdir(tmp_path)) == ['fake-0123']
+
+
+def test_failed_quantize_leaves_no_partial_file(tmp_path, monkeypatch):
+    export_dir = tmp_path / 'fake-0123'
+    export_dir.mkdir()
+
+    def quantize(save_dir):
+        os.makedirs(save_dir, exist_ok=True)
+        with open(os.path.join(save_dir, QUANTIZED_FILE), 'wb') as fh:
+            fh.write(b'partial')
+        raise RuntimeError('out of memory')
+
+    fake_optimum(monkeypatch, quantize)
+    with pytest.raises(RuntimeError):
+        onnx_backend._quantize(str(export_dir))
+    assert not (export_dir / QUANTIZED_FILE).exists()
+    assert sorted(os.listdir(tmp_path)) == ['fake-0123']
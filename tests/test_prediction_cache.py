@@ -0,0 +1,54 @@
+import time
+
+from app.services.prediction_cache import PredictionCache, make_cache_key
+
+
+def test_cache_key_ignores_whitespace_changes():
+    assert make_cache_key('Breaking  news\n today', 'fake') == make_cache_key(' Breaking news today ', 'fake')
+
+
+def test_cache_key_depends_on_model_and_version():
+    base = make_cache_key('text', 'fake', 'v1')
+    assert base != make_cache_key('text', 'classifier', 'v1')
+    assert base != make_cache_key('text', 'fake', 'v2')
+    assert base != make_cache_key('other text', 'fake', 'v1')
+
+
+def test_get_set_and_stats():
+    cache = PredictionCache()
+    assert cache.get('k') is None
+    cache.set('k', ('FAKE', 0.9))
+    assert cache.get('k') == ('FAKE', 0.9)
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_byte_bound_evicts_and_skips_oversized_values():
+    cache = PredictionCache(max_bytes=2000)
+    cache.set('huge', 'x' * 5000)
+    assert cache.get('huge') is None
+    for i in range(50):
+        cache.set(f'k{i}', 'v' * 100)
+    stats = cache.get_stats()
+    assert stats['bytes'] <= 2000
+    assert stats['evictions'] > 0
+
+
+def test_entries_expire_after_ttl():
+    cache = PredictionCache(ttl_seconds=0.05)
+    cache.set('k', 1)
+    time.sleep(0.1)
+    assert cache.get('k') is None
+    assert cache.get_stats()['expirations'] == 1
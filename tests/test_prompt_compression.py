@@ -0,0 +1,41 @@
+from app.services.prompt_compression import OMISSION, compress_article, estimate_tokens
+
+SENTENCES = [
+    'The central bank raised interest rates by half a point on Wednesday.',
+    'Inflation has stayed above the bank target for eighteen months.',
+    'Analysts said the rate decision was widely expected by markets.',
+    'A local bakery celebrated its fiftieth anniversary with free pastries.',
+    'The bank signalled that further rate increases remain possible if inflation persists.',
+    'The weather was mild across most of the country.',
+]
+ARTICLE = ' '.join(SENTENCES * 5)
+
+
+def test_short_articles_are_unchanged():
+    text, stats = compress_article('A short article.', 1000)
+    assert text == 'A short article.'
+    assert stats['tokens_saved'] == 0
+
+
+def test_long_articles_fit_the_budget():
+    text, stats = compress_article(ARTICLE, 60)
+    assert estimate_tokens(text) <= 61
+    assert stats['original_tokens'] == estimate_tokens(ARTICLE)
+    assert stats['tokens_saved'] == stats['original_tokens'] - stats['tokens'] > 0
+
+
+def test_lead_sentence_and_order_are_kept():
+    text, _ = compress_article(ARTICLE, 80)
+    assert text.startswith(SENTENCES[0])
+    assert OMISSION.strip() in text
+    kept = [s.strip(' [.]') for s in text.split(OMISSION.strip())]
+    assert all(s in ARTICLE for s in kept if s)
+
+
+def test_single_sentence_is_truncated():
+    text, _ = compress_article('word ' * 500, 20)
+    assert len(text) <= 80
+
+
+def test_zero_budget_disables_compression():
+    assert compress_article(ARTICLE, 0)[0] == ARTICLE
@@ -0,0 +1,74 @@
+import flask
+import pytest
+
+from app.health import health_bp
+from app.utils import models_required
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(health_bp)
+    api = flask.Blueprint('api', __name__)
+
+    @api.route('/classify', methods=['POST'])
+    @models_required
+    def classify():
+        return flask.jsonify({'label': 'real'})
+
+    @app.route('/classify', methods=['GET', 'POST'])
+    @models_required
+    def classify_page():
+        return 'classified'
+
+    app.register_blueprint(api, url_prefix='/api')
+    return app
+
+
+def set_status(app, **status):
+    app.config['MODEL_STATUS'] = status
+
+
+@pytest.mark.parametrize('status, code, state', [
+    ({'classifier': 'loading', 'fake': 'ready'}, 503, 'loading'),
+    ({'classifier': 'ready', 'fake': 'ready'}, 200, 'ready'),
+    ({'classifier': 'missing', 'fake': 'ready'}, 200, 'degraded'),
+    ({'classifier': 'failed', 'fake': 'missing'}, 503, 'failed'),
+])
+def test_readiness_reaches_a_final_state(app, status, code, state):
+    set_status(app, **status)
+    response = app.test_client().get('/healthz/ready')
+    assert response.status_code == code
+    body = response.get_json()
+    assert body['state'] == state
+    assert body['models'] == status
+    assert body['unavailable'] == {k: v for k, v in status.items() if v in ('missing', 'failed')}
+
+
+def test_api_answers_503_while_models_load(app):
+    set_status(app, classifier='warming', fake='ready')
+    response = app.test_client().post('/api/classify', json={'text': 'news'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+    set_status(app, classifier='ready', fake='ready')
+    assert app.test_client().post('/api/classify', json={'text': 'news'}).status_code == 200
+
+
+def test_degraded_worker_keeps_serving_and_failed_worker_does_not(app):
+    set_status(app, classifier='missing', fake='ready')
+    assert app.test_client().post('/api/classify', json={'text': 'news'}).status_code == 200
+
+    set_status(app, classifier='failed', fake='failed')
+    response = app.test_client().post('/api/classify', json={'text': 'news'})
+    assert response.status_code == 503
+    assert 'Retry-After' not in response.headers
+
+
+def test_form_posts_are_redirected_while_loading(app):
+    set_status(app, classifier='pending', fake='pending')
+    client = app.test_client()
+    response = client.post('/classify', data={'text': 'news'})
+    assert response.status_code == 302
+    assert client.get('/classify').data == b'classified'
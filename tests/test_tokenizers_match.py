@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+
+from app.utils import tokenizers_match  # noqa: E402
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'app', 'models')
+
+
+def load(name, **kwargs):
+    return transformers.AutoTokenizer.from_pretrained(os.path.join(MODELS_DIR, name), **kwargs)
+
+
+def test_identical_tokenizers_match():
+    assert tokenizers_match(load('classifier'), load('classifier'))
+    # Both shipped models are fine-tuned from the same base tokenizer
+    assert tokenizers_match(load('classifier'), load('fake'))
+
+
+def test_truncation_and_padding_state_is_ignored():
+    used = load('classifier')
+    used(['a short text', 'a somewhat longer piece of text'], truncation=True, max_length=8, padding=True)
+    assert tokenizers_match(used, load('classifier'))
+
+
+def test_different_normalization_does_not_match():
+    assert not tokenizers_match(load('classifier'), load('classifier', do_lower_case=False))
+
+
+def test_different_length_limit_does_not_match():
+    assert not tokenizers_match(load('classifier'), load('classifier', model_max_length=128))
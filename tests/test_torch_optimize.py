@@ -0,0 +1,19 @@
+import logging
+
+import pytest
+
+
+def test_unknown_compile_mode_falls_back_to_eager(tiny_pipeline, caplog):
+    torch = pytest.importorskip('torch')
+    from app.services.torch_optimize import describe, optimize_torch_model
+
+    pipe = tiny_pipeline()
+    expected = pipe('The council approved the budget.', top_k=None)
+    with caplog.at_level(logging.WARNING, logger='app.services.torch_optimize'):
+        model = optimize_torch_model(pipe.model, 'fastest')
+    assert 'fastest' in caplog.text
+    assert describe(model)['compile_mode'] is None
+
+    out = model(**pipe.tokenizer(['The council approved the budget.'], return_tensors='pt'))
+    assert out.logits.requires_grad is False and torch.is_inference(out.logits)
+    assert pipe('The council approved the budget.', top_k=None) == expected